@@ -1,19 +1,42 @@
+import importlib
 import tkinter as tk
 from tkinter import ttk
-from views.calculator_view import CalculatorView
-from views.history_view import HistoryView
-from views.saved_view import SavedOperationsView
-from views.favorites_view import FavoritesView
-from views.export_view import ExportView
-from views.notebook_view import NotebookView
-from controllers import AuthController, HistoryController, DefinitionsController, FavoritesController, OperationsController
+from concurrent.futures import ThreadPoolExecutor
+from controllers import AuthController, HistoryController, DefinitionsController, FavoritesController, OperationsController, SettingsController
 from utils.styles import get_colors
+from utils.expression_cache import ExpressionCache
+from utils.compute_pool import ComputePool
+from utils import time_budget
+from utils.result_store import ResultStore
+from utils.precision import NumericSettings
+from utils.startup_timing import StartupTimer
+from services import EngineService, UnitConversionService
+from repositories import UnitsRepository
 from config import DatabaseConnection
-from views.inicio_view import InicioView
-from views.reporte_view import ReporteView
 
 class CalculatorApp:
-    def __init__(self):
+    # Vistas del menú: módulo y clase. Cada una se importa y se construye la primera
+    # vez que se muestra, así SymPy, matplotlib o reportlab no retrasan el arranque
+    VIEW_CLASSES = {
+        'inicio': ('views.inicio_view', 'InicioView'),
+        'calculator': ('views.calculator_view', 'CalculatorView'),
+        'history': ('views.history_view', 'HistoryView'),
+        'saved': ('views.saved_view', 'SavedOperationsView'),
+        'favorites': ('views.favorites_view', 'FavoritesView'),
+        'export': ('views.export_view', 'ExportView'),
+        'notebook': ('views.notebook_view', 'NotebookView'),
+        'reporte': ('views.reporte_view', 'ReporteView'),
+    }
+    
+    def __init__(self, started=None):
+        """
+        Args:
+            started: Instante (time.perf_counter) en que arrancó el proceso, para
+                     incluir la importación de módulos en el reporte de arranque
+        """
+        self.startup = StartupTimer(started)
+        self.startup.mark("importación de módulos")
+        
         self.root = tk.Tk()
         self.root.title("Calculadora Científica Retro")
         self.root.state('zoomed')
@@ -21,10 +44,13 @@ class CalculatorApp:
         
         self.colors = get_colors()
         self.root.configure(bg=self.colors['bg'])
+        self.startup.mark("ventana principal")
         
-        # Conexión a la base de datos
+        # Conexión a la base de datos: se establece en segundo plano y la
+        # aplicación arranca sin esperarla (modo anónimo, sin conexión)
         self.db_connection = DatabaseConnection()
-        self.test_database_connection()
+        self.start_database_connection()
+        self.startup.mark("conexión a la base de datos (en segundo plano)")
 
         # Controladores
         self.auth_controller = AuthController(self)
@@ -32,6 +58,8 @@ class CalculatorApp:
         self.definitions_controller = DefinitionsController(self)
         self.operations_controller  = OperationsController(self)
         self.favorites_controller = FavoritesController(self)
+        self.settings_controller = SettingsController(self)
+        self.startup.mark("controladores")
         
         # Estado de la aplicación - SIEMPRE INICIA COMO ANÓNIMO
         self.current_user = self.auth_controller.auth_service.create_anonymous_user()
@@ -41,30 +69,64 @@ class CalculatorApp:
         self.variables = {}
         self.functions = {}
         
+        # Decimales y notación de los resultados (por defecto, cálculo rápido con float)
+        self.numeric_settings = NumericSettings()
+        
         # Diccionarios para descripciones y parámetros en memoria (usuarios anónimos)
         self.variable_descriptions = {}
         self.function_descriptions = {}
         self.function_parameters = {}
         
+        # Caché de expresiones analizadas compartida por las vistas de cálculo
+        self.expression_cache = ExpressionCache(maxsize=256)
+        
+        # Resultados ya calculados en sesiones anteriores (archivo SQLite local)
+        self.result_store = ResultStore()
+        
+        # Hilos para los cálculos de la calculadora (el hilo de Tkinter solo muestra resultados)
+        self.background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="calculo")
+        
+        # Procesos de trabajo para cálculos simbólicos largos (con límite de tiempo)
+        try:
+            self.compute_pool = ComputePool()
+        except Exception as e:
+            print(f"⚠️ No se pudo iniciar el pool de cálculo: {e}")
+            self.compute_pool = None
+        # Simplificaciones, integrales y sistemas con presupuesto de tiempo que se
+        # calculen en este proceso también corren en el pool: al pasarse se terminan
+        time_budget.use_pool(self.compute_pool)
+        
+        # Motor de cálculo único, compartido por las vistas y seguro entre hilos
+        self.engine = EngineService(
+            cache=self.expression_cache,
+            result_store=self.result_store,
+            compute_pool=self.compute_pool
+        )
+        
+        # Conversión de unidades en memoria (las unidades se leen una vez, al primer uso).
+        # El historial de conversiones se escribe en bloques con su propia conexión,
+        # que también se conecta y reconecta en segundo plano
+        self.units = UnitConversionService(
+            UnitsRepository(self.db_connection),
+            history_repository=UnitsRepository(DatabaseConnection(offline_first=True))
+        )
+        self.startup.mark("cachés y pool de cálculo")
+        
         # Configurar UI
         self.setup_ui()
         
-        # Vistas (sin inicializar DefinitionsView aquí)
-        self.views = {
-            'inicio': InicioView(self, self.calc_frame),
-            'calculator': CalculatorView(self, self.calc_frame),
-            'history': HistoryView(self, self.calc_frame),
-            'saved': SavedOperationsView(self, self.calc_frame),
-            'favorites': FavoritesView(self, self.calc_frame),
-            'export': ExportView(self, self.calc_frame),
-            'notebook': NotebookView(self, self.calc_frame),
-            'reporte': ReporteView(self, self.calc_frame)
-
-        }
+        # Vistas ya construidas (DefinitionsView la maneja su controlador)
+        self.views = {}
         
         # Mostrar vista inicial
         self.show_view('inicio')
+        self.startup.mark("interfaz y vista inicial")
         print("🔓 Aplicación iniciada en modo anónimo")
+        
+        # Reporte de arranque cuando la ventana ya se dibujó; después se precarga
+        # el motor de cálculo para que la primera operación no espere a SymPy
+        self.root.after_idle(self.startup.report)
+        self.root.after_idle(self.preload_engine)
     
     def center_window(self, width, height):
         """Centra la ventana principal en la pantalla"""
@@ -79,15 +141,31 @@ class CalculatorApp:
         # Aplicar geometría
         self.root.geometry(f"{width}x{height}+{x}+{y}")
 
-    def test_database_connection(self):
-        """Prueba la conexión a la base de datos al iniciar la aplicación"""
-        print("🔌 Intentando conectar a la base de datos...")
-        connection = self.db_connection.connect()
-        if connection:
-            print("✅ Base de datos lista para usar")
-        else:
-            print("❌ Error: No se pudo conectar a la base de datos")
-            print("   Verifica que MySQL esté ejecutándose en el puerto 3309")
+    # Cada cuánto (ms) se revisa el estado de la conexión para el indicador del header
+    DB_STATUS_POLL_MS = 500
+    
+    def start_database_connection(self):
+        """Inicia la conexión a la base de datos sin bloquear la interfaz"""
+        print("🔌 Intentando conectar a la base de datos en segundo plano...")
+        self.db_online = False
+        self.db_connection.start_background_connect()
+    
+    def _poll_database_status(self):
+        """Actualiza el indicador de conexión cuando la conexión cambia de estado"""
+        online = self.db_connection.online
+        if online != self.db_online:
+            self.db_online = online
+            if online:
+                print("✅ Base de datos lista para usar")
+                self.definitions_controller.on_database_online()
+            else:
+                print("❌ Sin conexión a la base de datos: se reintentará en segundo plano")
+        if self.db_status_label.winfo_exists():
+            self.db_status_label.config(
+                text="🟢 En línea" if online else "🔴 Sin conexión",
+                fg=self.colors['text_dark']
+            )
+            self.root.after(self.DB_STATUS_POLL_MS, self._poll_database_status)
     
     def setup_ui(self):
         """Configura la interfaz principal"""
@@ -123,6 +201,17 @@ class CalculatorApp:
             fg=self.colors['text_dark']
         )
         title_label.pack(side=tk.LEFT, padx=20)
+        
+        # Estado de la conexión a la base de datos
+        self.db_status_label = tk.Label(
+            header_frame,
+            text="🔴 Sin conexión",
+            font=("Arial", 9),
+            bg=self.colors['bg'],
+            fg=self.colors['text_dark']
+        )
+        self.db_status_label.pack(side=tk.LEFT, padx=10)
+        self.root.after(self.DB_STATUS_POLL_MS, self._poll_database_status)
 
         # Área para login generada por el AuthController
         self.auth_controller.create_header(header_frame)
@@ -206,10 +295,33 @@ class CalculatorApp:
 
         if view_name == 'definitions':
             self.definitions_controller.show_definitions_view(self.calc_frame)
-        else:
-            if view_name in self.views:
-                self.views[view_name].show()
+        elif view_name in self.VIEW_CLASSES:
+            self.get_view(view_name).show()
+    
+    def get_view(self, view_name):
+        """Devuelve una vista, importándola y construyéndola la primera vez"""
+        view = self.views.get(view_name)
+        if view is None:
+            module_name, class_name = self.VIEW_CLASSES[view_name]
+            view_class = getattr(importlib.import_module(module_name), class_name)
+            view = view_class(self, self.calc_frame)
+            self.views[view_name] = view
+        return view
+    
+    def preload_engine(self):
+        """Construye el motor de cálculo (SymPy) en segundo plano, sin bloquear la ventana"""
+        self.background_executor.submit(lambda: self.engine.engine)
         
     def run(self):
         """Ejecuta la aplicación"""
-        self.root.mainloop()
\ No newline at end of file
+        try:
+            self.root.mainloop()
+        finally:
+            if self.compute_pool:
+                self.compute_pool.shutdown()
+            self.background_executor.shutdown(wait=False)
+            self.history_controller.shutdown()
+            self.definitions_controller.shutdown()
+            self.units.close()
+            self.db_connection.disconnect()
+            self.result_store.close()
\ No newline at end of file
@@ -1,37 +1,130 @@
+import threading
 import mysql.connector
 from mysql.connector import Error
 
+# Espera inicial y máxima (segundos) entre intentos de conexión en segundo plano
+RECONNECT_INITIAL_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+class _SharedConnection:
+    """
+    Conexión que se entrega en modo offline_first. Los repositorios la cierran
+    al terminar; aquí close() solo termina la transacción (para que la
+    siguiente consulta vea datos nuevos) y la conexión queda abierta para la
+    siguiente llamada, sin volver a conectar desde el hilo que consulta.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        try:
+            self._connection.rollback()
+        except Error:
+            pass
+
 class DatabaseConnection:
-    def __init__(self):
+    def __init__(self, connect_timeout: int = 5, offline_first: bool = False):
         self.host = 'localhost'
         self.port = 3306
         self.database = 'calculadora_db'
         self.user = 'root'
         self.password = ''
+        self.connect_timeout = connect_timeout
         self.connection = None
+        
+        # Indica si la última conexión funcionó (se consulta sin tocar la red)
+        self.online = False
+        
+        # Con offline_first, get_connection nunca se bloquea conectando: si no hay
+        # conexión devuelve None y los reintentos siguen en segundo plano
+        self.offline_first = offline_first
+        self._reconnecting = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._connected = threading.Event()
     
     def connect(self):
         try:
-            self.connection = mysql.connector.connect(
+            connection = mysql.connector.connect(
                 host=self.host,
                 port=self.port,
                 database=self.database,
                 user=self.user,
-                password=self.password
+                password=self.password,
+                connection_timeout=self.connect_timeout
             )
-            if self.connection.is_connected():
+            if connection.is_connected():
+                self.connection = connection
+                self.online = True
+                self._connected.set()
                 print("Conexión exitosa a MySQL")
                 return self.connection
         except Error as e:
             print(f"Error al conectar a MySQL: {e}")
-            return None
+        self._set_offline()
+        return None
+    
+    def _set_offline(self):
+        self.online = False
+        self._connected.clear()
+    
+    def wait_online(self, timeout: float) -> bool:
+        """Espera (desde un hilo de trabajo, nunca desde Tkinter) a que haya conexión"""
+        if not self.online and self.offline_first:
+            self.start_background_connect()
+        return self._connected.wait(timeout)
+    
+    def start_background_connect(self):
+        """
+        Conecta en un hilo aparte y reintenta con espera exponencial hasta lograrlo.
+        Desde la primera llamada la conexión trabaja en modo offline_first.
+        """
+        self.offline_first = True
+        with self._lock:
+            if self._reconnecting or self._stop.is_set():
+                return
+            self._reconnecting = True
+        threading.Thread(target=self._reconnect_loop, daemon=True, name="conexion-bd").start()
+    
+    def _reconnect_loop(self):
+        delay = RECONNECT_INITIAL_DELAY
+        try:
+            while not self._stop.is_set():
+                if self.connect():
+                    return
+                print(f"🔁 Nuevo intento de conexión en {delay:g} s")
+                if self._stop.wait(delay):
+                    return
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        finally:
+            with self._lock:
+                self._reconnecting = False
+            # La conexión se perdió mientras este hilo terminaba: se vuelve a intentar
+            if not self.online and not self._stop.is_set():
+                self.start_background_connect()
     
     def disconnect(self):
+        # Detiene los reintentos en segundo plano, si los hay
+        self._stop.set()
+        self._set_offline()
         if self.connection and self.connection.is_connected():
             self.connection.close()
             print("Conexión cerrada")
     
     def get_connection(self):
-        if not self.connection or not self.connection.is_connected():
-            return self.connect()
-        return self.connection
\ No newline at end of file
+        if self.offline_first:
+            if self.connection and self.connection.is_connected():
+                return _SharedConnection(self.connection)
+            # Sin conexión (todavía no se conectó o se cayó el servidor): quien llama
+            # sigue sin conexión y se reconecta en segundo plano, sin bloquear a nadie
+            self._set_offline()
+            self.start_background_connect()
+            return None
+        if self.connection and self.connection.is_connected():
+            return self.connection
+        # Conexión cerrada (por ejemplo, al salir de un bloque with): se reabre
+        return self.connect()
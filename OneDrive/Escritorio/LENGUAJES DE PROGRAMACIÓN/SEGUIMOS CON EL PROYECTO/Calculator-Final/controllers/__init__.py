@@ -10,11 +10,13 @@ from .history_controller import HistoryController
 from .definitions_controller import DefinitionsController
 from .favorites_controller import FavoritesController
 from .operations_controller import OperationsController
+from .settings_controller import SettingsController
 
 __all__ = [
     'AuthController',
     'HistoryController',
     'DefinitionsController',
     'FavoritesController',
-    'OperationsController'
+    'OperationsController',
+    'SettingsController'
 ]
@@ -38,8 +38,21 @@ class AuthController:
         """Muestra el diálogo de login"""
         self.auth_view.show_login_dialog()
         
+    def check_database_online(self) -> bool:
+        """Avisa si la base de datos todavía no está disponible (se sigue reintentando)"""
+        if self.app.db_connection.online:
+            return True
+        messagebox.showwarning(
+            "Sin conexión",
+            "La base de datos no está disponible en este momento.\n"
+            "Se sigue intentando conectar en segundo plano; mientras tanto puedes usar el modo anónimo."
+        )
+        return False
+        
     def handle_login(self, username_or_email: str, password: str, window):
         """Maneja el proceso de login"""
+        if not self.check_database_online():
+            return
         success, user_info, message = self.auth_service.authenticate_user(username_or_email, password)
         
         if success:
@@ -55,6 +68,9 @@ class AuthController:
             # Manejar migración de definiciones
             self.app.definitions_controller.on_user_login()
             
+            # Cargar decimales y notación configurados
+            self.app.settings_controller.on_user_login()
+            
             # Actualizar el sidebar para mostrar el botón de cerrar sesión
             self.app.update_sidebar()
         else:
@@ -62,6 +78,8 @@ class AuthController:
     
     def handle_register(self, username: str, email: str, password: str, confirm_password: str, window):
         """Maneja el proceso de registro"""
+        if not self.check_database_online():
+            return
         success, user_info, message = self.auth_service.register_user(username, email, password, confirm_password)
         
         if success:
@@ -74,6 +92,9 @@ class AuthController:
             # Manejar migración de definiciones para nuevo usuario
             self.app.definitions_controller.on_user_login()
             
+            # Cargar decimales y notación configurados
+            self.app.settings_controller.on_user_login()
+            
             # Actualizar el sidebar para mostrar el botón de cerrar sesión
             self.app.update_sidebar()
         else:
@@ -97,6 +118,9 @@ class AuthController:
                 # Limpiar favoritos en memoria
                 self.app.favorites_controller.on_user_logout()
                 
+                # Volver al formato numérico por defecto
+                self.app.settings_controller.on_user_logout()
+                
                 # Volver al modo anónimo
                 self.app.current_user = self.auth_service.create_anonymous_user()
                 self.login_button.config(text="👤 Anónimo - Iniciar Sesión")
@@ -1,5 +1,7 @@
+import threading
 from typing import Optional, List
 from tkinter import messagebox
+from config import DatabaseConnection
 from models import VariableUsuario, FuncionPersonalizada
 from services import DefinitionsService
 from repositories import DefinitionsRepository
@@ -12,6 +14,16 @@ class DefinitionsController:
         self.definitions_service = DefinitionsService(self.definitions_repository)
         self.definitions_view = None
         
+        # Las constantes se recargan en un hilo aparte, con su propia conexión: la
+        # del hilo de Tkinter no se puede usar desde otro hilo a la vez. Se conecta y
+        # reconecta en segundo plano, como la principal
+        self.background_connection = DatabaseConnection(offline_first=True)
+        self.background_service = DefinitionsService(DefinitionsRepository(self.background_connection))
+        
+        # Estado de las constantes que tiene cargadas el motor: (usuario, versión)
+        self.constants_version = None
+        self._constants_lock = threading.Lock()
+        
         # Asegurar que existen los diccionarios para descripciones en memoria
         if not hasattr(self.app, 'variable_descriptions'):
             self.app.variable_descriptions = {}
@@ -44,6 +56,7 @@ class DefinitionsController:
                 success, message, variables = self.definitions_service.get_user_variables(user_id)
                 print(f"   Variables - Éxito: {success}, Mensaje: {message}, Cantidad: {len(variables) if success else 0}")
                 
+                variables_loaded = success
                 if success:
                     self.definitions_view.load_variables(variables)
                 else:
@@ -60,6 +73,10 @@ class DefinitionsController:
                 else:
                     print(f"❌ Error cargando funciones: {message}")
                     self.definitions_view.load_functions([])
+                
+                # Las mismas definiciones quedan disponibles en las expresiones
+                if variables_loaded and success:
+                    self.refresh_engine_definitions(*self._database_definitions(variables, functions))
             else:
                 # Usuario anónimo: solo cargar datos en memoria
                 print("🔓 Usuario anónimo - cargando datos de memoria")
@@ -68,8 +85,105 @@ class DefinitionsController:
                 
                 self.definitions_view.load_variables([])
                 self.definitions_view.load_functions([])
+                self.refresh_engine_definitions()
         else:
             print("❌ definitions_view no está inicializada")
+            self.refresh_engine_definitions()
+    
+    def refresh_engine_definitions(self, variables=None, functions=None):
+        """
+        Compila en el motor de cálculo las variables y funciones del usuario
+        actual para que se puedan usar en cualquier expresión. Solo se recalcula
+        lo que depende de las definiciones que cambiaron.
+        """
+        if variables is None or functions is None:
+            variables, functions = self._current_definitions()
+        try:
+            affected = self.app.engine.set_definitions(variables, functions)
+        except Exception as e:
+            print(f"⚠️ No se pudieron compilar las definiciones: {e}")
+            return
+        if affected:
+            print(f"🧮 Definiciones actualizadas en el motor: {', '.join(sorted(affected))}")
+    
+    def schedule_constants_refresh(self, user_id: Optional[int] = None):
+        """Recarga en segundo plano el índice de constantes del motor"""
+        self.app.background_executor.submit(self.refresh_engine_constants, user_id)
+    
+    def refresh_engine_constants(self, user_id: Optional[int] = None):
+        """
+        Carga en el motor las constantes públicas y las del usuario. Se hace una
+        vez por sesión y solo si cambiaron desde la última carga: los cálculos
+        las buscan en memoria y nunca consultan la base de datos.
+        """
+        with self._constants_lock:
+            self._refresh_engine_constants(user_id)
+    
+    def _refresh_engine_constants(self, user_id: Optional[int]):
+        # Hilo de trabajo: se puede esperar a que la conexión propia termine de conectar
+        if not self.background_connection.wait_online(self.background_connection.connect_timeout):
+            print("⚠️ Sin conexión para cargar las constantes")
+            return
+        success, message, version = self.background_service.get_constants_version(user_id)
+        if not success:
+            print(f"⚠️ No se pudieron consultar las constantes: {message}")
+            return
+        version = (user_id, version)
+        if version == self.constants_version:
+            return
+        
+        success, message, constants = self.background_service.get_constants(user_id)
+        if not success:
+            print(f"⚠️ No se pudieron cargar las constantes: {message}")
+            return
+        values = {constant.nombre_constante: constant.valor_constante for constant in constants}
+        changed = self.app.engine.set_constants(values)
+        self.constants_version = version
+        print(f"📚 Constantes cargadas en el motor: {len(values)} ({len(changed)} con cambios)")
+    
+    def shutdown(self):
+        """Cierra la conexión de la recarga de constantes"""
+        with self._constants_lock:
+            self.background_connection.disconnect()
+    
+    def on_database_online(self):
+        """La conexión quedó disponible: se cargan las constantes de la sesión actual"""
+        user_id = self.app.current_user['id'] if self.is_user_authenticated() else None
+        self.schedule_constants_refresh(user_id)
+    
+    def _current_definitions(self):
+        """Variables y funciones del usuario actual (de la BD o de la sesión anónima)"""
+        if self.is_user_authenticated():
+            user_id = self.app.current_user['id']
+            success, message, variables = self.definitions_service.get_user_variables(user_id)
+            functions_success, functions_message, functions = self.definitions_service.get_user_functions(user_id)
+            if success and functions_success:
+                return self._database_definitions(variables, functions)
+            print(f"❌ Error cargando definiciones: {message if not success else functions_message}")
+        return self._session_definitions()
+    
+    def _database_definitions(self, variables: List[VariableUsuario], functions: List[FuncionPersonalizada]):
+        """Definiciones en el formato del motor a partir de los modelos de la BD"""
+        engine_variables = {
+            variable.nombre_variable: variable.valor_variable
+            for variable in variables
+            if variable.tipo_valor in ('numero', 'complejo')
+        }
+        # (id_funcion, ultima_modificacion) identifica la versión ya compilada en el motor
+        engine_functions = {
+            function.nombre_funcion: (function.parametros_funcion, function.definicion_funcion,
+                                      (function.id_funcion, function.ultima_modificacion))
+            for function in functions
+        }
+        return engine_variables, engine_functions
+    
+    def _session_definitions(self):
+        """Definiciones en el formato del motor a partir de la sesión en memoria"""
+        engine_functions = {
+            name: (self.app.function_parameters.get(name), definition)
+            for name, definition in self.app.functions.items()
+        }
+        return dict(self.app.variables), engine_functions
     
     def create_variable(self, name: str, value: str, description: str = None) -> bool:
         """Crea una nueva variable"""
@@ -82,6 +196,11 @@ class DefinitionsController:
             messagebox.showerror("Error", "El valor de la variable es requerido")
             return False
         
+        reserved = self.definitions_service.reserved_name_error(name)
+        if reserved:
+            messagebox.showerror("Error", reserved)
+            return False
+        
         # Validar que el valor sea numérico
         try:
             float(value.strip())
@@ -137,6 +256,11 @@ class DefinitionsController:
             messagebox.showerror("Error", "El valor de la variable es requerido")
             return False
         
+        reserved = self.definitions_service.reserved_name_error(new_name)
+        if reserved:
+            messagebox.showerror("Error", reserved)
+            return False
+        
         try:
             float(new_value.strip())
         except ValueError:
@@ -229,6 +353,11 @@ class DefinitionsController:
             messagebox.showerror("Error", "La definición de la función es requerida")
             return False
         
+        reserved = self.definitions_service.reserved_name_error(name)
+        if reserved:
+            messagebox.showerror("Error", reserved)
+            return False
+        
         # Verificar si la función ya existe en memoria
         if name.strip() in self.app.functions:
             if not messagebox.askyesno(
@@ -282,6 +411,11 @@ class DefinitionsController:
             messagebox.showerror("Error", "La definición de la función es requerida")
             return False
         
+        reserved = self.definitions_service.reserved_name_error(new_name)
+        if reserved:
+            messagebox.showerror("Error", reserved)
+            return False
+        
         if self.is_user_authenticated():
             # Usuario autenticado: actualizar en BD y memoria
             success, message = self.definitions_service.update_function(function, new_name, new_definition, new_parameters, new_description)
@@ -373,6 +507,9 @@ class DefinitionsController:
         if not self.is_user_authenticated():
             return
         
+        # Constantes públicas más las propias del usuario
+        self.schedule_constants_refresh(self.app.current_user['id'])
+        
         # Si hay variables en memoria, preguntar si migrar
         total_variables = len(self.app.variables)
         total_functions = len(self.app.functions)
@@ -397,6 +534,8 @@ class DefinitionsController:
         # Recargar vista si está activa
         if self.definitions_view:
             self.load_user_data()
+        else:
+            self.refresh_engine_definitions()
     
     def migrate_anonymous_definitions(self):
         """Migra las definiciones anónimas a la cuenta del usuario"""
@@ -453,6 +592,10 @@ class DefinitionsController:
             if (hasattr(self.definitions_view, "func_tree") and self.definitions_view.func_tree and
                 self.definitions_view.func_tree.winfo_exists()):
                 self.definitions_view.load_functions([])
+        
+        # El motor vuelve a las definiciones de la sesión en memoria y a las constantes públicas
+        self.refresh_engine_definitions(*self._session_definitions())
+        self.schedule_constants_refresh(None)
     
     def is_user_authenticated(self) -> bool:
         """Verifica si el usuario está autenticado"""
@@ -1,5 +1,7 @@
 from tkinter import messagebox
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from config import DatabaseConnection
 from services import HistoryService
 from repositories import HistoryRepository
 from models import TipoCalculo
@@ -10,6 +12,12 @@ class HistoryController:
         self.app = app
         self.history_repository = HistoryRepository(app.db_connection)
         self.history_service = HistoryService(self.history_repository)
+        
+        # Las escrituras del historial se hacen en un hilo aparte, con su propia
+        # conexión, para no bloquear la interfaz (un solo hilo conserva el orden)
+        self.background_repository = HistoryRepository(DatabaseConnection())
+        self.background_service = HistoryService(self.background_repository)
+        self.db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="historial-bd")
     
     def add_calculation(self, expression: str, result: str, calc_type: TipoCalculo = TipoCalculo.BASICO):
       """Añade un cálculo al historial (memoria o BD según el estado del usuario)"""
@@ -38,23 +46,35 @@ class HistoryController:
       # Siempre añadir a memoria local primero
       self.app.history.append(entry)
       
-      # Si está autenticado, también guardar en BD
+      # Si está autenticado, también guardar en BD (en segundo plano)
       if self.is_user_authenticated():
           user_id = self.app.current_user['id']
-          success, message = self.history_service.save_calculation(
-              user_id, expression, result, calc_type
-          )
-          if success:
-              # Actualizar la entrada con el ID de la BD
-              entry['id'] = self.get_last_calculation_id(user_id)
-          else:
-              print(f"⚠️ Error al guardar en BD: {message}")
+          self.db_executor.submit(self._persist_calculation, entry, user_id, calc_type)
+    
+    def _persist_calculation(self, entry, user_id: int, calc_type: TipoCalculo):
+        """Guarda en BD un cálculo ya añadido a memoria (se ejecuta en el hilo del historial)"""
+        try:
+            success, message = self.background_service.save_calculation(
+                user_id, entry['expression'], entry['result'], calc_type
+            )
+            if success:
+                # Actualizar la entrada con el ID de la BD
+                entry['id'] = self.get_last_calculation_id(user_id, self.background_repository)
+            else:
+                print(f"⚠️ Error al guardar en BD: {message}")
+        except Exception as e:
+            print(f"⚠️ Error al guardar en BD: {e}")
+    
+    def shutdown(self):
+        """Espera a que terminen las escrituras pendientes y cierra la conexión del hilo"""
+        self.db_executor.shutdown(wait=True)
+        self.background_repository.db_connection.disconnect()
     
     def use_expression_in_calculator(self, expression: str):
         """Cambia a la vista de calculadora y coloca la expresión"""
         self.app.show_view('calculator')
         # Esperar a que la vista esté lista y luego colocar la expresión
-        calculator_view = self.app.views['calculator']
+        calculator_view = self.app.get_view('calculator')
         calculator_view.set_expression(expression)
 
     def parse_timestamp(self, timestamp_str):
@@ -96,10 +116,11 @@ class HistoryController:
             else:
                 return False, "No se pudo encontrar el cálculo"
     
-    def get_last_calculation_id(self, user_id: int) -> Optional[int]:
+    def get_last_calculation_id(self, user_id: int, repository: Optional[HistoryRepository] = None) -> Optional[int]:
         """Obtiene el ID del último cálculo guardado"""
         try:
-            calculations = self.history_repository.get_user_history(user_id, limit=1)
+            repository = repository or self.history_repository
+            calculations = repository.get_user_history(user_id, limit=1)
             if calculations:
                 return calculations[0].id_calculo
             return None
@@ -0,0 +1,26 @@
+from repositories import SettingsRepository
+from services import SettingsService
+from utils.precision import NumericSettings
+
+class SettingsController:
+    def __init__(self, app):
+        self.app = app
+        self.settings_repository = SettingsRepository(app.db_connection)
+        self.settings_service = SettingsService(self.settings_repository)
+
+    def on_user_login(self):
+        """Carga las preferencias numéricas del usuario (decimales y notación científica)"""
+        user = self.app.current_user
+        user_id = user.get("id") if user else None
+        if not user_id:
+            return
+        try:
+            self.app.numeric_settings = self.settings_service.get_numeric_settings(user_id)
+            print(f"🔢 Preferencias numéricas cargadas: {self.app.numeric_settings.key}")
+        except Exception as e:
+            print(f"⚠️ No se pudieron cargar las preferencias numéricas: {e}")
+            self.app.numeric_settings = NumericSettings()
+
+    def on_user_logout(self):
+        """Vuelve al formato por defecto (cálculo rápido con float)"""
+        self.app.numeric_settings = NumericSettings()
@@ -1,5 +1,13 @@
+import time
+
+# Inicio del proceso, antes de importar la aplicación (para el reporte de arranque)
+STARTED = time.perf_counter()
+
+import multiprocessing
 from app import CalculatorApp
 
 if __name__ == "__main__":
-    app = CalculatorApp()
-    app.run()
\ No newline at end of file
+    # Necesario para los procesos de cálculo en ejecutables empaquetados de Windows
+    multiprocessing.freeze_support()
+    app = CalculatorApp(started=STARTED)
+    app.run()
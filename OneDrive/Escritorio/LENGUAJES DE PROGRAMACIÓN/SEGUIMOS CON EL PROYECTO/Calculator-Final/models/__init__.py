@@ -4,6 +4,8 @@ from .calculation_history import HistorialCalculo, TipoCalculo
 from .user_functions import CategoriaFuncion, FuncionPersonalizada, ConstantePublica, VariableUsuario
 from .saved_operations import OperacionGuardada, TipoOperacion
 from .favoritos import Favorito, TipoFavorito
+from .user_settings import ConfiguracionUsuario
+from .units import TipoUnidad, UnidadMedida
 
 __all__ = [
     'Calculation',
@@ -12,4 +14,6 @@ __all__ = [
     'CategoriaFuncion', 'FuncionPersonalizada', 'ConstantePublica', 'VariableUsuario',
     'OperacionGuardada', 'TipoOperacion',
     'Favorito', 'TipoFavorito',
+    'ConfiguracionUsuario',
+    'TipoUnidad', 'UnidadMedida',
 ]
\ No newline at end of file
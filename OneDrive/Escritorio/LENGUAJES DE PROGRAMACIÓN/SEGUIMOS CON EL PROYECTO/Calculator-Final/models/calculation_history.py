@@ -9,6 +9,21 @@ class TipoCalculo(Enum):
     MATRIZ = 'matriz'
     GRAFICO = 'grafico'
 
+    @classmethod
+    def from_operation_type(cls, operation_type: str) -> 'TipoCalculo':
+        """Convierte el tipo de operación del motor de cálculo a TipoCalculo"""
+        mapping = {
+            'basic_operations': cls.BASICO,
+            'symbolic': cls.CIENTIFICO,
+            'derivative': cls.CIENTIFICO,
+            'integral': cls.CIENTIFICO,
+            'equation': cls.CIENTIFICO,
+            'system': cls.CIENTIFICO,
+            'matrix': cls.MATRIZ,
+            'fraction': cls.BASICO
+        }
+        return mapping.get(operation_type, cls.BASICO)
+
 class HistorialCalculo:
     def __init__(self, id_usuario: int, expresion: str, resultado: str):
         self.id_calculo: Optional[int] = None
@@ -0,0 +1,49 @@
+from typing import Optional, Dict, Any
+
+class TipoUnidad:
+    def __init__(self, nombre_tipo: str, algoritmo_conversion: str = 'lineal'):
+        self.id_tipo: Optional[int] = None
+        self.nombre_tipo = nombre_tipo
+        self.descripcion: Optional[str] = None
+        self.icono: Optional[str] = None
+        self.algoritmo_conversion = algoritmo_conversion
+        self.precision_decimal = 10
+        self.requiere_conversion_especial = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id_tipo': self.id_tipo,
+            'nombre_tipo': self.nombre_tipo,
+            'descripcion': self.descripcion,
+            'icono': self.icono,
+            'algoritmo_conversion': self.algoritmo_conversion,
+            'precision_decimal': self.precision_decimal,
+            'requiere_conversion_especial': self.requiere_conversion_especial
+        }
+
+class UnidadMedida:
+    def __init__(self, id_tipo: int, nombre_unidad: str, simbolo: str, factor_conversion: float = 1.0):
+        self.id_unidad: Optional[int] = None
+        self.id_tipo = id_tipo
+        self.nombre_unidad = nombre_unidad
+        self.simbolo = simbolo
+        self.factor_conversion = factor_conversion
+        self.offset_conversion = 0.0
+        self.conversion_metadata: Optional[Dict[str, Any]] = None
+        self.es_unidad_base = False
+        self.es_activa = True
+        self.descripcion: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id_unidad': self.id_unidad,
+            'id_tipo': self.id_tipo,
+            'nombre_unidad': self.nombre_unidad,
+            'simbolo': self.simbolo,
+            'factor_conversion': self.factor_conversion,
+            'offset_conversion': self.offset_conversion,
+            'conversion_metadata': self.conversion_metadata,
+            'es_unidad_base': self.es_unidad_base,
+            'es_activa': self.es_activa,
+            'descripcion': self.descripcion
+        }
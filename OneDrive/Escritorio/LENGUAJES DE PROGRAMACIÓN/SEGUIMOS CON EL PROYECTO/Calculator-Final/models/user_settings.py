@@ -0,0 +1,30 @@
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+class ConfiguracionUsuario:
+    def __init__(self, id_usuario: int, decimales_mostrar: int = 2, notacion_cientifica: bool = False):
+        self.id_configuracion: Optional[int] = None
+        self.id_usuario = id_usuario
+        self.decimales_mostrar = decimales_mostrar
+        self.notacion_cientifica = notacion_cientifica
+        self.ultima_modificacion: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id_configuracion': self.id_configuracion,
+            'id_usuario': self.id_usuario,
+            'decimales_mostrar': self.decimales_mostrar,
+            'notacion_cientifica': self.notacion_cientifica,
+            'ultima_modificacion': self.ultima_modificacion.isoformat() if self.ultima_modificacion else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConfiguracionUsuario':
+        configuracion = cls(
+            id_usuario=data['id_usuario'],
+            decimales_mostrar=data.get('decimales_mostrar', 2),
+            notacion_cientifica=bool(data.get('notacion_cientifica', False))
+        )
+        configuracion.id_configuracion = data.get('id_configuracion')
+        configuracion.ultima_modificacion = data.get('ultima_modificacion')
+        return configuracion
@@ -10,5 +10,8 @@ from .history_repository import HistoryRepository
 from .definitions_repository import DefinitionsRepository
 from .favorites_repository import FavoritesRepository
 from .operations_repository import OperationsRepository
+from .settings_repository import SettingsRepository
+from .units_repository import UnitsRepository
 
-__all__ = ['AuthRepository', 'HistoryRepository', 'DefinitionsRepository', 'FavoritesRepository', 'OperationsRepository']
\ No newline at end of file
+__all__ = ['AuthRepository', 'HistoryRepository', 'DefinitionsRepository', 'FavoritesRepository', 'OperationsRepository',
+           'SettingsRepository', 'UnitsRepository']
\ No newline at end of file
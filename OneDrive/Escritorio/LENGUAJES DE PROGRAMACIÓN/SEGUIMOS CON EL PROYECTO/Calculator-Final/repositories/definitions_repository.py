@@ -313,4 +313,66 @@ class DefinitionsRepository:
             return False, f"Error al eliminar función: {str(e)}"
         finally:
             if connection:
-                connection.close()
\ No newline at end of file
+                connection.close()
+    
+    def get_constants(self, user_id: Optional[int] = None) -> Tuple[bool, str, List[ConstantePublica]]:
+        """Obtiene las constantes públicas y, si se indica un usuario, también las suyas"""
+        connection = None
+        try:
+            connection = self.db_connection.get_connection()
+            if not connection:
+                return False, "No se pudo conectar a la base de datos", []
+                
+            cursor = connection.cursor(dictionary=True)
+            # Las constantes propias van al final para que reemplacen a una pública con el mismo nombre
+            cursor.execute("""
+                SELECT id_constante, id_usuario, id_categoria, nombre_constante, valor_constante,
+                       unidad_constante, descripcion, fuente_referencia, es_publica, veces_usada, ultima_modificacion
+                FROM constantes_publicas
+                WHERE es_publica = TRUE OR id_usuario = %s
+                ORDER BY id_usuario = %s, nombre_constante
+            """, (user_id, user_id))
+            
+            constants = []
+            for row in cursor.fetchall():
+                constant = ConstantePublica(row['id_usuario'], row['nombre_constante'], row['valor_constante'])
+                constant.id_constante = row['id_constante']
+                constant.id_categoria = row['id_categoria']
+                constant.unidad_constante = row['unidad_constante']
+                constant.descripcion = row['descripcion']
+                constant.fuente_referencia = row['fuente_referencia']
+                constant.es_publica = row['es_publica']
+                constant.veces_usada = row['veces_usada']
+                constant.ultima_modificacion = row['ultima_modificacion']
+                constants.append(constant)
+                
+            return True, f"Se encontraron {len(constants)} constantes", constants
+            
+        except Exception as e:
+            return False, f"Error al obtener constantes: {str(e)}", []
+        finally:
+            if connection:
+                connection.close()
+    
+    def get_constants_version(self, user_id: Optional[int] = None) -> Tuple[bool, str, Optional[Tuple]]:
+        """Número de constantes visibles y su última modificación: cambia si se agrega, edita o elimina alguna"""
+        connection = None
+        try:
+            connection = self.db_connection.get_connection()
+            if not connection:
+                return False, "No se pudo conectar a la base de datos", None
+                
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT COUNT(*), MAX(ultima_modificacion)
+                FROM constantes_publicas
+                WHERE es_publica = TRUE OR id_usuario = %s
+            """, (user_id,))
+            total, last_modified = cursor.fetchone()
+            return True, "Versión de las constantes obtenida", (total, last_modified)
+            
+        except Exception as e:
+            return False, f"Error al consultar las constantes: {str(e)}", None
+        finally:
+            if connection:
+                connection.close()
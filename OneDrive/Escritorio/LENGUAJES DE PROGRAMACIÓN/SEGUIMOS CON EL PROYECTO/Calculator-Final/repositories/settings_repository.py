@@ -0,0 +1,24 @@
+from typing import Optional
+from models import ConfiguracionUsuario
+
+class SettingsRepository:
+    def __init__(self, db_connection):
+        self.db = db_connection
+
+    def get_by_user(self, id_usuario: int) -> Optional[ConfiguracionUsuario]:
+        """Get the numeric display settings of a user, or None if the user has none"""
+        with self.db.get_connection() as conn:
+            with conn.cursor(dictionary=True) as cur:
+                cur.execute(
+                    """
+                    SELECT id_configuracion, id_usuario, decimales_mostrar,
+                           notacion_cientifica, ultima_modificacion
+                    FROM configuraciones_usuario
+                    WHERE id_usuario = %s
+                    ORDER BY ultima_modificacion DESC
+                    LIMIT 1
+                    """,
+                    (id_usuario,)
+                )
+                row = cur.fetchone()
+                return ConfiguracionUsuario.from_dict(row) if row else None
@@ -0,0 +1,123 @@
+from typing import Any, Dict, List, Tuple
+from mysql.connector import DataError, IntegrityError
+from models import TipoUnidad, UnidadMedida
+
+class UnitsRepository:
+    def __init__(self, db_connection):
+        self.db_connection = db_connection
+
+    def get_unit_types(self) -> Tuple[bool, str, List[TipoUnidad]]:
+        """Obtiene los tipos de unidad con su algoritmo de conversión"""
+        connection = None
+        try:
+            connection = self.db_connection.get_connection()
+            if not connection:
+                return False, "No se pudo conectar a la base de datos", []
+
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT id_tipo, nombre_tipo, descripcion, icono, algoritmo_conversion,
+                       precision_decimal, requiere_conversion_especial
+                FROM tipos_unidades
+                ORDER BY id_tipo
+            """)
+
+            types = []
+            for row in cursor.fetchall():
+                unit_type = TipoUnidad(row['nombre_tipo'], row['algoritmo_conversion'])
+                unit_type.id_tipo = row['id_tipo']
+                unit_type.descripcion = row['descripcion']
+                unit_type.icono = row['icono']
+                unit_type.precision_decimal = row['precision_decimal']
+                unit_type.requiere_conversion_especial = bool(row['requiere_conversion_especial'])
+                types.append(unit_type)
+
+            return True, f"Se encontraron {len(types)} tipos de unidad", types
+
+        except Exception as e:
+            return False, f"Error al obtener tipos de unidad: {str(e)}", []
+        finally:
+            if connection:
+                connection.close()
+
+    def get_units(self) -> Tuple[bool, str, List[UnidadMedida]]:
+        """Obtiene todas las unidades de medida activas"""
+        connection = None
+        try:
+            connection = self.db_connection.get_connection()
+            if not connection:
+                return False, "No se pudo conectar a la base de datos", []
+
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT id_unidad, id_tipo, nombre_unidad, simbolo, factor_conversion, offset_conversion,
+                       conversion_metadata, es_unidad_base, es_activa, descripcion
+                FROM unidades_medida
+                WHERE es_activa = TRUE
+                ORDER BY id_tipo, es_unidad_base DESC, id_unidad
+            """)
+
+            units = []
+            for row in cursor.fetchall():
+                unit = UnidadMedida(row['id_tipo'], row['nombre_unidad'], row['simbolo'], row['factor_conversion'])
+                unit.id_unidad = row['id_unidad']
+                unit.offset_conversion = row['offset_conversion']
+                unit.conversion_metadata = row['conversion_metadata']
+                unit.es_unidad_base = bool(row['es_unidad_base'])
+                unit.es_activa = bool(row['es_activa'])
+                unit.descripcion = row['descripcion']
+                units.append(unit)
+
+            return True, f"Se encontraron {len(units)} unidades", units
+
+        except Exception as e:
+            return False, f"Error al obtener unidades: {str(e)}", []
+        finally:
+            if connection:
+                connection.close()
+
+    def add_conversions(self, conversions: List[Dict[str, Any]]) -> Tuple[bool, str, int]:
+        """
+        Guarda un bloque de conversiones en historial_conversiones en una sola
+        transacción. Lanza ValueError si la base de datos rechaza los datos
+        (clave foránea, valor fuera de rango): reintentar el bloque no sirve.
+        """
+        connection = None
+        try:
+            connection = self.db_connection.get_connection()
+            if not connection:
+                return False, "No se pudo conectar a la base de datos", 0
+
+            cursor = connection.cursor()
+            cursor.executemany("""
+                INSERT INTO historial_conversiones (
+                    id_usuario, id_tipo_unidad, valor_origen, id_unidad_origen,
+                    valor_destino, id_unidad_destino, expresion_completa, timestamp_conversion
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (
+                    conversion['id_usuario'],
+                    conversion['id_tipo_unidad'],
+                    conversion['valor_origen'],
+                    conversion['id_unidad_origen'],
+                    conversion['valor_destino'],
+                    conversion['id_unidad_destino'],
+                    conversion['expresion_completa'],
+                    conversion['timestamp_conversion']
+                )
+                for conversion in conversions
+            ])
+            connection.commit()
+            return True, f"Se guardaron {len(conversions)} conversiones", len(conversions)
+
+        except (IntegrityError, DataError) as e:
+            if connection:
+                connection.rollback()
+            raise ValueError(f"Conversiones rechazadas por la base de datos: {str(e)}")
+        except Exception as e:
+            if connection:
+                connection.rollback()
+            return False, f"Error al guardar conversiones: {str(e)}", 0
+        finally:
+            if connection:
+                connection.close()
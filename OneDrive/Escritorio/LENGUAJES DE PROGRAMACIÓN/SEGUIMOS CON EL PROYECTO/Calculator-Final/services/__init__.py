@@ -10,5 +10,9 @@ from .history_service import HistoryService
 from .definitions_service import DefinitionsService
 from .favorites_service import FavoritesService
 from .operations_service import OperationsService
+from .settings_service import SettingsService
+from .engine_service import EngineService
+from .unit_conversion_service import UnitConversionService
 
-__all__ = ['AuthService', 'HistoryService', 'DefinitionsService', 'FavoritesService', 'OperationsService']
\ No newline at end of file
+__all__ = ['AuthService', 'HistoryService', 'DefinitionsService', 'FavoritesService', 'OperationsService',
+           'SettingsService', 'EngineService', 'UnitConversionService']
\ No newline at end of file
@@ -1,12 +1,22 @@
 from typing import List, Optional, Tuple
-from models import VariableUsuario, FuncionPersonalizada
+from models import VariableUsuario, FuncionPersonalizada, ConstantePublica
 from repositories import DefinitionsRepository
+from utils.expression_lexer import DEFAULT_CONSTANT_NAMES, DEFAULT_FUNCTION_NAMES
 import re
 
 class DefinitionsService:
+    # Funciones y constantes de la calculadora: una definición con su nombre las ocultaría
+    RESERVED_NAMES = DEFAULT_FUNCTION_NAMES | DEFAULT_CONSTANT_NAMES
+    
     def __init__(self, definitions_repository: DefinitionsRepository):
         self.definitions_repository = definitions_repository
     
+    def reserved_name_error(self, name: str) -> Optional[str]:
+        """Mensaje de error si el nombre es de una función o constante de la calculadora"""
+        if name and name.strip() in self.RESERVED_NAMES:
+            return f"'{name.strip()}' es un nombre reservado de la calculadora"
+        return None
+    
     def create_variable(self, user_id: int, name: str, value: str, description: str = None) -> Tuple[bool, str, Optional[VariableUsuario]]:
         """Crea una nueva variable con validaciones"""
         # Validaciones
@@ -20,6 +30,10 @@ class DefinitionsService:
         if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', name.strip()):
             return False, "El nombre debe comenzar con letra o _ y contener solo letras, números y _", None
         
+        reserved = self.reserved_name_error(name)
+        if reserved:
+            return False, reserved, None
+        
         # Validar que el valor sea numérico válido
         try:
             float(value.strip())
@@ -56,6 +70,10 @@ class DefinitionsService:
         if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', new_name.strip()):
             return False, "El nombre debe comenzar con letra o _ y contener solo letras, números y _"
         
+        reserved = self.reserved_name_error(new_name)
+        if reserved:
+            return False, reserved
+        
         try:
             float(new_value.strip())
         except ValueError:
@@ -88,6 +106,10 @@ class DefinitionsService:
         if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', name.strip()):
             return False, "El nombre debe comenzar con letra o _ y contener solo letras, números y _", None
         
+        reserved = self.reserved_name_error(name)
+        if reserved:
+            return False, reserved, None
+        
         # Crear objeto FuncionPersonalizada
         function = FuncionPersonalizada(user_id, name.strip(), definition.strip())
         function.parametros_funcion = parameters.strip() if parameters else None
@@ -118,6 +140,10 @@ class DefinitionsService:
         if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', new_name.strip()):
             return False, "El nombre debe comenzar con letra o _ y contener solo letras, números y _"
         
+        reserved = self.reserved_name_error(new_name)
+        if reserved:
+            return False, reserved
+        
         # Actualizar objeto
         function.nombre_funcion = new_name.strip()
         function.definicion_funcion = new_definition.strip()
@@ -132,4 +158,12 @@ class DefinitionsService:
         if not function.id_funcion:
             return False, "Función no válida para eliminación"
         
-        return self.definitions_repository.delete_function(function.id_funcion, function.id_usuario)
\ No newline at end of file
+        return self.definitions_repository.delete_function(function.id_funcion, function.id_usuario)
+    
+    def get_constants(self, user_id: Optional[int] = None) -> Tuple[bool, str, List[ConstantePublica]]:
+        """Obtiene las constantes públicas y las del usuario (si hay sesión iniciada)"""
+        return self.definitions_repository.get_constants(user_id)
+    
+    def get_constants_version(self, user_id: Optional[int] = None) -> Tuple[bool, str, Optional[Tuple]]:
+        """Identifica el estado de las constantes visibles para saber si hay que recargarlas"""
+        return self.definitions_repository.get_constants_version(user_id)
@@ -0,0 +1,230 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from utils.expression_cache import ExpressionCache
+
+class EngineService:
+    """
+    Motor de cálculo compartido por toda la aplicación.
+
+    Hay una sola instancia de operations, con sus cachés, sus evaluadores
+    compilados y SymPy ya cargado, y todas las vistas la comparten. Se crea la
+    primera vez que se usa para no retrasar el arranque. Las preferencias
+    numéricas viajan como argumento en cada llamada y el servicio no guarda
+    estado de una llamada en particular. Por eso se puede usar a la vez desde el
+    hilo de Tkinter, desde hilos de trabajo y desde el pool de procesos.
+    """
+
+    def __init__(self, cache: Optional[ExpressionCache] = None, result_store=None,
+                 compute_pool=None, cache_size: int = 256):
+        self.expression_cache = cache if cache is not None else ExpressionCache(cache_size)
+        self.result_store = result_store
+        self.compute_pool = compute_pool
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        # Variables y funciones del usuario que se compilan al crear el motor
+        self._definitions = ({}, {})
+        # Índice de constantes (constantes_publicas) que se entrega al motor al crearlo
+        self._constants = {}
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'calls': 0,
+            'errors': 0,
+            'memo_hits': 0,
+            'pool_jobs': 0,
+            'total_time': 0.0,
+            'by_type': {}
+        }
+
+    def __getstate__(self):
+        # En otro proceso el servicio empieza con su propio motor y cachés vacías: la
+        # conexión SQLite, el pool y los candados no se pueden compartir entre procesos
+        return {'cache_size': self.expression_cache.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(cache_size=state['cache_size'])
+
+    @property
+    def engine(self):
+        """Instancia compartida de operations (se importa y se construye al primer uso)"""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    from utils.operations import operations
+                    engine = operations(cache=self.expression_cache, result_store=self.result_store)
+                    engine.set_constants(self._constants)
+                    engine.set_definitions(*self._definitions)
+                    self._engine = engine
+        return self._engine
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._engine is not None
+
+    @property
+    def heavy_operation_types(self):
+        return self.engine.HEAVY_OPERATION_TYPES
+
+    def set_definitions(self, variables: Dict[str, str], functions: Dict[str, Any]):
+        """
+        Variables (nombre -> valor) y funciones (nombre -> (parámetros, cuerpo))
+        del usuario. Si el motor aún no se cargó se compilan al crearlo; si ya
+        está cargado solo se recalcula lo que depende de lo que cambió.
+        Devuelve los nombres afectados.
+        """
+        with self._engine_lock:
+            self._definitions = (dict(variables), dict(functions))
+            engine = self._engine
+            self._share_state()
+        if engine is None:
+            return frozenset()
+        return engine.set_definitions(variables, functions)
+
+    def set_constants(self, values: Dict[str, Any]):
+        """
+        Índice de constantes (nombre -> valor) que el motor resuelve por nombre
+        sin consultar la base de datos. Devuelve los nombres que cambiaron.
+        """
+        with self._engine_lock:
+            self._constants = dict(values)
+            engine = self._engine
+            self._share_state()
+        if engine is None:
+            return frozenset()
+        return engine.set_constants(values)
+
+    def _share_state(self):
+        """Los procesos del pool reciben las constantes y definiciones antes de su siguiente cálculo"""
+        if self.compute_pool:
+            self.compute_pool.set_state(self._constants, self._definitions)
+    
+    # ==================== CÁLCULO ====================
+    def analyze(self, expression: str):
+        """Análisis (tokens y clasificación) de la expresión"""
+        return self.engine.analyze(expression)
+
+    def get_operation_type(self, expression: str) -> str:
+        return self.engine.get_operation_type(expression)
+
+    def process_expression(self, expression: str, detailed: bool = True, on_partial=None,
+                           settings=None) -> Dict[str, Any]:
+        """Calcula la expresión en este hilo y registra el tiempo empleado"""
+        start = time.perf_counter()
+        try:
+            result = self.engine.process_expression(expression, detailed=detailed,
+                                                    on_partial=on_partial, settings=settings)
+        except Exception:
+            self._record('error', time.perf_counter() - start)
+            raise
+        self._record(result.get('type'), time.perf_counter() - start)
+        return result
+
+    def calculate(self, expression: str, settings=None,
+                  on_job: Optional[Callable[[Any], None]] = None, detailed: bool = False) -> Dict[str, Any]:
+        """
+        Calcula una expresión como lo hace la calculadora.
+
+        Primero se busca en la memoria persistente. Las operaciones simbólicas
+        costosas van al pool de procesos, si hay uno, y el resto se resuelve en
+        este hilo. on_job recibe el trabajo del pool para poder cancelarlo. Sin
+        detailed los pasos se generan solo cuando alguien los consulta; con
+        detailed se calculan junto con el resultado (también en el pool).
+        """
+        engine = self.engine
+        with engine.numeric_context(settings) as settings:
+            cached = engine.cached_result(expression, detailed)
+            if cached is not None:
+                self._record_memo_hit()
+                return cached
+
+            if self.compute_pool and engine.get_operation_type(expression) in engine.HEAVY_OPERATION_TYPES:
+                start = time.perf_counter()
+                job = self.compute_pool.submit(expression, detailed=detailed, settings=settings)
+                with self._metrics_lock:
+                    self._metrics['pool_jobs'] += 1
+                if on_job:
+                    on_job(job)
+                result = job.result()
+                self._record(result.get('type'), time.perf_counter() - start)
+                engine.remember_result(expression, result)
+                if result['steps'] is None:
+                    result['steps'] = engine.lazy_steps(expression)
+                return result
+
+            return self.process_expression(expression, detailed=detailed)
+
+    def preview(self, expression: str, settings=None) -> Dict[str, str]:
+        """Vista previa barata mientras se escribe (sin SymPy)"""
+        return self.engine.preview(expression, settings=settings)
+
+    def process_many(self, expressions, detailed: bool = True, on_result=None, settings=None, on_job=None):
+        """Evalúa un lote de expresiones en el pool de procesos de la aplicación"""
+        return self.engine.process_many(expressions, pool=self.compute_pool, detailed=detailed,
+                                        on_result=on_result, settings=settings, on_job=on_job)
+
+    def split_batch(self, text: str):
+        return self.engine.split_batch(text)
+
+    def evaluate_over(self, expression: str, **arrays):
+        """Evalúa la expresión sobre arreglos de NumPy (tablas de valores)"""
+        return self.engine.evaluate_over(expression, **arrays)
+
+    def user_function(self, name: str):
+        """Función del usuario compilada: Lambda de SymPy y versiones numéricas"""
+        return self.engine.user_function(name)
+
+    def cached_result(self, expression: str, detailed: bool = False, settings=None):
+        with self.engine.numeric_context(settings):
+            return self.engine.cached_result(expression, detailed)
+
+    def lazy_steps(self, expression: str, settings=None):
+        with self.engine.numeric_context(settings):
+            return self.engine.lazy_steps(expression)
+
+    # ==================== MÉTRICAS ====================
+    def _record(self, operation_type: Optional[str], elapsed: float):
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics['calls'] += 1
+            metrics['total_time'] += elapsed
+            if operation_type in ('error', None):
+                metrics['errors'] += 1
+            by_type = metrics['by_type'].setdefault(operation_type or 'error', {'calls': 0, 'total_time': 0.0})
+            by_type['calls'] += 1
+            by_type['total_time'] += elapsed
+
+    def _record_memo_hit(self):
+        with self._metrics_lock:
+            self._metrics['memo_hits'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de las cachés del motor y tiempos de cálculo por tipo de operación"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            metrics['by_type'] = {name: dict(values) for name, values in self._metrics['by_type'].items()}
+        metrics['average_time'] = metrics['total_time'] / metrics['calls'] if metrics['calls'] else 0.0
+
+        stats = {
+            'engine_loaded': self.is_loaded,
+            'expression_cache': self.expression_cache.stats(),
+            'metrics': metrics
+        }
+        if self.is_loaded:
+            engine = self._engine
+            stats['lambdify_cache'] = engine.lambdify_cache.stats()
+            stats['numeric_cache'] = engine.numeric_evaluator.compiled_cache.stats()
+            stats['rational_cache'] = engine.rational_evaluator.compiled_cache.stats()
+            stats['constants'] = len(engine.constants)
+            stats['definitions'] = {
+                'count': len(engine.symbol_table),
+                'errors': engine.symbol_table.errors()
+            }
+            stats['compiled_functions'] = engine.function_compiler.cache.stats()
+            stats['precise_evaluators'] = {
+                digits: evaluator.compiled_cache.stats()
+                for digits, evaluator in list(engine.precise_evaluators.items())
+            }
+        if self.result_store is not None:
+            stats['result_store'] = self.result_store.stats()
+        return stats
@@ -2,10 +2,12 @@ from typing import List, Dict, Any, Tuple
 from datetime import datetime
 from repositories import HistoryRepository
 from models import HistorialCalculo, TipoCalculo
+from utils.expression_lexer import ExpressionLexer
 
 class HistoryService:
     def __init__(self, history_repository: HistoryRepository):
         self.history_repository = history_repository
+        self.lexer = ExpressionLexer()
     
     def convert_legacy_to_model(self, legacy_entry: Dict[str, Any], user_id: int) -> HistorialCalculo:
         """Convierte una entrada legacy del historial a modelo HistorialCalculo"""
@@ -24,8 +26,11 @@ class HistoryService:
         else:
             calc.timestamp_calculo = datetime.now()
         
-        # Determinar tipo de cálculo basado en la expresión
-        calc.tipo_calculo = self.determine_calculation_type(calc.expresion)
+        # Usar el tipo que ya se clasificó al calcular; si no existe, derivarlo de la expresión
+        try:
+            calc.tipo_calculo = TipoCalculo(legacy_entry['type'])
+        except (KeyError, ValueError):
+            calc.tipo_calculo = self.determine_calculation_type(calc.expresion)
         
         return calc
     
@@ -41,19 +46,18 @@ class HistoryService:
     
     def determine_calculation_type(self, expression: str) -> TipoCalculo:
         """Determina el tipo de cálculo basado en la expresión"""
-        expression_lower = expression.lower()
+        info = self.lexer.analyze(expression)
         
         # Funciones científicas
-        scientific_functions = ['sin', 'cos', 'tan', 'log', 'ln', 'sqrt', 'exp', 'asin', 'acos', 'atan']
-        if any(func in expression_lower for func in scientific_functions):
+        if info.type == 'basic_operations' and info.has_functions:
             return TipoCalculo.CIENTIFICO
         
         # Conversiones de unidades (podrías expandir esto)
-        if any(unit in expression_lower for unit in ['m', 'km', 'ft', 'kg', 'lb', '°c', '°f']):
+        units = {'m', 'km', 'ft', 'kg', 'lb'}
+        if (info.type == 'symbolic' and info.variables <= units) or '°' in expression:
             return TipoCalculo.CONVERSION
         
-        # Por defecto es básico
-        return TipoCalculo.BASICO
+        return TipoCalculo.from_operation_type(info.type)
     
     def save_calculation(self, user_id: int, expression: str, result: str, calc_type: TipoCalculo = TipoCalculo.BASICO) -> Tuple[bool, str]:
         """Guarda un cálculo individual"""
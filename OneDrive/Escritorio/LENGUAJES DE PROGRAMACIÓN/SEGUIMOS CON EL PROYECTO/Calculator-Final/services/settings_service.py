@@ -0,0 +1,18 @@
+from utils.precision import NumericSettings
+
+class SettingsService:
+    def __init__(self, settings_repository):
+        self.repo = settings_repository
+
+    def get_numeric_settings(self, id_usuario: int) -> NumericSettings:
+        """
+        Obtiene los decimales y la notación con los que se muestran los resultados.
+        Sin configuración guardada se usa el formato por defecto de la calculadora.
+        """
+        configuracion = self.repo.get_by_user(id_usuario)
+        if configuracion is None or configuracion.decimales_mostrar is None:
+            return NumericSettings()
+        return NumericSettings(
+            decimals=max(0, int(configuracion.decimales_mostrar)),
+            scientific=bool(configuracion.notacion_cientifica)
+        )
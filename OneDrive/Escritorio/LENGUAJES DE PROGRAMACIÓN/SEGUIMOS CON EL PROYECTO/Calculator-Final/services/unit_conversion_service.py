@@ -0,0 +1,139 @@
+import math
+import os
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from utils.write_behind import RejectedRecords, WriteBehindBuffer
+
+if TYPE_CHECKING:
+    from utils.unit_converter import UnitConverter
+
+# Conversiones aceptadas que aún no están en historial_conversiones
+DEFAULT_SPOOL_PATH = os.path.join(os.path.expanduser("~"), ".calculadora_retro", "conversiones_pendientes.jsonl")
+
+class UnitConversionService:
+    """
+    Conversión de unidades sin un viaje a la base de datos por conversión.
+
+    tipos_unidades y unidades_medida se leen una sola vez, la primera vez que
+    se convierte algo, y desde ahí todo se resuelve con el UnitConverter en
+    memoria. Si la base de datos no está disponible se vuelve a intentar en la
+    siguiente conversión.
+
+    Con history_repository las conversiones de un usuario se guardan en
+    historial_conversiones en bloques (escritura diferida con respaldo en un
+    archivo local), no con una transacción por conversión.
+    """
+
+    def __init__(self, units_repository, history_repository=None,
+                 spool_path: Optional[str] = DEFAULT_SPOOL_PATH, batch_size: int = 50,
+                 flush_interval: float = 5.0):
+        self.repo = units_repository
+        self.history_repo = history_repository
+        self._converter: Optional['UnitConverter'] = None
+        self._lock = threading.Lock()
+        self.history = None
+        if history_repository is not None:
+            self.history = WriteBehindBuffer(self._write_history, spool_path, max_rows=batch_size,
+                                             max_delay=flush_interval, name="historial-conversiones")
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._converter is not None
+
+    @property
+    def converter(self) -> 'UnitConverter':
+        """Grafo de conversión (se carga al primer uso)"""
+        if self._converter is None:
+            with self._lock:
+                if self._converter is None:
+                    self._converter = self._load()
+        return self._converter
+
+    def reload(self) -> 'UnitConverter':
+        """Vuelve a leer las unidades (por ejemplo, después de agregar una)"""
+        converter = self._load()
+        with self._lock:
+            self._converter = converter
+        return converter
+
+    def _load(self) -> 'UnitConverter':
+        # UnitConverter (y NumPy) se importa con la primera conversión, no al arrancar
+        from utils.unit_converter import UnitConverter
+
+        success, message, types = self.repo.get_unit_types()
+        if success:
+            success, message, units = self.repo.get_units()
+        if not success:
+            raise ValueError(f"No se pudieron cargar las unidades: {message}")
+        converter = UnitConverter(types, units)
+        print(f"📐 {len(converter)} unidades de {len(converter.types)} tipos cargadas para conversión")
+        return converter
+
+    def convert(self, value, origin, destination, id_tipo: Optional[int] = None,
+                id_usuario: Optional[int] = None):
+        """
+        Convierte un número o un arreglo de NumPy (unidades por id_unidad o símbolo).
+        Con id_usuario, la conversión de un número queda en su historial.
+        """
+        converter = self.converter
+        origin = converter.unit(origin, id_tipo)
+        destination = converter.unit(destination, id_tipo)
+        result = converter.convert(value, origin, destination)
+        if id_usuario is not None and self.history is not None and isinstance(result, float):
+            self._record(id_usuario, float(value), origin, destination, result)
+        return result
+
+    def _record(self, id_usuario: int, value: float, origin, destination, result: float):
+        if not (math.isfinite(value) and math.isfinite(result)):
+            return
+        precision = self.converter.types[origin.id_tipo].precision
+        result_text = self.format_value(result, precision)
+        self.history.add({
+            'id_usuario': id_usuario,
+            'id_tipo_unidad': origin.id_tipo,
+            'valor_origen': value,
+            'id_unidad_origen': origin.id_unidad,
+            'valor_destino': result,
+            'id_unidad_destino': destination.id_unidad,
+            'expresion_completa': f"{self.format_value(value)} {origin.simbolo} = {result_text} {destination.simbolo}",
+            'timestamp_conversion': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+
+    @staticmethod
+    def format_value(value: float, precision: Optional[int] = None) -> str:
+        """Número redondeado a precision_decimal del tipo, sin ceros de más"""
+        if precision is not None:
+            value = round(value, precision)
+        return f"{value:.15g}"
+
+    def _write_history(self, conversions: List[Dict[str, Any]]) -> bool:
+        """Escribe un bloque del historial (se ejecuta en el hilo de la escritura diferida)"""
+        try:
+            success, message, _ = self.history_repo.add_conversions(conversions)
+        except ValueError as e:
+            raise RejectedRecords(str(e))
+        if not success:
+            print(f"⚠️ {message}")
+        return success
+
+    def flush_history(self) -> int:
+        """Guarda ya las conversiones pendientes; devuelve cuántas se guardaron"""
+        return self.history.flush() if self.history is not None else 0
+
+    def close(self):
+        """Guarda el historial pendiente y cierra la conexión de la escritura diferida"""
+        if self.history is not None:
+            self.history.close()
+            self.history_repo.db_connection.disconnect()
+
+    def table(self, value: float, origin, id_tipo: Optional[int] = None):
+        """El valor en todas las unidades del mismo tipo: lista de (unidad, valor)"""
+        return self.converter.table(value, origin, id_tipo)
+
+    def get_unit_types(self):
+        return list(self.converter.types.values())
+
+    def get_units(self, id_tipo: int):
+        return self.converter.units_of(id_tipo)
@@ -0,0 +1,342 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from utils.steps import LazySteps
+
+# Tiempo máximo por defecto (segundos) para un cálculo en un proceso de trabajo
+DEFAULT_TIMEOUT = 20.0
+
+# Cada cuánto se revisa la tubería del proceso de trabajo
+_POLL_INTERVAL = 0.05
+
+
+def _worker_main(connection):
+    """
+    Punto de entrada de un proceso de trabajo.
+
+    Importa SymPy y el motor de operaciones una sola vez y hace un cálculo de
+    calentamiento antes de avisar que está listo, para que las peticiones no
+    paguen el costo del arranque en frío. Las peticiones ('state', estado)
+    cargan en el motor las constantes y las definiciones del usuario y las
+    ('call', (función, argumentos)) ejecutan una función suelta.
+
+    Si un cálculo dejó trabajo abandonado por pasarse de su presupuesto, el
+    proceso avisa ('retire') junto con la respuesta y termina, para que el pool
+    lo reemplace y ese trabajo no siga consumiendo CPU.
+    """
+    from utils import time_budget
+    from utils.operations import operations
+    from utils.precision import NumericSettings
+
+    engine = operations()
+    engine.process_expression("simplify(x**2 + 2*x + 1)", detailed=False)
+    connection.send(('ready', None))
+
+    def report(partial):
+        connection.send(('partial', partial))
+
+    def reply(message, payload):
+        if time_budget.abandoned_work():
+            connection.send(('retire', None))
+        connection.send((message, payload))
+
+    while True:
+        try:
+            request = connection.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+
+        kind, payload = request
+        if kind == 'state':
+            try:
+                engine.set_constants(payload['constants'])
+                engine.set_definitions(*payload['definitions'])
+            except Exception as e:
+                print(f"⚠️ No se pudo cargar el estado del motor en el proceso de cálculo: {e}")
+            continue
+
+        try:
+            if kind == 'call':
+                function, args = payload
+                reply('done', function(*args))
+            else:
+                expression, detailed, settings = payload
+                result = engine.process_expression(expression, detailed=detailed, on_partial=report,
+                                                   settings=NumericSettings.from_dict(settings))
+                if isinstance(result['steps'], LazySteps):
+                    # Los pasos diferidos no se pueden enviar entre procesos
+                    result['steps'] = None
+                reply('done', result)
+        except Exception as e:
+            reply('error', str(e))
+        if time_budget.abandoned_work():
+            break
+
+
+class ComputeJob:
+    """Cálculo enviado al pool; permite consultar su estado, esperarlo o cancelarlo"""
+
+    def __init__(self, expression: str, timeout: Optional[float], settings=None):
+        self.expression = expression
+        self.timeout = timeout
+        # Decimales y notación (NumericSettings) con los que se calcula
+        self.settings = settings
+        self.partial: Optional[Dict[str, Any]] = None
+        # 'timeout' o 'cancelled' si el cálculo se detuvo antes de terminar
+        self.interrupted: Optional[str] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self._error: Optional[str] = None
+        self._finished = threading.Event()
+        self._cancel_requested = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self) -> bool:
+        """Indica si el cálculo ya terminó (bien, con error, por tiempo o cancelado)"""
+        return self._finished.is_set()
+
+    def cancel(self):
+        """Solicita la cancelación; el proceso de trabajo se detiene y se reemplaza"""
+        self._cancel_requested.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def result(self, wait: Optional[float] = None) -> Dict[str, Any]:
+        """Espera el resultado; lanza ValueError si el motor reportó un error"""
+        if not self._finished.wait(wait):
+            raise TimeoutError("El cálculo todavía no termina")
+        if self._error is not None:
+            raise ValueError(self._error)
+        return self._result
+
+    def add_done_callback(self, callback: Callable[["ComputeJob"], None]):
+        """Registra una función que se llama (en otro hilo) al terminar el cálculo"""
+        with self._lock:
+            if not self._finished.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _finish(self, result=None, error=None):
+        with self._lock:
+            self._result = result
+            self._error = error
+            self._finished.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"⚠️ Error en callback de cálculo: {e}")
+
+
+class _Worker:
+    """Proceso de trabajo con su extremo de la tubería"""
+
+    def __init__(self, context):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.ready = False
+        # Versión del estado del motor (constantes y definiciones) que ya tiene
+        self.state_version = 0
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Espera el aviso de que el proceso ya cargó SymPy"""
+        if not self.ready and self.connection.poll(timeout):
+            message, _ = self.connection.recv()
+            self.ready = message == 'ready'
+        return self.ready
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=1)
+        self.connection.close()
+
+
+class ComputePool:
+    """
+    Pool de procesos para los cálculos simbólicos costosos.
+
+    simplify, factor, integrate o solve pueden tardar minutos con ciertas
+    entradas; aquí se ejecutan fuera del hilo de Tkinter, con un tiempo límite
+    por cálculo y la posibilidad de cancelarlos. Un proceso que se pasa del
+    tiempo o se cancela se termina y se reemplaza por uno nuevo ya precalentado.
+
+    Los procesos calculan con las mismas constantes y definiciones del usuario
+    que el motor principal: set_state() guarda el estado con una versión nueva
+    y cada proceso lo recibe antes de su siguiente cálculo si tiene uno viejo.
+    submit_call() ejecuta una función suelta con el mismo límite de tiempo (lo
+    usa time_budget para los presupuestos de SymPy).
+    """
+
+    def __init__(self, workers: Optional[int] = None, timeout: float = DEFAULT_TIMEOUT):
+        self.size = workers or max(1, min(2, (os.cpu_count() or 1) - 1))
+        self.timeout = timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._state: Optional[Dict[str, Any]] = None
+        self._state_version = 0
+        for _ in range(self.size):
+            self._spawn()
+
+    def submit(self, expression: str, detailed: bool = False, timeout: Optional[float] = None,
+               settings=None) -> ComputeJob:
+        """Envía una expresión al pool y devuelve el trabajo asociado"""
+        if self._closed:
+            raise RuntimeError("El pool de cálculo está cerrado")
+        job = ComputeJob(expression, self.timeout if timeout is None else timeout, settings)
+        request = ('calculate', (expression, detailed, settings.to_dict() if settings is not None else None))
+        threading.Thread(target=self._run_job, args=(job, request), daemon=True).start()
+        return job
+
+    def submit_call(self, function: Callable, args=(), timeout: Optional[float] = None) -> ComputeJob:
+        """
+        Ejecuta function(*args) en un proceso de trabajo (la función y los
+        argumentos deben poderse enviar entre procesos: funciones de módulo y
+        expresiones de SymPy). El resultado del trabajo es el valor devuelto.
+        """
+        if self._closed:
+            raise RuntimeError("El pool de cálculo está cerrado")
+        job = ComputeJob(getattr(function, '__name__', str(function)), self.timeout if timeout is None else timeout)
+        threading.Thread(target=self._run_job, args=(job, ('call', (function, tuple(args)))), daemon=True).start()
+        return job
+
+    def set_state(self, constants: Dict[str, Any], definitions):
+        """
+        Estado del motor que deben tener los procesos de trabajo.
+
+        Args:
+            constants: Índice de constantes (nombre -> valor)
+            definitions: (variables, funciones) del usuario, como en operations.set_definitions
+        """
+        with self._lock:
+            self._state = {'constants': dict(constants), 'definitions': definitions}
+            self._state_version += 1
+
+    def shutdown(self):
+        """Detiene todos los procesos de trabajo"""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+    def _spawn(self):
+        worker = _Worker(self._context)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker: _Worker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            closed = self._closed
+        worker.kill()
+        if not closed:
+            self._spawn()
+
+    def _release(self, worker: _Worker, retire: bool):
+        if retire:
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+
+    def _run_job(self, job: ComputeJob, request):
+        deadline = time.monotonic() + job.timeout if job.timeout else None
+        worker = self._idle.get()
+        retire = False
+        if job.cancelled:
+            # Cancelado mientras esperaba en la cola: el proceso vuelve sin recibir nada
+            self._idle.put(worker)
+            job._finish(result=self._interrupted_result(job, 'cancelled'))
+            return
+
+        try:
+            # El tiempo de arranque del proceso no cuenta para el límite del cálculo
+            while not worker.wait_ready(_POLL_INTERVAL):
+                if job.cancelled:
+                    self._idle.put(worker)
+                    job._finish(result=self._interrupted_result(job, 'cancelled'))
+                    return
+                if not worker.process.is_alive():
+                    raise OSError("El proceso de cálculo terminó inesperadamente")
+            if deadline:
+                deadline = time.monotonic() + job.timeout
+
+            with self._lock:
+                state, version = self._state, self._state_version
+            if worker.state_version != version:
+                worker.connection.send(('state', state))
+                worker.state_version = version
+
+            worker.connection.send(request)
+            while True:
+                if job.cancelled:
+                    self._replace(worker)
+                    job._finish(result=self._interrupted_result(job, 'cancelled'))
+                    return
+                if deadline and time.monotonic() >= deadline:
+                    self._replace(worker)
+                    job._finish(result=self._interrupted_result(job, 'timeout'))
+                    return
+                if not worker.connection.poll(_POLL_INTERVAL):
+                    continue
+
+                message, payload = worker.connection.recv()
+                if message == 'partial':
+                    job.partial = payload
+                elif message == 'retire':
+                    # El proceso dejó trabajo abandonado: termina después de esta respuesta
+                    retire = True
+                elif message == 'done':
+                    self._release(worker, retire)
+                    job._finish(result=payload)
+                    return
+                elif message == 'error':
+                    self._release(worker, retire)
+                    job._finish(error=payload)
+                    return
+        except (EOFError, OSError) as e:
+            self._replace(worker)
+            job._finish(error=f"Fallo en el proceso de cálculo: {e}")
+
+    def _interrupted_result(self, job: ComputeJob, kind: str) -> Dict[str, Any]:
+        """Construye la respuesta de un cálculo detenido, con lo que se alcanzó a obtener"""
+        job.interrupted = kind
+        partial = job.partial or {}
+        partial_result = partial.get('result')
+        if kind == 'timeout':
+            message = f"⏱️ Tiempo agotado ({job.timeout:g} s)"
+        else:
+            message = "⏹ Cálculo cancelado"
+        if partial_result:
+            message += f"\nResultado parcial: {partial_result}"
+        else:
+            message += "\nNo se obtuvo un resultado parcial"
+        return {
+            'result': message,
+            'steps': partial.get('steps') or [],
+            'type': kind
+        }
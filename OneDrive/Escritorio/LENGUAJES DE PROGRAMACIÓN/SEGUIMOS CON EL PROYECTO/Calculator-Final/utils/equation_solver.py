@@ -0,0 +1,215 @@
+import numpy as np
+import sympy as sp
+from typing import List, Optional, Tuple
+
+from utils.precision import FLOAT_DIGITS, make_context
+
+# Intervalo de búsqueda de raíces de las ecuaciones trascendentes si no se indica otro
+DEFAULT_INTERVAL = (-10.0, 10.0)
+
+# Grado máximo con fórmulas cerradas (fórmula cuadrática, Cardano, Ferrari)
+CLOSED_FORM_MAX_DEGREE = 4
+
+# Puntos de muestreo para aislar las raíces dentro del intervalo
+_SAMPLES = 2000
+
+# Tolerancias para considerar real una raíz y para aceptar una raíz numérica
+_IMAGINARY_TOLERANCE = 1e-9
+_RESIDUAL_TOLERANCE = 1e-8
+
+
+class Solution:
+    """
+    Raíces de una ecuación y el método con el que se obtuvieron.
+
+    roots es una lista de pares (valor, multiplicidad) y exact indica, raíz por
+    raíz, si el valor es exacto o una aproximación numérica (un polinomio puede
+    tener factores con fórmula cerrada y otros resueltos por autovalores). La
+    misma solución la usan la explicación paso a paso y el resultado final.
+    """
+
+    # Métodos posibles y su descripción en los pasos
+    METHODS = {
+        'closed_form': "fórmulas cerradas (grado ≤ 4)",
+        'eigenvalues': "autovalores de la matriz compañera (NumPy)",
+        'polyroots': "polyroots de mpmath (Durand-Kerner) con precisión extendida",
+        'factored': "fórmulas cerradas por factor + raíces numéricas para los demás factores",
+        'bracketing': "aislamiento por cambio de signo + nsolve",
+        'symbolic': "solve de SymPy",
+    }
+
+    def __init__(self, method: str, roots: List[Tuple[sp.Expr, int]], degree: Optional[int] = None,
+                 interval: Optional[Tuple[float, float]] = None, exact: Optional[List[bool]] = None):
+        self.method = method
+        self.roots = roots
+        self.degree = degree
+        self.interval = interval
+        self.exact = exact if exact is not None else [not self.is_numeric] * len(roots)
+
+    @property
+    def description(self) -> str:
+        return self.METHODS[self.method]
+
+    @property
+    def values(self) -> List[sp.Expr]:
+        return [value for value, _ in self.roots]
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.method in ('eigenvalues', 'polyroots', 'bracketing')
+
+    @property
+    def has_numeric_roots(self) -> bool:
+        return not all(self.exact)
+
+
+class EquationSolver:
+    """
+    Resolutor escalonado de ecuaciones en una variable (expresión = 0).
+
+    - Polinomios de grado ≤ 4 con coeficientes numéricos: raíces cerradas.
+    - Polinomios de grado mayor: autovalores de la matriz compañera.
+    - Ecuaciones trascendentes: se muestrea el intervalo, se aíslan los cambios
+      de signo y cada raíz se refina con nsolve dentro de su subintervalo.
+    - Ecuaciones con parámetros: solve de SymPy.
+
+    Con digits por encima de la precisión de un float las raíces numéricas se
+    calculan con esa precisión (polyroots y nsolve de mpmath), no con NumPy.
+    """
+
+    def __init__(self, samples: int = _SAMPLES):
+        self.samples = samples
+
+    def solve(self, expr, var, interval: Optional[Tuple[float, float]] = None,
+              digits: int = FLOAT_DIGITS) -> Solution:
+        expr = sp.sympify(expr)
+        if expr.free_symbols - {var}:
+            return self._symbolic(expr, var)
+        if expr.is_polynomial(var):
+            return self._polynomial(sp.Poly(expr, var), digits)
+        return self._bracketing(expr, var, interval or DEFAULT_INTERVAL, digits)
+
+    def _polynomial(self, poly, digits: int = FLOAT_DIGITS) -> Solution:
+        degree = poly.degree()
+        if degree <= 0:
+            return Solution('closed_form', [], degree)
+
+        # Factores irreducibles: multiplicidades exactas, factores de grado bajo con
+        # fórmulas cerradas y raíces numéricas mejor condicionadas para el resto.
+        # Cada raíz guarda si salió de una fórmula cerrada (exacta) o no
+        roots = []
+        try:
+            factors = poly.factor_list()[1]
+        except (sp.PolynomialError, NotImplementedError):
+            factors = poly.sqf_list()[1]
+        for factor, multiplicity in factors:
+            factor_roots = sp.roots(factor) if factor.degree() <= CLOSED_FORM_MAX_DEGREE else {}
+            exact = sum(factor_roots.values()) == factor.degree()
+            if not exact:
+                factor_roots = {value: 1 for value in self._numeric_roots(factor, digits)}
+            roots.extend((value, count * multiplicity, exact) for value, count in factor_roots.items())
+
+        roots = self._sorted(roots)
+        exact = [is_exact for _, _, is_exact in roots]
+        if all(exact):
+            method = 'closed_form'
+        elif any(exact):
+            method = 'factored'
+        else:
+            method = 'eigenvalues' if digits <= FLOAT_DIGITS else 'polyroots'
+        return Solution(method, [(value, multiplicity) for value, multiplicity, _ in roots], degree,
+                        exact=exact)
+
+    def _numeric_roots(self, poly, digits: int) -> List[sp.Expr]:
+        """Raíces numéricas de un factor: NumPy en doble precisión o polyroots con más dígitos"""
+        if digits <= FLOAT_DIGITS:
+            return self._eigenvalue_roots(poly)
+        context = make_context(digits)
+        coefficients = [context.mpmathify(sp.N(c, digits)) for c in poly.all_coeffs()]
+        values = []
+        for root in context.polyroots(coefficients, maxsteps=200, extraprec=2 * digits):
+            root = context.mpc(root)
+            if abs(root.imag) <= context.mpf(10) ** (-digits // 2) * max(1, abs(root.real)):
+                values.append(sp.Float(root.real, digits))
+            else:
+                values.append(sp.Float(root.real, digits) + sp.Float(root.imag, digits) * sp.I)
+        return values
+
+    def _eigenvalue_roots(self, poly) -> List[sp.Expr]:
+        """Raíces como autovalores de la matriz compañera del polinomio (numpy.roots)"""
+        coefficients = [complex(c) for c in poly.all_coeffs()]
+        values = []
+        for root in np.roots(coefficients):
+            if abs(root.imag) <= _IMAGINARY_TOLERANCE * max(1.0, abs(root.real)):
+                values.append(sp.Float(root.real))
+            else:
+                values.append(sp.Float(root.real) + sp.Float(root.imag) * sp.I)
+        return values
+
+    def _bracketing(self, expr, var, interval, digits: int = FLOAT_DIGITS) -> Solution:
+        low, high = sorted(float(bound) for bound in interval)
+        function = sp.lambdify(var, expr, 'numpy')
+        xs = np.linspace(low, high, self.samples + 1)
+        with np.errstate(all='ignore'):
+            ys = np.broadcast_to(np.asarray(function(xs)), xs.shape)
+        if np.iscomplexobj(ys):
+            ys = np.where(np.abs(ys.imag) < _IMAGINARY_TOLERANCE, ys.real, np.nan)
+        ys = ys.astype(float)
+
+        candidates = []
+        for i in range(len(xs) - 1):
+            left, right = ys[i], ys[i + 1]
+            if not (np.isfinite(left) and np.isfinite(right)):
+                continue
+            if left == 0:
+                candidates.append(('exact', xs[i]))
+            elif left * right < 0:
+                candidates.append(('bracket', (xs[i], xs[i + 1])))
+            elif (0 < i and np.isfinite(ys[i - 1]) and abs(left) < abs(ys[i - 1])
+                    and abs(left) <= abs(right) and abs(left) < 1e-3):
+                # Raíz doble (la función toca el cero sin cambiar de signo)
+                candidates.append(('touch', xs[i]))
+        if np.isfinite(ys[-1]) and ys[-1] == 0:
+            candidates.append(('exact', xs[-1]))
+
+        roots = []
+        for kind, data in candidates:
+            root = self._refine(expr, var, kind, data, digits)
+            if root is None or not low <= float(root) <= high:
+                continue
+            if all(abs(float(root) - float(found)) > 1e-9 * max(1.0, abs(float(root))) for found, _ in roots):
+                roots.append((root, 1))
+        return Solution('bracketing', self._sorted(roots), interval=(low, high))
+
+    def _refine(self, expr, var, kind, data, digits: int = FLOAT_DIGITS) -> Optional[sp.Float]:
+        """Refina una raíz aislada con nsolve (a digits dígitos) y descarta los polos (cambios de signo sin cero)"""
+        try:
+            if kind == 'exact' and digits <= FLOAT_DIGITS:
+                root = sp.Float(data)
+            elif kind == 'bracket':
+                root = sp.nsolve(expr, var, data, solver='anderson', prec=max(digits, FLOAT_DIGITS))
+            else:
+                root = sp.nsolve(expr, var, data, prec=max(digits, FLOAT_DIGITS))
+        except (ValueError, ZeroDivisionError, TypeError):
+            return None
+        if not root.is_real:
+            return None
+        residual = expr.subs(var, root).evalf()
+        if not residual.is_number or abs(complex(residual)) > _RESIDUAL_TOLERANCE:
+            return None
+        return sp.Float(root)
+
+    def _symbolic(self, expr, var) -> Solution:
+        return Solution('symbolic', [(value, 1) for value in sp.solve(expr, var)])
+
+    @staticmethod
+    def _sorted(roots):
+        """Raíces reales primero y en orden creciente; después las complejas"""
+        def key(item):
+            value = complex(item[0].evalf())
+            is_complex = abs(value.imag) > _IMAGINARY_TOLERANCE
+            return (is_complex, value.real, value.imag)
+        try:
+            return sorted(roots, key=key)
+        except (TypeError, ValueError):
+            return roots
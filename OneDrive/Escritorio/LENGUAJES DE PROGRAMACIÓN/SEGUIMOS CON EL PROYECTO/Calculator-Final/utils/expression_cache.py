@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class ExpressionCache:
+    """
+    Caché LRU acotada para expresiones ya analizadas.
+
+    Cada entrada guarda lo necesario para evaluar de nuevo una expresión sin
+    volver a preprocesarla ni a parsearla (árbol SymPy, tipo de operación, etc.).
+    Cuando se supera el tamaño máximo se descarta la entrada usada hace más tiempo.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        if maxsize < 0:
+            raise ValueError("El tamaño de la caché no puede ser negativo")
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve la entrada asociada a la clave o None si no existe"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        """Guarda una entrada, descartando la menos usada si la caché está llena"""
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = value
+            self._evict()
+
+    def resize(self, maxsize: int):
+        """Cambia el tamaño máximo de la caché"""
+        if maxsize < 0:
+            raise ValueError("El tamaño de la caché no puede ser negativo")
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def discard(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Elimina las entradas para las que predicate(clave, valor) es verdadero"""
+        with self._lock:
+            keys = [key for key, value in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """Vacía la caché sin reiniciar los contadores"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Devuelve los contadores de uso de la caché"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
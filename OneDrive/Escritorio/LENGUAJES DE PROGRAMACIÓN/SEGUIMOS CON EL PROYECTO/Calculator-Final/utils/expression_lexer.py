@@ -0,0 +1,267 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Funciones que se escriben como llamadas: f(x) no es una multiplicación implícita
+DEFAULT_FUNCTION_NAMES = frozenset({
+    'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'sqrt', 'log', 'ln', 'log10', 'log2',
+    'exp', 'abs', 'pow', 'ceil', 'floor', 'round', 'factorial', 'degrees', 'radians',
+    'root', 'cot', 'sec', 'csc', 'sinh', 'cosh', 'tanh', 'Abs',
+    'diff', 'integrate', 'derivative', 'integral', 'Matrix', 'sp',
+    'simplify', 'expand', 'factor'
+})
+DEFAULT_CONSTANT_NAMES = frozenset({'pi', 'e'})
+
+# Plantillas vacías de los paneles de símbolos
+_EMPTY_TEMPLATES = {
+    "◻": "a",
+    "x^()": "x^a",
+    "log_()": "log_a(x)",
+    "sqrt()": "sqrt(x)",
+    "root()": "root(a, x)",
+    "root(,)": "root(a, x)",
+}
+
+# Matriz o vector literal con entradas puramente numéricas: se reconoce como un
+# solo token para que las matrices grandes no generen miles de tokens
+_NUMBER = r'\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*'
+_ROW = rf'\[{_NUMBER}(?:,{_NUMBER})*\]'
+_MATRIX_LITERAL = rf'\[\s*{_ROW}(?:\s*,\s*{_ROW})*\s*\]|{_ROW}'
+
+_TOKEN_PATTERN = re.compile(rf"""
+    (?P<space>\s+)
+  | (?P<matrix>{_MATRIX_LITERAL})
+  | (?P<derivative>d/dx(?!\w))
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>\*\*|[-+*/%^=(),;\[\]{{}}<>!|:@×÷∫√°])
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+_ARITHMETIC_OPERATORS = ('+', '-', '*', '/', '=', '**')
+_DERIVATIVE_NAMES = ('derivative', 'diff')
+_INTEGRAL_NAMES = ('integral', 'integrate')
+
+# Token = (tipo, texto)
+Token = Tuple[str, str]
+
+
+class ExpressionInfo:
+    """
+    Resultado del análisis de una expresión: tokens y clasificación.
+
+    Se calcula una sola vez por expresión y lo reutilizan el despacho de
+    operations, la validación, la información de la operación y el historial.
+    """
+
+    def __init__(self, source: str, expression: str, tokens: List[Token], explicit: str,
+                 operation_type: str, variables: Iterable[str], functions: Iterable[str],
+                 has_numbers: bool, has_operators: bool, has_matrices: bool, balanced: bool):
+        self.source = source
+        self.expression = expression
+        self.tokens = tokens
+        self.explicit = explicit
+        self.type = operation_type
+        self.variables = frozenset(variables)
+        self.functions = frozenset(functions)
+        self.has_numbers = has_numbers
+        self.has_operators = has_operators
+        self.has_matrices = has_matrices
+        self.balanced = balanced
+
+    @property
+    def canonical(self) -> str:
+        """Forma canónica: tokens separados por un espacio y saltos de línea como ';'"""
+        parts = []
+        for kind, text in self.tokens:
+            if kind != 'space':
+                parts.append(text)
+            elif '\n' in text:
+                parts.append(';')
+        return ' '.join(parts)
+
+    @property
+    def has_variables(self) -> bool:
+        return bool(self.variables)
+
+    @property
+    def has_functions(self) -> bool:
+        return bool(self.functions)
+
+    @property
+    def is_valid(self) -> bool:
+        """Criterio de la calculadora para aceptar una expresión"""
+        return ((self.has_numbers and (self.has_operators or self.has_functions))
+                or self.has_variables or self.has_matrices)
+
+    def to_dict(self) -> Dict[str, object]:
+        """Información de la operación en el formato de get_operation_info"""
+        return {
+            'expression': self.source,
+            'type': self.type,
+            'complexity': 'simple',
+            'variables': sorted(self.variables),
+            'functions': sorted(self.functions)
+        }
+
+    def __repr__(self):
+        return f"ExpressionInfo({self.expression!r}, type={self.type!r})"
+
+
+class ExpressionLexer:
+    """
+    Tokenizador de expresiones de la calculadora.
+
+    En una sola pasada reemplaza las plantillas de los paneles de símbolos,
+    separa la expresión en tokens, convierte ^ en ** y reúne los datos con
+    los que se clasifica la operación.
+    """
+
+    def __init__(self, function_names: Iterable[str] = DEFAULT_FUNCTION_NAMES,
+                 constant_names: Iterable[str] = DEFAULT_CONSTANT_NAMES,
+                 templates: Optional[Dict[str, str]] = None):
+        self.function_names = frozenset(function_names)
+        self.constant_names = frozenset(constant_names)
+        self.templates = dict(_EMPTY_TEMPLATES)
+        self.templates.update(templates or {})
+        # Las plantillas más largas primero para que "x^□" gane sobre "□"
+        ordered = sorted(self.templates, key=len, reverse=True)
+        self._template_pattern = re.compile('|'.join(re.escape(key) for key in ordered))
+
+    def analyze(self, expression: str) -> ExpressionInfo:
+        """Tokeniza y clasifica una expresión"""
+        source = expression
+        expression = self._template_pattern.sub(lambda match: self.templates[match.group(0)], expression)
+        tokens = self.tokenize(expression)
+
+        variables, functions = set(), set()
+        has_numbers = has_operators = False
+        has_derivative = has_integral = has_division = False
+        equals = depth = 0
+        # Signos '=' de cada sentencia (separadas por ';' o salto de línea)
+        statement_equals = [0]
+        balanced = True
+        opened = closed = False
+
+        for kind, text in tokens:
+            if kind == 'space':
+                if '\n' in text and depth == 0:
+                    statement_equals.append(0)
+            elif kind == 'number':
+                has_numbers = True
+            elif kind == 'matrix':
+                has_numbers = opened = closed = True
+            elif kind == 'derivative':
+                has_derivative = True
+                functions.add(text)
+            elif kind == 'name':
+                lowered = text.lower()
+                if lowered in _DERIVATIVE_NAMES:
+                    has_derivative = True
+                elif lowered in _INTEGRAL_NAMES:
+                    has_integral = True
+                if text in self.function_names or text in self.constant_names:
+                    functions.add(text)
+                else:
+                    variables.add(text)
+            elif kind == 'op':
+                if text in _ARITHMETIC_OPERATORS:
+                    has_operators = True
+                if text == '=':
+                    equals += 1
+                    statement_equals[-1] += 1
+                elif text == ';' and depth == 0:
+                    statement_equals.append(0)
+                elif text == '/':
+                    has_division = True
+                elif text == '∫':
+                    has_integral = True
+                elif text == '[':
+                    opened = True
+                elif text == ']':
+                    closed = True
+                elif text == '(':
+                    depth += 1
+                elif text == ')':
+                    depth -= 1
+                    balanced = balanced and depth >= 0
+        brackets = opened and closed
+        balanced = balanced and depth == 0
+        # Varias sentencias con un '=' cada una forman un sistema de ecuaciones
+        statements = [count for count in statement_equals if count]
+        is_system = len(statements) >= 2 and all(count == 1 for count in statements)
+
+        # Los corchetes mandan: "A = [[1,2],[3,4]]" es una asignación de matrices
+        if brackets:
+            operation_type = 'matrix'
+        elif is_system:
+            operation_type = 'system'
+        elif equals == 1:
+            operation_type = 'equation'
+        elif has_derivative:
+            operation_type = 'derivative'
+        elif has_integral:
+            operation_type = 'integral'
+        elif has_division and not functions and not variables:
+            operation_type = 'fraction'
+        elif variables and equals == 0:
+            operation_type = 'symbolic'
+        else:
+            # Operaciones básicas (suma, resta, multiplicación, división)
+            operation_type = 'basic_operations'
+
+        return ExpressionInfo(
+            source=source,
+            expression=self.join(tokens),
+            tokens=tokens,
+            explicit=self.join(self._with_explicit_multiplication(tokens)),
+            operation_type=operation_type,
+            variables=variables,
+            functions=functions,
+            has_numbers=has_numbers,
+            has_operators=has_operators,
+            has_matrices=brackets,
+            balanced=balanced
+        )
+
+    def tokenize(self, expression: str) -> List[Token]:
+        """Separa la expresión en tokens (tipo, texto), con ^ convertido en **"""
+        tokens = []
+        for match in _TOKEN_PATTERN.finditer(expression):
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == 'op' and text == '^':
+                text = '**'
+            tokens.append((kind, text))
+        return tokens
+
+    def make_explicit(self, expression: str) -> str:
+        """Devuelve la expresión con las multiplicaciones implícitas escritas"""
+        return self.join(self._with_explicit_multiplication(self.tokenize(expression)))
+
+    @staticmethod
+    def join(tokens: Iterable[Token]) -> str:
+        return ''.join(text for _, text in tokens)
+
+    def _with_explicit_multiplication(self, tokens: List[Token]) -> List[Token]:
+        """Inserta '*' entre tokens contiguos que se multiplican: 2x, x(…), )(, )x, )2"""
+        result = []
+        previous = None
+        for token in tokens:
+            if previous is not None and self._multiplies(previous, token):
+                result.append(('op', '*'))
+            result.append(token)
+            previous = token
+        return result
+
+    def _multiplies(self, left: Token, right: Token) -> bool:
+        left_kind, left_text = left
+        right_kind, right_text = right
+        ends_operand = (left_kind == 'number' or left_text == ')'
+                        or (left_kind == 'name' and left_text not in self.function_names))
+        if not ends_operand:
+            return False
+        if right_text == '(':
+            return True
+        if right_kind == 'name':
+            return True
+        return left_text == ')' and right_kind == 'number'
@@ -0,0 +1,63 @@
+from typing import Callable, Hashable, Sequence
+
+import sympy as sp
+
+from utils.expression_cache import ExpressionCache
+
+
+class CompiledFunction:
+    """
+    Función del usuario compilada.
+
+    lambda_ es la Lambda de SymPy para el cálculo simbólico; scalar (math) y
+    vectorized (NumPy) son las versiones numéricas, que solo existen si el
+    cuerpo no depende de nombres sin valor. vectorized evalúa un arreglo
+    completo en una sola llamada.
+    """
+
+    def __init__(self, name: str, parameters: Sequence[str], body: sp.Expr, source: str):
+        self.name = name
+        self.parameters = tuple(sp.Symbol(parameter) for parameter in parameters)
+        # Texto compilado del que sale: si cambia (por ejemplo, el valor de una
+        # variable que usa), la entrada de la caché ya no sirve
+        self.source = source
+        self.lambda_ = sp.Lambda(self.parameters, body)
+        self.free_names = sorted(str(symbol) for symbol in body.free_symbols - set(self.parameters))
+        if self.free_names:
+            self.scalar = self.vectorized = None
+        else:
+            self.scalar = sp.lambdify(self.parameters, body, 'math')
+            self.vectorized = sp.lambdify(self.parameters, body, 'numpy')
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.vectorized is not None
+
+    def __call__(self, *arguments):
+        if self.scalar is None:
+            raise ValueError(
+                f"La función '{self.name}' depende de nombres sin valor ({', '.join(self.free_names)})"
+            )
+        return self.scalar(*arguments)
+
+
+class FunctionCompiler:
+    """
+    Caché de funciones del usuario compiladas.
+
+    La clave es (id_funcion, ultima_modificacion) para las funciones guardadas
+    en la base de datos, así una función sin cambios no se vuelve a compilar
+    al recargar las definiciones ni al iniciar otra sesión del mismo usuario.
+    Cada función se compila la primera vez que se usa.
+    """
+
+    def __init__(self, parse: Callable[[str], sp.Expr], maxsize: int = 256):
+        self.parse = parse
+        self.cache = ExpressionCache(maxsize)
+
+    def get(self, key: Hashable, name: str, parameters: Sequence[str], source: str) -> CompiledFunction:
+        compiled = self.cache.get(key)
+        if compiled is None or compiled.source != source:
+            compiled = CompiledFunction(name, parameters, self.parse(source), source)
+            self.cache.put(key, compiled)
+        return compiled
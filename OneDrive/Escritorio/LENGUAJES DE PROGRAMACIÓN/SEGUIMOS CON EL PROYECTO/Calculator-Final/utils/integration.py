@@ -0,0 +1,119 @@
+from typing import Optional, Sequence, Tuple
+
+import mpmath
+import sympy as sp
+
+from utils.time_budget import call_within_budget
+
+# Tiempo (segundos) que se espera a SymPy antes de pasar a la cuadratura numérica
+DEFAULT_BUDGET = 5.0
+
+# Dígitos de trabajo de mpmath para la cuadratura si no se piden más
+_WORKING_DIGITS = 20
+
+# Límite de integración: (variable, inferior, superior)
+Limit = Tuple[sp.Symbol, sp.Expr, sp.Expr]
+
+
+def _is_divergent(value) -> bool:
+    """Valor infinito o indeterminado: oo, -oo, zoo o nan de SymPy, inf o nan de mpmath"""
+    if isinstance(value, sp.Basic):
+        # Una integral sin evaluar con un límite infinito no es un valor divergente
+        if value.has(sp.Integral) or not value.is_number:
+            return False
+        return value.has(sp.oo, -sp.oo, sp.zoo, sp.nan)
+    return not mpmath.isfinite(value)
+
+
+class IntegralResult:
+    """Valor de una integral definida, con el camino que lo produjo y su error estimado"""
+
+    METHODS = {
+        'symbolic': "integración simbólica (SymPy)",
+        'numeric': "cuadratura adaptativa tanh-sinh (mpmath)",
+    }
+
+    def __init__(self, method: str, value, error: Optional[float] = None, reason: Optional[str] = None):
+        self.method = method
+        self.value = value
+        self.error = error
+        # Motivo por el que no se usó el camino simbólico
+        self.reason = reason
+
+    @property
+    def description(self) -> str:
+        return self.METHODS[self.method]
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.method == 'numeric'
+
+    @property
+    def diverges(self) -> bool:
+        return _is_divergent(self.value)
+
+
+class DefiniteIntegrator:
+    """
+    Integrales definidas (también impropias y múltiples).
+
+    Primero intenta SymPy dentro de un presupuesto de tiempo; si no termina, o
+    devuelve una integral sin evaluar, el valor se obtiene con la cuadratura
+    adaptativa de mpmath, que admite límites infinitos y varias dimensiones y
+    reporta una estimación del error. Un valor infinito o indeterminado de
+    cualquiera de los dos caminos indica que la integral diverge.
+    """
+
+    def __init__(self, budget: float = DEFAULT_BUDGET):
+        self.budget = budget
+
+    def integrate(self, func, limits: Sequence[Limit], digits: int = _WORKING_DIGITS) -> IntegralResult:
+        status, value = call_within_budget(sp.integrate, (func, *limits), self.budget)
+
+        if status == 'timeout':
+            reason = f"SymPy no terminó en {self.budget:g} s"
+        elif status == 'error':
+            reason = f"SymPy falló: {value}"
+        else:
+            if not value.has(sp.Integral):
+                return IntegralResult('symbolic', value)
+            reason = "SymPy no encontró una forma cerrada"
+
+        value, error = self.quadrature(func, limits, digits)
+        return IntegralResult('numeric', value, error, reason)
+
+    def quadrature(self, func, limits: Sequence[Limit], digits: int = _WORKING_DIGITS):
+        """Integra numéricamente con mpmath.quad; devuelve (valor, error estimado)"""
+        variables = [var for var, _, _ in limits]
+        parameters = func.free_symbols - set(variables)
+        if parameters:
+            names = ", ".join(sorted(str(symbol) for symbol in parameters))
+            raise ValueError(f"La función depende de parámetros sin valor ({names})")
+
+        # Los límites también se leen con la precisión de trabajo
+        with mpmath.workdps(max(digits, _WORKING_DIGITS)):
+            intervals = []
+            for var, lower, upper in limits:
+                bounds = []
+                for bound in (lower, upper):
+                    bound = sp.sympify(bound)
+                    if bound.free_symbols:
+                        raise ValueError(
+                            f"Los límites de {var} deben ser numéricos para la integración numérica"
+                        )
+                    bounds.append(self._mp_bound(bound))
+                intervals.append(bounds)
+
+            function = sp.lambdify(variables, func, 'mpmath')
+            value, error = mpmath.quad(function, *intervals, error=True)
+            if isinstance(value, mpmath.mpc) and abs(value.imag) <= max(error, mpmath.eps):
+                value = value.real
+        return value, float(error)
+
+    @staticmethod
+    def _mp_bound(bound):
+        if bound == sp.oo:
+            return mpmath.inf
+        if bound == -sp.oo:
+            return -mpmath.inf
+        return mpmath.mpf(str(sp.N(bound, mpmath.mp.dps)))
@@ -0,0 +1,550 @@
+import ast
+import json
+import numpy as np
+import sympy as sp
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.expression_lexer import ExpressionLexer
+
+# Las matrices numéricas con alguna dimensión mayor o igual a esta se calculan
+# con NumPy (BLAS/LAPACK); las más pequeñas con SymPy para conservar resultados exactos
+NUMPY_MIN_DIMENSION = 8
+
+# Funciones escalares permitidas dentro de las entradas de una matriz
+_SCALAR_FUNCTIONS = {
+    'sqrt': sp.sqrt, 'sin': sp.sin, 'cos': sp.cos, 'tan': sp.tan,
+    'exp': sp.exp, 'ln': sp.log, 'log': lambda value: sp.log(value, 10), 'abs': sp.Abs
+}
+_CONSTANTS = {'pi': sp.pi, 'e': sp.E}
+
+_BINARY_POWER = {'+': 10, '-': 10, '*': 20, '@': 20, '/': 20, '**': 40}
+_UNARY_POWER = 30
+
+
+# ==================== REPRESENTACIÓN ====================
+def is_matrix(value) -> bool:
+    return isinstance(value, (np.ndarray, sp.MatrixBase))
+
+
+def uses_numpy(value) -> bool:
+    return isinstance(value, np.ndarray)
+
+
+def _is_plain_number(value) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def make_matrix(rows: List[List[Any]]):
+    """Construye una matriz eligiendo NumPy o SymPy según su contenido y tamaño"""
+    if not rows or any(len(row) != len(rows[0]) for row in rows):
+        raise ValueError("Todas las filas de la matriz deben tener la misma longitud")
+    numeric = all(_is_plain_number(value) for row in rows for value in row)
+    if numeric and max(len(rows), len(rows[0])) >= NUMPY_MIN_DIMENSION:
+        return np.array(rows, dtype=float)
+    return sp.Matrix(rows)
+
+
+def to_numpy(matrix) -> Optional[np.ndarray]:
+    """Convierte a NumPy si todas las entradas son numéricas; si no, devuelve None"""
+    if isinstance(matrix, np.ndarray):
+        return matrix
+    if all(entry.is_number and entry.is_real for entry in matrix):
+        return np.array(matrix.evalf().tolist(), dtype=float)
+    return None
+
+
+def to_sympy(matrix):
+    if isinstance(matrix, np.ndarray):
+        return sp.Matrix(matrix.tolist())
+    return matrix
+
+
+def _common_backend(left, right):
+    """Lleva dos matrices al mismo motor (NumPy si ambas son numéricas)"""
+    if uses_numpy(left) == uses_numpy(right):
+        return left, right
+    numeric_left, numeric_right = to_numpy(left), to_numpy(right)
+    if numeric_left is not None and numeric_right is not None:
+        return numeric_left, numeric_right
+    return to_sympy(left), to_sympy(right)
+
+
+def _scalar_for(matrix, scalar):
+    """Adapta un escalar al motor de la matriz con la que se opera"""
+    if uses_numpy(matrix):
+        try:
+            return matrix, float(scalar)
+        except TypeError:
+            return to_sympy(matrix), sp.sympify(scalar)
+    return matrix, sp.sympify(scalar)
+
+
+def shape(matrix) -> Tuple[int, int]:
+    return matrix.shape if uses_numpy(matrix) else (matrix.rows, matrix.cols)
+
+
+def _require_square(matrix, operation):
+    rows, cols = shape(matrix)
+    if rows != cols:
+        raise ValueError(f"{operation} requiere una matriz cuadrada (es {rows}×{cols})")
+
+
+# ==================== OPERACIONES ====================
+def add(left, right, sign=1):
+    if is_matrix(left) != is_matrix(right):
+        raise ValueError("No se puede sumar una matriz y un escalar")
+    if not is_matrix(left):
+        return left + right if sign > 0 else left - right
+    left, right = _common_backend(left, right)
+    if shape(left) != shape(right):
+        raise ValueError(f"Dimensiones incompatibles para sumar: {_dims(left)} y {_dims(right)}")
+    return left + right if sign > 0 else left - right
+
+
+def multiply(left, right):
+    if is_matrix(left) and is_matrix(right):
+        left, right = _common_backend(left, right)
+        if shape(left)[1] != shape(right)[0]:
+            raise ValueError(f"Dimensiones incompatibles para multiplicar: {_dims(left)} y {_dims(right)}")
+        return left @ right if uses_numpy(left) else left * right
+    if is_matrix(left):
+        left, right = _scalar_for(left, right)
+    elif is_matrix(right):
+        right, left = _scalar_for(right, left)
+    return left * right
+
+
+def divide(left, right):
+    if is_matrix(right):
+        raise ValueError("No se puede dividir entre una matriz; use inv(B)")
+    if is_matrix(left):
+        left, right = _scalar_for(left, right)
+        return left / right
+    if right == 0:
+        raise ZeroDivisionError("División por cero")
+    return sp.Rational(left, right) if isinstance(left, int) and isinstance(right, int) else left / right
+
+
+def power(base, exponent):
+    if not is_matrix(base):
+        return sp.sympify(base) ** exponent
+    if exponent == 'T':
+        return transpose(base)
+    if is_matrix(exponent) or not _is_integer(exponent):
+        raise ValueError("Una matriz solo se puede elevar a una potencia entera o a T")
+    _require_square(base, "La potencia")
+    exponent = int(exponent)
+    if uses_numpy(base):
+        try:
+            return np.linalg.matrix_power(base, exponent)
+        except np.linalg.LinAlgError:
+            raise ValueError("La matriz es singular: no tiene potencias negativas")
+    if exponent < 0 and base.det() == 0:
+        raise ValueError("La matriz es singular: no tiene potencias negativas")
+    return base ** exponent
+
+
+def _is_integer(value) -> bool:
+    try:
+        return int(value) == value
+    except TypeError:
+        return False
+
+
+def transpose(matrix):
+    return matrix.T
+
+
+def determinant(matrix):
+    _require_square(matrix, "El determinante")
+    if uses_numpy(matrix):
+        # Con el logaritmo del determinante se evita el desbordamiento en matrices grandes
+        sign, log_det = np.linalg.slogdet(matrix)
+        if sign == 0:
+            return 0.0
+        if log_det < 700:
+            return float(sign * np.exp(log_det))
+        return sp.Float(sign) * sp.exp(sp.Float(log_det))
+    return matrix.det(method='bareiss')
+
+
+def inverse(matrix):
+    _require_square(matrix, "La inversa")
+    if uses_numpy(matrix):
+        try:
+            return np.linalg.inv(matrix)
+        except np.linalg.LinAlgError:
+            raise ValueError("La matriz es singular (no invertible)")
+    if matrix.det() == 0:
+        raise ValueError("La matriz es singular (no invertible)")
+    return matrix.inv()
+
+
+def rank(matrix) -> int:
+    if uses_numpy(matrix):
+        return int(np.linalg.matrix_rank(matrix))
+    return matrix.rank()
+
+
+def trace(matrix):
+    _require_square(matrix, "La traza")
+    return float(np.trace(matrix)) if uses_numpy(matrix) else matrix.trace()
+
+
+def is_singular(matrix) -> bool:
+    """Una matriz cuadrada es singular si su rango no es completo"""
+    return rank(matrix) < shape(matrix)[0]
+
+
+def solve(matrix, rhs):
+    """Resuelve A x = b"""
+    if not is_matrix(matrix) or not is_matrix(rhs):
+        raise ValueError("solve(A, b) requiere una matriz A y un vector o matriz b")
+    matrix, rhs = _common_backend(matrix, rhs)
+    if shape(matrix)[0] != shape(rhs)[0]:
+        raise ValueError(f"Dimensiones incompatibles: A es {_dims(matrix)} y b es {_dims(rhs)}")
+    if uses_numpy(matrix):
+        if shape(matrix)[0] == shape(matrix)[1]:
+            try:
+                return np.linalg.solve(matrix, rhs)
+            except np.linalg.LinAlgError:
+                raise ValueError("El sistema no tiene solución única (A es singular)")
+        # Sistema rectangular: solución por mínimos cuadrados
+        return np.linalg.lstsq(matrix, rhs, rcond=None)[0]
+    try:
+        solution, parameters = matrix.gauss_jordan_solve(rhs)
+    except ValueError:
+        raise ValueError("El sistema es inconsistente: no tiene solución")
+    return solution
+
+
+def _identity(size):
+    size = int(size)
+    if size >= NUMPY_MIN_DIMENSION:
+        return np.eye(size)
+    return sp.eye(size)
+
+
+_MATRIX_FUNCTIONS: Dict[str, Tuple[int, Callable]] = {
+    'det': (1, determinant),
+    'inv': (1, inverse),
+    'rank': (1, rank),
+    'rango': (1, rank),
+    'transpose': (1, transpose),
+    'trace': (1, trace),
+    'solve': (2, solve),
+    'eye': (1, _identity),
+    'Matrix': (1, lambda value: value),
+}
+
+
+def _dims(matrix) -> str:
+    rows, cols = shape(matrix)
+    return f"{rows}×{cols}"
+
+
+def format_value(value) -> str:
+    """Representación legible de un resultado (matriz o escalar)"""
+    if uses_numpy(value):
+        body = np.array2string(value, precision=6, suppress_small=True, threshold=400, max_line_width=110)
+        return f"{body}\n({_dims(value)}, calculada con NumPy)"
+    if isinstance(value, sp.MatrixBase):
+        return str(value)
+    if isinstance(value, (float, np.floating)):
+        return f"{float(value):.10g}"
+    return str(value)
+
+
+def describe(value) -> str:
+    """Descripción corta de un valor para los pasos"""
+    if is_matrix(value):
+        return f"matriz {_dims(value)} ({'NumPy' if uses_numpy(value) else 'SymPy'})"
+    return "escalar"
+
+
+def _literal_values(text: str) -> list:
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Números como ".5", "1." o "+2" no son JSON válido
+        return ast.literal_eval(text)
+
+
+def _numeric_literal(text: str):
+    """Construye una matriz literal numérica sin pasar por el parser"""
+    values = _literal_values(text)
+    if values and not isinstance(values[0], list):
+        values = [[value] for value in values]
+    return make_matrix(values)
+
+
+# ==================== LENGUAJE ====================
+class MatrixStatement:
+    def __init__(self, text: str, target: Optional[str], node: Callable[[Dict[str, Any]], Any], literal: bool):
+        self.text = text
+        self.target = target
+        self.node = node
+        self.literal = literal
+
+
+class MatrixProgram:
+    """
+    Programa de matrices ya compilado.
+
+    Se compone de sentencias separadas por ';' o saltos de línea, por ejemplo
+    "A = [[1,2],[3,4]]; b = [5,6]; solve(A, b)". El valor del programa es el
+    de la última sentencia.
+    """
+
+    def __init__(self, source: str, statements: List[MatrixStatement]):
+        self.source = source
+        self.statements = statements
+
+    @property
+    def is_single_literal(self) -> bool:
+        """Indica si la entrada es solo una matriz (modo de análisis clásico)"""
+        return len(self.statements) == 1 and self.statements[0].literal
+
+    def run(self):
+        """Ejecuta el programa y devuelve (valor final, [(sentencia, nombre, valor)])"""
+        env: Dict[str, Any] = {}
+        trace = []
+        value = None
+        for statement in self.statements:
+            value = statement.node(env)
+            if statement.target:
+                env[statement.target] = value
+            trace.append((statement.text, statement.target, value))
+        return value, trace
+
+
+class MatrixParser:
+    """Compila programas de matrices a closures, sin usar eval"""
+
+    def __init__(self, lexer: Optional[ExpressionLexer] = None):
+        self.lexer = lexer or ExpressionLexer()
+
+    def parse(self, source: str, tokens: Optional[List[Tuple[str, str]]] = None) -> MatrixProgram:
+        """Compila el programa; acepta los tokens ya calculados por el lexer"""
+        if tokens is None:
+            tokens = self.lexer.tokenize(source)
+        statements = []
+        for statement_tokens in self._split_statements(tokens):
+            statements.append(self._statement(statement_tokens))
+        if not statements:
+            raise ValueError("Expresión vacía")
+        return MatrixProgram(source, statements)
+
+    def _split_statements(self, tokens):
+        current, depth = [], 0
+        for kind, text in tokens:
+            if kind == 'op' and text in ('(', '['):
+                depth += 1
+            elif kind == 'op' and text in (')', ']'):
+                depth -= 1
+            separator = (kind == 'op' and text == ';') or (kind == 'space' and '\n' in text and depth == 0)
+            if separator:
+                if current:
+                    yield current
+                current = []
+            elif kind != 'space':
+                current.append((kind, text))
+        if current:
+            yield current
+
+    def _statement(self, tokens) -> MatrixStatement:
+        text = ' '.join(value for _, value in tokens)
+        target = None
+        if len(tokens) > 2 and tokens[0][0] == 'name' and tokens[1] == ('op', '='):
+            target = tokens[0][1]
+            tokens = tokens[2:]
+        parser = _StatementParser(tokens + [('end', '')])
+        node = parser.parse()
+        literal = target is None and parser.single_literal
+        return MatrixStatement(text, target, node, literal)
+
+
+class _StatementParser:
+    """Parser Pratt de una sentencia del lenguaje de matrices"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.operations = 0
+
+    @property
+    def single_literal(self) -> bool:
+        return self.operations == 0
+
+    def parse(self):
+        node = self._expression(0)
+        kind, value = self._peek()
+        if kind != 'end':
+            raise ValueError(f"Error de sintaxis cerca de '{value}'")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.position]
+
+    def _advance(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expect(self, value):
+        kind, current = self._advance()
+        if current != value:
+            raise ValueError(f"Se esperaba '{value}'" + (f" y se encontró '{current}'" if current else ""))
+
+    def _expression(self, right_binding_power):
+        left = self._prefix()
+        while True:
+            kind, value = self._peek()
+            if kind != 'op' or value not in _BINARY_POWER:
+                return left
+            binding_power = _BINARY_POWER[value]
+            if binding_power <= right_binding_power:
+                return left
+            self._advance()
+            self.operations += 1
+            if value == '**':
+                left = self._power(left)
+                continue
+            right = self._expression(binding_power)
+            left = self._binary(value, left, right)
+
+    def _binary(self, operator, left, right):
+        if operator == '+':
+            return lambda env: add(left(env), right(env))
+        if operator == '-':
+            return lambda env: add(left(env), right(env), sign=-1)
+        if operator in ('*', '@'):
+            return lambda env: multiply(left(env), right(env))
+        return lambda env: divide(left(env), right(env))
+
+    def _power(self, base):
+        if self._peek() == ('name', 'T'):
+            self._advance()
+            return lambda env: transpose(base(env))
+        exponent = self._expression(_BINARY_POWER['**'] - 1)
+        return lambda env: power(base(env), exponent(env))
+
+    def _prefix(self):
+        kind, value = self._advance()
+        if kind == 'number':
+            number = float(value) if any(c in value for c in '.eE') else int(value)
+            return lambda env: number
+        if kind == 'name':
+            return self._name(value)
+        if kind == 'matrix':
+            matrix = _numeric_literal(value)
+            return lambda env: matrix
+        if value == '[':
+            return self._literal()
+        if value == '(':
+            node = self._expression(0)
+            self._expect(')')
+            return node
+        if value == '-':
+            self.operations += 1
+            operand = self._expression(_UNARY_POWER)
+            return lambda env: multiply(-1, operand(env))
+        if value == '+':
+            return self._expression(_UNARY_POWER)
+        if kind == 'end':
+            raise ValueError("La expresión termina de forma inesperada")
+        raise ValueError(f"Error de sintaxis cerca de '{value}'")
+
+    def _arguments(self):
+        self._expect('(')
+        arguments = []
+        if self._peek() != ('op', ')'):
+            arguments.append(self._expression(0))
+            while self._peek() == ('op', ','):
+                self._advance()
+                arguments.append(self._expression(0))
+        self._expect(')')
+        return arguments
+
+    def _name(self, name):
+        if self._peek() == ('op', '('):
+            if name in _MATRIX_FUNCTIONS:
+                arity, function = _MATRIX_FUNCTIONS[name]
+                arguments = self._arguments()
+                if len(arguments) != arity:
+                    raise ValueError(f"{name}() recibe {arity} argumento(s)")
+                if name != 'Matrix':
+                    self.operations += 1
+                return lambda env: function(*(argument(env) for argument in arguments))
+            if name in _SCALAR_FUNCTIONS:
+                function = _SCALAR_FUNCTIONS[name]
+                arguments = self._arguments()
+                self.operations += 1
+                return lambda env: function(*(argument(env) for argument in arguments))
+            raise ValueError(f"Función desconocida: '{name}'")
+
+        if name in _CONSTANTS:
+            constant = _CONSTANTS[name]
+            return lambda env: constant
+        # Matriz definida antes en el programa o, si no existe, una variable simbólica
+        symbol = sp.Symbol(name)
+        return lambda env: env.get(name, symbol)
+
+    def _literal(self):
+        """Matriz literal: [[1,2],[3,4]] o un vector columna [1,2,3]"""
+        rows = []
+        if self._peek() == ('op', '[') or self._peek()[0] == 'matrix':
+            while True:
+                kind, value = self._peek()
+                if kind == 'matrix':
+                    # Fila numérica reconocida por el lexer como un solo token
+                    self._advance()
+                    rows.append([self._constant(number) for number in _literal_values(value)])
+                else:
+                    self._expect('[')
+                    rows.append(self._row())
+                if self._peek() != ('op', ','):
+                    break
+                self._advance()
+            self._expect(']')
+        else:
+            rows = [[entry] for entry in self._row()]
+
+        constants = [[getattr(entry, 'constant', None) for entry in row] for row in rows]
+        if all(value is not None for row in constants for value in row):
+            # Todas las entradas son números: la matriz se construye una sola vez
+            matrix = make_matrix(constants)
+            return lambda env: matrix
+        return lambda env: make_matrix([[entry(env) for entry in row] for row in rows])
+
+    def _row(self):
+        """Entradas de una fila hasta el ']' que la cierra"""
+        entries = []
+        if self._peek() != ('op', ']'):
+            while True:
+                entries.append(self._entry())
+                if self._peek() != ('op', ','):
+                    break
+                self._advance()
+        self._expect(']')
+        if not entries:
+            raise ValueError("La matriz tiene una fila vacía")
+        return entries
+
+    def _constant(self, number):
+        node = lambda env: number
+        node.constant = number
+        return node
+
+    def _entry(self):
+        negative = self._peek() == ('op', '-')
+        kind, value = self.tokens[self.position + negative]
+        following = self.tokens[self.position + negative + 1]
+        if kind == 'number' and following in (('op', ','), ('op', ']')):
+            # Número simple: caso habitual, sin construir un árbol
+            self.position += negative + 1
+            number = float(value) if any(c in value for c in '.eE') else int(value)
+            return self._constant(-number if negative else number)
+        operations = self.operations
+        node = self._expression(0)
+        self.operations = operations
+        return node
@@ -0,0 +1,298 @@
+import math
+import operator
+import re
+from fractions import Fraction
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from utils.expression_cache import ExpressionCache
+
+# Números (con decimales y notación científica), nombres, operadores y separadores
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+      | (?P<op>\*\*|[-+*/%^(),])
+    )""", re.VERBOSE)
+
+# Exponente entero a partir del cual la potencia deja de calcularse con enteros
+# exactos: evita que una entrada como 9^9^9 deje al evaluador ocupado minutos
+MAX_INTEGER_EXPONENT = 10000
+
+
+def _power(base, exponent):
+    """Potencia real; con exponentes enteros enormes se usa punto flotante"""
+    if (isinstance(base, int) and isinstance(exponent, int)
+            and exponent > MAX_INTEGER_EXPONENT and abs(base) > 1):
+        try:
+            return float(base) ** exponent
+        except OverflowError:
+            raise ValueError("Resultado demasiado grande")
+    return operator.pow(base, exponent)
+
+
+# Poder de enlace (binding power) de los operadores binarios
+_BINARY_OPERATORS = {
+    '+': (10, operator.add),
+    '-': (10, operator.sub),
+    '*': (20, operator.mul),
+    '/': (20, operator.truediv),
+    '%': (20, operator.mod),
+    '**': (40, _power),
+    '^': (40, _power),
+}
+_RIGHT_ASSOCIATIVE = {'**', '^'}
+
+
+def _exact_power(base, exponent):
+    """Potencia racional: solo se admiten exponentes enteros para no perder exactitud"""
+    if isinstance(exponent, Fraction) and exponent.denominator != 1:
+        raise ValueError("Exponente no entero: el resultado no es racional")
+    if abs(exponent) > MAX_INTEGER_EXPONENT and abs(base) not in (0, 1):
+        raise ValueError("Exponente demasiado grande para un resultado exacto")
+    return Fraction(base) ** int(exponent)
+
+
+# En modo exacto las potencias se mantienen dentro de los racionales
+_EXACT_OPERATORS = dict(_BINARY_OPERATORS)
+_EXACT_OPERATORS['**'] = (40, _exact_power)
+_EXACT_OPERATORS['^'] = (40, _exact_power)
+_UNARY_BINDING_POWER = 30
+
+
+class CompiledExpression:
+    """Expresión numérica compilada a un árbol de closures reutilizable"""
+
+    def __init__(self, source: str, evaluator: Callable[[Dict[str, Any]], Any], names: Tuple[str, ...]):
+        self.source = source
+        self.names = names
+        self._evaluator = evaluator
+
+    def __call__(self, env: Optional[Dict[str, Any]] = None):
+        return self._evaluator(env or {})
+
+
+class NumericEvaluator:
+    """
+    Evaluador numérico basado en un parser Pratt.
+
+    Compila una expresión una sola vez a un árbol de closures y la evalúa sin
+    usar eval ni SymPy. Los nombres se resuelven contra el registro de funciones
+    y constantes (por ejemplo, allowed_functions de operations); cualquier otro
+    nombre se busca en el entorno de variables que se pasa al evaluar y, si no
+    está, en el índice de constantes (constants), que se consulta en el momento
+    de evaluar para que una recarga no invalide las expresiones compiladas.
+
+    Con exact=True los números se leen como Fraction y el resultado es un
+    racional exacto; las expresiones con nombres o exponentes no enteros se
+    rechazan con ValueError para que el llamador use SymPy.
+
+    Con un contexto de mpmath (context) los números se leen como mpf de ese
+    contexto y se calcula con su precisión; functions debe ser entonces un
+    registro de funciones del mismo contexto (ver utils.precision).
+    """
+
+    def __init__(self, functions: Dict[str, Any], cache_size: int = 512, exact: bool = False,
+                 context=None, constants: Optional[Mapping[str, Any]] = None):
+        self.functions = functions
+        self.exact = exact
+        self.context = context
+        self.compiled_cache = ExpressionCache(cache_size)
+        self.set_constants(constants or {})
+
+    def set_constants(self, constants: Mapping[str, Any]):
+        """Reemplaza el índice de constantes (nombre -> valor), convertidas al tipo numérico del evaluador"""
+        self.constants = MappingProxyType({name: self._number(value) for name, value in constants.items()})
+
+    def _number(self, value):
+        if self.exact:
+            return Fraction(str(value))
+        if self.context is not None:
+            return self.context.mpf(str(value))
+        return float(value)
+
+    def _constant(self, name: str):
+        return self.constants[name]
+
+    def evaluate(self, expression: str, env: Optional[Dict[str, Any]] = None):
+        """Compila (o reutiliza) la expresión y devuelve su valor numérico"""
+        compiled = self.compile(expression)
+        try:
+            result = compiled(env)
+        except ZeroDivisionError:
+            raise ZeroDivisionError("División por cero")
+        except (ValueError, OverflowError, TypeError) as e:
+            raise ValueError(str(e))
+        return self._check_result(result)
+
+    def compile(self, expression: str) -> CompiledExpression:
+        """Devuelve la forma compilada de la expresión, usando la caché si es posible"""
+        key = expression.strip()
+        compiled = self.compiled_cache.get(key)
+        if compiled is None:
+            parser = _PrattParser(self._tokenize(key), self.functions, self.exact, self.context, self._constant)
+            evaluator = parser.parse()
+            compiled = CompiledExpression(key, evaluator, tuple(sorted(parser.names)))
+            self.compiled_cache.put(key, compiled)
+        return compiled
+
+    def _tokenize(self, expression: str) -> List[Tuple[str, str]]:
+        """Convierte la expresión en una lista de tokens (tipo, valor)"""
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = _TOKEN_PATTERN.match(expression, position)
+            if not match or match.end() == position:
+                raise ValueError(f"Carácter no permitido: '{expression[position:].strip()[:1]}'")
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+            position = match.end()
+        tokens.append(('end', ''))
+        return tokens
+
+    def _check_result(self, result):
+        """Verifica que el resultado sea un número finito"""
+        if self.exact and isinstance(result, (Fraction, int)) and not isinstance(result, bool):
+            return Fraction(result)
+        if self.context is not None and isinstance(result, (self.context.mpf, self.context.mpc, int)):
+            if isinstance(result, self.context.mpc):
+                raise ValueError("Resultado complejo")
+            if self.context.isinf(result):
+                raise ValueError("Resultado infinito")
+            if self.context.isnan(result):
+                raise ValueError("Resultado no válido")
+            return self.context.mpf(result)
+        if isinstance(result, bool) or not isinstance(result, (int, float)):
+            raise ValueError("Resultado no numérico")
+        if isinstance(result, float):
+            if math.isinf(result):
+                raise ValueError("Resultado infinito")
+            if math.isnan(result):
+                raise ValueError("Resultado no válido")
+        return result
+
+
+class _PrattParser:
+    """Parser de precedencia de operadores que produce closures"""
+
+    def __init__(self, tokens: List[Tuple[str, str]], functions: Dict[str, Any], exact: bool = False,
+                 context=None, constant: Optional[Callable[[str], Any]] = None):
+        self.tokens = tokens
+        self.position = 0
+        self.functions = functions
+        self.exact = exact
+        self.context = context
+        self.constant = constant
+        self.operators = _EXACT_OPERATORS if exact else _BINARY_OPERATORS
+        self.names = set()
+
+    def parse(self):
+        if self._peek() == ('end', ''):
+            raise ValueError("Expresión vacía")
+        node = self._expression(0)
+        kind, value = self._peek()
+        if kind != 'end':
+            raise ValueError(f"Error de sintaxis cerca de '{value}'")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.position]
+
+    def _advance(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expect(self, value):
+        kind, current = self._advance()
+        if current != value:
+            raise ValueError(f"Se esperaba '{value}'" + (f" y se encontró '{current}'" if current else ""))
+
+    def _expression(self, right_binding_power):
+        left = self._prefix()
+        while True:
+            kind, value = self._peek()
+            if kind != 'op' or value not in self.operators:
+                return left
+            binding_power, function = self.operators[value]
+            if binding_power <= right_binding_power:
+                return left
+            self._advance()
+            next_power = binding_power - 1 if value in _RIGHT_ASSOCIATIVE else binding_power
+            right = self._expression(next_power)
+            left = self._binary(function, left, right)
+
+    def _prefix(self):
+        kind, value = self._advance()
+        if kind == 'number':
+            if self.exact:
+                number = Fraction(value)
+            elif self.context is not None:
+                number = self.context.mpf(value)
+            else:
+                number = float(value) if any(c in value for c in '.eE') else int(value)
+            return lambda env: number
+        if kind == 'name':
+            if self.exact:
+                raise ValueError(f"'{value}' no es un número racional")
+            return self._name(value)
+        if value == '(':
+            node = self._expression(0)
+            self._expect(')')
+            return node
+        if value == '-':
+            operand = self._expression(_UNARY_BINDING_POWER)
+            return lambda env: -operand(env)
+        if value == '+':
+            return self._expression(_UNARY_BINDING_POWER)
+        if kind == 'end':
+            raise ValueError("La expresión termina de forma inesperada")
+        raise ValueError(f"Error de sintaxis cerca de '{value}'")
+
+    def _binary(self, function, left, right):
+        return lambda env: function(left(env), right(env))
+
+    def _name(self, name):
+        is_call = self._peek() == ('op', '(')
+        registered = self.functions.get(name)
+
+        if is_call:
+            if not callable(registered):
+                raise ValueError(f"Función desconocida: '{name}'")
+            self._advance()
+            arguments = []
+            if self._peek() != ('op', ')'):
+                arguments.append(self._expression(0))
+                while self._peek() == ('op', ','):
+                    self._advance()
+                    arguments.append(self._expression(0))
+            self._expect(')')
+            return self._call(registered, arguments)
+
+        if name in self.functions:
+            if callable(registered):
+                raise ValueError(f"La función '{name}' requiere argumentos entre paréntesis")
+            return lambda env: registered
+
+        # Variable: se resuelve en el entorno (o en el índice de constantes) al evaluar
+        self.names.add(name)
+        constant = self.constant
+
+        def lookup(env):
+            try:
+                return env[name]
+            except KeyError:
+                pass
+            if constant is not None:
+                try:
+                    return constant(name)
+                except KeyError:
+                    pass
+            raise ValueError(f"Variable no definida: '{name}'")
+        return lookup
+
+    def _call(self, function, arguments):
+        if len(arguments) == 1:
+            argument = arguments[0]
+            return lambda env: function(argument(env))
+        return lambda env: function(*(argument(env) for argument in arguments))
@@ -1,13 +1,47 @@
+import contextlib
+import contextvars
 import math
 import re
+import threading
+from types import MappingProxyType
+import mpmath
+import numpy as np
 import sympy as sp
 from sympy import symbols, Eq, solve, Matrix, diff, integrate, Rational, simplify, expand, factor
+from sympy.core.function import AppliedUndef
 from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
 from fractions import Fraction
+from utils.expression_cache import ExpressionCache
+from utils.expression_lexer import DEFAULT_FUNCTION_NAMES, ExpressionLexer
+from utils.function_compiler import FunctionCompiler
+from utils.matrix_engine import MatrixParser
+from utils import matrix_engine
+from utils.equation_solver import CLOSED_FORM_MAX_DEGREE, EquationSolver
+from utils.integration import DefiniteIntegrator
+from utils.numeric_evaluator import NumericEvaluator
+from utils.precision import NumericSettings, make_context, precise_constants, precise_functions
+from utils.simplification import TRANSFORM_LABELS, SimplificationStrategy
+from utils.system_solver import SystemSolver, sort_unknowns
+from utils.steps import DiscardedSteps, LazySteps
+from utils.symbol_table import SymbolTable, names_in
+
+# Decimales y notación del cálculo en curso. Es propio de cada hilo (y de cada
+# contexto), así varias llamadas simultáneas con distinta precisión no se mezclan
+_NUMERIC_SETTINGS = contextvars.ContextVar('numeric_settings', default=None)
 
 class operations:
-    def __init__(self):
-        """Inicializa la clase de operaciones matemáticas"""
+    # Tipos de operación cuyo resultado se guarda en la memoria persistente (usan SymPy)
+    MEMO_OPERATION_TYPES = ('symbolic', 'derivative', 'integral', 'equation', 'system', 'matrix')
+    
+    def __init__(self, cache=None, cache_size=256, result_store=None):
+        """
+        Inicializa la clase de operaciones matemáticas.
+
+        Args:
+            cache: Caché de expresiones analizadas compartida (opcional)
+            cache_size: Tamaño máximo de la caché propia si no se comparte una
+            result_store: Memoria persistente de resultados (ResultStore, opcional)
+        """
         self.allowed_functions = {
             'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
             'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
@@ -18,6 +52,24 @@ class operations:
             'factorial': math.factorial, 'degrees': math.degrees, 'radians': math.radians
         }
         
+        # Nombres que se escriben como llamadas: f(x) no es una multiplicación implícita
+        self.function_names = {name for name, value in self.allowed_functions.items() if callable(value)}
+        self.function_names.update(DEFAULT_FUNCTION_NAMES)
+        self.constant_names = {name for name, value in self.allowed_functions.items() if not callable(value)}
+        
+        # Evaluador numérico compilado que usa allowed_functions como registro
+        self.numeric_evaluator = NumericEvaluator(self.allowed_functions)
+        
+        # Evaluador racional exacto (Fraction) para las expresiones con fracciones
+        self.rational_evaluator = NumericEvaluator({}, exact=True)
+        
+        # Decimales y notación si la llamada no indica otros: cálculo con float
+        self.default_settings = NumericSettings()
+        
+        # Evaluadores de precisión arbitraria (mpmath) por dígitos de trabajo
+        self.precise_evaluators = {}
+        self._evaluators_lock = threading.Lock()
+        
         # Símbolos comunes para álgebra simbólica
         self.x, self.y, self.z = sp.symbols('x y z')
         self.t = sp.symbols('t')
@@ -32,111 +84,641 @@ class operations:
             "x°": "x^o",       # 'o' como placeholder para grados
             "□": "a",          # placeholder genérico
         }
+        
+        # Tokenizador que preprocesa y clasifica cada expresión en una sola pasada
+        self.lexer = ExpressionLexer(self.function_names, self.constant_names, self.symbol_templates)
+        
+        # Lenguaje de matrices (asignaciones, productos, potencias, solve)
+        self.matrix_parser = MatrixParser(self.lexer)
+
+        # Caché LRU de expresiones ya clasificadas y parseadas
+        self.expression_cache = cache if cache is not None else ExpressionCache(cache_size)
+        
+        # Funciones vectorizadas (lambdify a NumPy) por expresión y variables
+        self.lambdify_cache = ExpressionCache(128)
+        
+        # Variables y funciones del usuario, compiladas con su grafo de dependencias
+        self.symbol_table = SymbolTable(reserved=self.function_names | self.constant_names)
+        
+        # Funciones del usuario compiladas (Lambda y lambdify) por (id_funcion, ultima_modificacion)
+        self.function_compiler = FunctionCompiler(self._parse_definition)
+        # Variables y funciones tal como llegaron a set_definitions (para los procesos del pool)
+        self.definitions = ({}, {})
+        
+        # Constantes públicas y del usuario (constantes_publicas): nombre -> valor, de solo lectura
+        self.constants = MappingProxyType({})
+        
+        # Resultados guardados en disco entre sesiones
+        self.result_store = result_store
+        
+        # Simplificación según la estructura de la expresión, con presupuesto de tiempo
+        self.simplification = SimplificationStrategy()
+        
+        # Resolutor escalonado: fórmulas cerradas, matriz compañera o búsqueda numérica
+        self.equation_solver = EquationSolver()
+        
+        # Sistemas lineales (exactos, densos o dispersos) y no lineales con presupuesto
+        self.system_solver = SystemSolver()
+        
+        # Integrales definidas: SymPy con tiempo límite y cuadratura numérica de respaldo
+        self.integrator = DefiniteIntegrator()
+    
+    @property
+    def numeric_settings(self):
+        """Decimales y notación de la llamada en curso"""
+        return _NUMERIC_SETTINGS.get() or self.default_settings
+    
+    @contextlib.contextmanager
+    def numeric_context(self, settings):
+        """Calcula con los decimales y la notación indicados dentro del bloque (None = sin cambios)"""
+        if settings is None:
+            yield self.numeric_settings
+            return
+        token = _NUMERIC_SETTINGS.set(settings)
+        try:
+            yield settings
+        finally:
+            _NUMERIC_SETTINGS.reset(token)
+    
+    def _numeric_evaluator(self):
+        """Evaluador numérico para la precisión configurada (float salvo que se pidan más dígitos)"""
+        settings = self.numeric_settings
+        if not settings.uses_mpmath:
+            return self.numeric_evaluator
+        digits = settings.working_digits
+        with self._evaluators_lock:
+            evaluator = self.precise_evaluators.get(digits)
+            if evaluator is None:
+                context = make_context(digits)
+                evaluator = NumericEvaluator(precise_functions(context), context=context,
+                                             constants=precise_constants(context, self.constants))
+                self.precise_evaluators[digits] = evaluator
+        return evaluator
+    
+    def _format_decimal(self, value, preview=False):
+        """Valor decimal de un número exacto (Fraction o SymPy) según los decimales configurados"""
+        if not self.numeric_settings.is_default:
+            return self.numeric_settings.format(value)
+        if preview:
+            return f"{float(value):g}"
+        if isinstance(value, (Fraction, sp.Rational)):
+            return float(value)
+        return value.evalf()
+    
+    def set_definitions(self, variables, functions):
+        """
+        Compila las variables y funciones del usuario en la tabla de símbolos.
+
+        Args:
+            variables: nombre -> valor
+            functions: nombre -> (parámetros, cuerpo)
+
+        Solo se descartan las expresiones analizadas y las funciones vectorizadas
+        que usan un nombre afectado (el que cambió o uno que depende de él). La
+        memoria persistente no se toca: sus claves se calculan sobre la
+        expresión ya expandida, así que un valor nuevo da una clave nueva.
+        Devuelve los nombres afectados.
+        """
+        previous_functions = self.symbol_table.function_names
+        affected = self.symbol_table.update(variables, functions)
+        self.definitions = (dict(variables), dict(functions))
+        if self.symbol_table.function_names != previous_functions:
+            # El lexer debe reconocer f(x) como llamada y no como f*(x)
+            self._rebuild_lexer()
+        if affected:
+            self.expression_cache.discard(lambda key, entry: not affected.isdisjoint(entry['names']))
+            self.lambdify_cache.discard(lambda key, function: not affected.isdisjoint(names_in(key[0])))
+        return affected
+    
+    def set_constants(self, values):
+        """
+        Reemplaza el índice de constantes (nombre -> valor).
+
+        Los evaluadores numéricos lo consultan por nombre al evaluar, así que
+        un cálculo nunca va a la base de datos. Las constantes integradas (pi,
+        e) tienen prioridad y las variables del usuario se sustituyen antes.
+        En las expresiones simbólicas los nombres siguen siendo símbolos. Solo
+        se descartan las expresiones analizadas que usan una constante que
+        cambió; devuelve esos nombres.
+        """
+        constants = MappingProxyType({str(name): str(value) for name, value in values.items()})
+        previous = self.constants
+        changed = frozenset(name for name in set(previous) | set(constants)
+                            if previous.get(name) != constants.get(name))
+        if not changed:
+            return changed
+        
+        self.constants = constants
+        self.numeric_evaluator.set_constants(constants)
+        with self._evaluators_lock:
+            for evaluator in self.precise_evaluators.values():
+                evaluator.set_constants(precise_constants(evaluator.context, constants))
+        if set(previous) != set(constants):
+            # Una expresión con solo números y constantes es una operación básica
+            self._rebuild_lexer()
+        self.expression_cache.discard(lambda key, entry: not changed.isdisjoint(entry['names']))
+        return changed
+    
+    def _rebuild_lexer(self):
+        """Vuelve a crear el lexer con las funciones del usuario y las constantes del índice"""
+        function_names = self.function_names | self.symbol_table.function_names
+        constant_names = self.constant_names | (set(self.constants) - function_names)
+        self.lexer = ExpressionLexer(function_names, constant_names, self.symbol_templates)
+        self.matrix_parser = MatrixParser(self.lexer)
+    
+    def user_function(self, name):
+        """Función del usuario compilada (CompiledFunction); se compila la primera vez que se usa"""
+        definition = self.symbol_table.get(name)
+        if definition is None or not definition.is_function:
+            raise ValueError(f"'{name}' no es una función definida")
+        if definition.error:
+            raise ValueError(f"La definición de '{name}' no es válida: {definition.error}")
+        source = definition.instantiate(definition.parameters)
+        return self.function_compiler.get(definition.key, name, definition.parameters, source)
+    
+    def _parse_definition(self, source):
+        """Cuerpo de una función del usuario como expresión de SymPy"""
+        info = self.lexer.analyze(source)
+        return self._parse_symbolic(info.expression, info.explicit)[1]
+    
+    def expand_definitions(self, expression, keep_functions=False, bound=None):
+        """
+        Expresión con las variables y funciones del usuario sustituidas por su
+        definición. No se sustituyen las variables que la operación usa como
+        incógnita o como variable de derivación o integración (bound; si no se
+        indica se deduce de la expresión).
+        """
+        if bound is None:
+            bound = self._bound_names(expression)
+        return self.symbol_table.expand(expression, keep_functions, bound)
+    
+    def _bound_names(self, expression):
+        """
+        Variables del usuario que en esta expresión no representan su valor:
+        la variable de una derivada o una integral y, en una ecuación o un
+        sistema, las incógnitas que faltarían si se sustituyeran todas (se
+        prefiere x y luego el orden natural de los nombres).
+        """
+        defined = names_in(expression) & self.symbol_table.variable_names
+        if not defined:
+            return frozenset()
+        try:
+            info = self.lexer.analyze(expression)
+        except Exception:
+            return frozenset()
+        
+        text = info.expression
+        if info.type == 'derivative':
+            variables = ['x']
+            if 'derivative(' in text:
+                args = self._split_top_level(text[text.find('derivative(') + 11:text.rfind(')')])
+                if len(args) >= 2:
+                    variables = [args[1]]
+        elif info.type == 'integral':
+            variables = ['x']
+            for name in ('integral(', 'integrate('):
+                if name in text:
+                    rest = self._split_top_level(text[text.find(name) + len(name):text.rfind(')')])[1:]
+                    if rest:
+                        variables = rest[0::3]
+                    break
+        elif info.type in ('equation', 'system'):
+            if info.type == 'equation':
+                needed = 1
+            else:
+                needed = sum(1 for line in text.splitlines()
+                             for statement in self._split_top_level(line, ';') if statement)
+            unknowns = set(info.variables) - self.symbol_table.names
+            missing = needed - len(unknowns)
+            if missing <= 0:
+                return frozenset()
+            candidates = sort_unknowns(sp.Symbol(name) for name in defined & set(info.variables))
+            candidates.sort(key=lambda symbol: str(symbol) != 'x')
+            variables = [str(symbol) for symbol in candidates[:missing]]
+        else:
+            return frozenset()
+        return frozenset(variable.strip() for variable in variables) & defined
     
     def _preprocess_templates(self, expression):
         """
         Reemplaza los símbolos y plantillas especiales por su equivalente matemático.
         """
-        # Primero, reemplazar todos los símbolos definidos en self.symbol_templates
-        for symbol, replacement in self.symbol_templates.items():
-            expression = expression.replace(symbol, replacement)
+        return self.lexer.analyze(expression).expression
+    
+    # Nombre de cada tipo de expresión en los pasos de la simplificación
+    SIMPLIFICATION_KINDS = {
+        'polynomial': "polinómica",
+        'rational': "racional",
+        'trigonometric': "trigonométrica",
+        'general': "general"
+    }
+    
+    # Nombres aceptados para el infinito en los límites de integración
+    INTEGRAL_LIMIT_NAMES = {'inf': sp.oo, 'infinito': sp.oo, 'oo': sp.oo}
+    
+    # Tipos de operación que pueden tardar mucho y conviene ejecutar en un proceso aparte
+    HEAVY_OPERATION_TYPES = ('symbolic', 'integral', 'equation', 'system')
+    
+    def process_expression(self, expression, detailed=True, on_partial=None, settings=None):
+        """
+        Procesa y evalúa una expresión matemática con pasos específicos según el tipo.
 
-        # Reemplazar cuadros vacíos (□, ◻, etc.) por 'a' (o el placeholder que prefieras)
-        expression = expression.replace("□", "a")
-        expression = expression.replace("◻", "a")
+        Con detailed=False los manejadores solo calculan el resultado; los pasos se
+        devuelven como LazySteps y se generan únicamente si alguien los consulta.
+        on_partial, si se indica, recibe resultados parciales durante cálculos largos.
+        settings (NumericSettings) fija los decimales y la notación de esta llamada.
+        """
+        with self.numeric_context(settings) as settings:
+            return self._process_entry(self._get_entry(expression), detailed, on_partial, settings)
+    
+    def _process_entry(self, entry, detailed, on_partial, settings):
+        
+        # La memoria persistente se consulta antes de cualquier trabajo con SymPy
+        cached = self._cached_entry_result(entry, detailed)
+        if cached is not None:
+            return cached
+        
+        # Procesar con pasos específicos según el tipo detectado
+        handler = self._get_operation_handler(entry['type'])
+        result = handler(entry['expression'], parsed=entry['parsed'], detailed=detailed, on_partial=on_partial)
+        self._remember_entry_result(entry, result, result['steps'] if detailed else None)
+        
+        if not detailed and result['type'] != 'error':
+            result['steps'] = LazySteps(lambda: self._detailed_steps(handler, entry, settings))
+        return result
+    
+    def _detailed_steps(self, handler, entry, settings):
+        """Pasos completos de una entrada, con la precisión con la que se calculó"""
+        with self.numeric_context(settings):
+            return handler(entry['expression'], parsed=entry['parsed'], detailed=True)['steps']
+    
+    def cached_result(self, expression, detailed=False):
+        """Resultado guardado en la memoria persistente, o None si no existe"""
+        return self._cached_entry_result(self._get_entry(expression), detailed)
+    
+    def remember_result(self, expression, result):
+        """Guarda en la memoria persistente un resultado calculado en otro proceso"""
+        steps = result.get('steps')
+        steps = steps if isinstance(steps, list) else None
+        self._remember_entry_result(self._get_entry(expression), result, steps)
+    
+    def _memo_key(self, entry):
+        """Clave de la memoria persistente, o None si el tipo no se guarda"""
+        if self.result_store is None or entry['type'] not in self.MEMO_OPERATION_TYPES:
+            return None
+        settings = self.numeric_settings
+        canonical = entry['info'].canonical
+        if not settings.is_default:
+            # Los decimales configurados cambian el texto del resultado
+            canonical = f"{canonical}\0{settings.key}"
+        memo_keys = entry.setdefault('memo_keys', {})
+        if canonical not in memo_keys:
+            memo_keys[canonical] = self.result_store.make_key(canonical)
+        return memo_keys[canonical]
+    
+    def _cached_entry_result(self, entry, detailed):
+        key = self._memo_key(entry)
+        if key is None:
+            return None
+        cached = self.result_store.get(key, need_steps=detailed)
+        if cached is not None and cached['steps'] is None:
+            cached['steps'] = self.lazy_steps(entry['info'].source)
+        return cached
+    
+    def _remember_entry_result(self, entry, result, steps):
+        key = self._memo_key(entry)
+        if key is not None:
+            self.result_store.put(key, entry['info'].canonical, result, steps)
+    
+    def get_operation_type(self, expression):
+        """Devuelve el tipo de operación con el que se procesará la expresión"""
+        return self._get_entry(expression)['type']
+    
+    def is_heavy_operation(self, expression):
+        """Indica si la expresión requiere un cálculo simbólico potencialmente lento"""
+        return self.get_operation_type(expression) in self.HEAVY_OPERATION_TYPES
+    
+    def analyze(self, expression):
+        """Devuelve el análisis (tokens y clasificación) de la expresión"""
+        return self._get_entry(expression)['info']
+    
+    def lazy_steps(self, expression):
+        """Pasos detallados de la expresión, generados solo cuando se consultan"""
+        settings = self.numeric_settings
+        return LazySteps(lambda: self.process_expression(expression, settings=settings)['steps'])
 
-        # Reemplazar plantillas específicas con paréntesis vacíos por variables
-        # Ejemplo: x^() -> x^a, log_() -> log_a(x), sqrt() -> sqrt(x), root(,) -> root(a, x)
-        import re
-        expression = re.sub(r'x\^\(\)', 'x^a', expression)
-        expression = re.sub(r'log_\(\)', 'log_a(x)', expression)
-        expression = re.sub(r'sqrt\(\)', 'sqrt(x)', expression)
-        expression = re.sub(r'root\((,)?\)', 'root(a, x)', expression)
-        expression = re.sub(r'root\(([^,]+),([^)]+)\)', r'root(\1, \2)', expression)
+    # Tipos que la vista previa evalúa; el resto espera a CALCULAR
+    PREVIEW_OPERATION_TYPES = ('basic_operations', 'fraction')
 
-        # Reemplazar potencias ^ por **
-        import re
-        # Solo reemplaza ^ cuando está entre símbolos válidos para evitar errores
-        expression = re.sub(r'(\w)\^(\w|\()', r'\1**\2', expression)
+    def preview(self, expression, settings=None):
+        """
+        Vista previa de la expresión mientras se escribe.
 
-        return expression
+        Solo usa el lexer y los evaluadores numéricos (nunca SymPy), así que es
+        barata de repetir en cada pulsación. Devuelve un diccionario con
+        'status' ('empty', 'ok', 'incomplete', 'error' o 'pending') y 'message'.
+        """
+        if not expression or not expression.strip():
+            return {'status': 'empty', 'message': ""}
+
+        problem = self._parentheses_problem(expression.strip())
+        if problem:
+            # Falta cerrar: la expresión puede estar a medio escribir
+            status = 'incomplete' if problem.startswith("Falta") else 'error'
+            return {'status': status, 'message': f"⚠️ {problem}"}
+
+        # Sin pasar por la caché compartida: las expresiones a medio escribir no se guardan
+        try:
+            info = self.lexer.analyze(self.expand_definitions(self._normalize_input(expression)))
+        except ValueError as e:
+            return {'status': 'error', 'message': f"⚠️ {e}"}
+
+        if info.type not in self.PREVIEW_OPERATION_TYPES:
+            return {'status': 'pending', 'message': "ℹ️ Presione CALCULAR para el cálculo completo"}
+
+        cleaned = self._clean_expression(info.explicit)
+        with self.numeric_context(settings):
+            return self._preview_value(info, cleaned)
     
-    def process_expression(self, expression):
-        """Procesa y evalúa una expresión matemática con pasos específicos según el tipo"""
+    def _preview_value(self, info, cleaned):
+        try:
+            if info.type == 'fraction':
+                try:
+                    fraction = self.rational_evaluator.evaluate(cleaned)
+                    return {'status': 'ok', 'message': f"= {fraction} ≈ {self._format_decimal(fraction, preview=True)}"}
+                except ValueError:
+                    # Exponente fraccionario, por ejemplo: se intenta con números reales
+                    pass
+            value = self._numeric_evaluator().evaluate(cleaned)
+            return {'status': 'ok', 'message': f"= {self.numeric_settings.format(value)}"}
+        except ZeroDivisionError as e:
+            return {'status': 'error', 'message': f"❌ {e}"}
+        except ValueError as e:
+            status = 'incomplete' if "termina de forma inesperada" in str(e) else 'error'
+            return {'status': status, 'message': f"⚠️ {e}"}
+
+    def _get_entry(self, expression):
+        """Obtiene de la caché (o construye) la entrada analizada de una expresión"""
         if not expression or not expression.strip():
             raise ValueError("Expresión vacía")
         
-        # Símbolos y plantillas 
-        expression = self._preprocess_templates(expression.strip())
-        
-        # Detectar tipo de operación y procesar con pasos específicos
-        if self._is_equation(expression):
-            return self.solve_equation(expression)
-        elif self._is_matrix_operation(expression):
-            return self.process_matrix(expression)
-        elif self._is_derivative(expression):
-            return self.calculate_derivative(expression)
-        elif self._is_integral(expression):
-            return self.calculate_integral(expression)
-        elif self._is_fraction(expression):
-            return self.process_fraction(expression)
-        elif self._contains_variables(expression):
-            return self.process_symbolic(expression)
+        key = self._normalize_input(expression)
+        entry = self.expression_cache.get(key)
+        if entry is not None and not self.symbol_table.is_current(entry['names'], entry['generation']):
+            # Analizada con una definición que cambió mientras tanto
+            entry = None
+        if entry is None:
+            generation = self.symbol_table.generation
+            # Definiciones del usuario, símbolos, plantillas y clasificación
+            info = self.lexer.analyze(self.expand_definitions(key))
+            entry = {
+                'expression': info.expression,
+                'type': info.type,
+                'parsed': None,
+                'info': info,
+                # Nombres escritos: la entrada se descarta si cambia alguna definición que usan
+                'names': names_in(key),
+                'generation': generation
+            }
+            try:
+                entry['parsed'] = self._parse_for_type(info)
+            except Exception:
+                # Sin árbol parseado: el manejador volverá a parsear y reportará el error
+                pass
+            self.expression_cache.put(key, entry)
+        return entry
+    
+    def _new_steps(self, detailed):
+        """Crea la lista de pasos, o un colector vacío en modo solo resultado"""
+        return [] if detailed else DiscardedSteps()
+    
+    def _report_partial(self, on_partial, result_text, steps):
+        """Notifica un resultado parcial a quien lo haya solicitado"""
+        if on_partial:
+            on_partial({'result': result_text.strip() if result_text else None, 'steps': list(steps)})
+    
+    def _normalize_input(self, expression):
+        """Normaliza la entrada para usarla como clave de la caché"""
+        return re.sub(r'[ \t]+', ' ', expression.strip())
+    
+    def _get_operation_handler(self, operation_type):
+        """Devuelve el método que resuelve cada tipo de operación"""
+        return {
+            'equation': self.solve_equation,
+            'system': self.solve_system,
+            'matrix': self.process_matrix,
+            'derivative': self.calculate_derivative,
+            'integral': self.calculate_integral,
+            'fraction': self.process_fraction,
+            'symbolic': self.process_symbolic,
+            'basic_operations': self._process_basic_operations
+        }[operation_type]
+    
+    def _parse_for_type(self, info):
+        """Parsea la expresión según su tipo para poder reutilizar el resultado"""
+        expression, operation_type = info.expression, info.type
+        if operation_type == 'equation':
+            return self._parse_equation(expression, info.explicit)
+        elif operation_type == 'system':
+            return self._parse_system(expression, info.explicit)
+        elif operation_type == 'matrix':
+            return self._parse_matrix(expression, info.tokens)
+        elif operation_type == 'derivative':
+            return self._parse_derivative_expression(expression)
+        elif operation_type == 'integral':
+            return self._parse_integral_expression(expression)
+        elif operation_type == 'fraction':
+            return self._parse_fraction(info.explicit)
+        elif operation_type == 'symbolic':
+            return self._parse_symbolic(expression, info.explicit)
         else:
-            # Operaciones básicas (suma, resta, multiplicación, división)
-            return self._process_basic_operations(expression)
+            return self._clean_expression(info.explicit)
     
-    def _is_equation(self, expression):
-        """Verifica si es una ecuación (contiene =)"""
-        return '=' in expression and expression.count('=') == 1
+    # ==================== EVALUACIÓN VECTORIZADA ====================
+    def evaluate_over(self, expression, **arrays):
+        """
+        Evalúa una expresión simbólica sobre arreglos de valores (tabla de valores).
+
+        Args:
+            expression: Expresión en las variables x, y, z o t
+            **arrays: Valores de cada variable (escalares, listas o arreglos de NumPy)
+
+        Returns:
+            Un arreglo de NumPy con el valor de la expresión en cada punto
+        """
+        if not expression or not expression.strip():
+            raise ValueError("Expresión vacía")
+        if not arrays:
+            raise ValueError("Debe indicar los valores de al menos una variable")
+        
+        names = tuple(sorted(arrays))
+        key = (self._normalize_input(expression), names)
+        function = self.lambdify_cache.get(key)
+        if function is None:
+            # Las variables de la tabla no se sustituyen por una definición homónima
+            expr, compiled = self._vectorizable(key[0], frozenset(arrays))
+            missing = sorted(str(symbol) for symbol in expr.free_symbols if str(symbol) not in arrays)
+            if missing:
+                raise ValueError(f"Faltan valores para: {', '.join(missing)}")
+            function = sp.lambdify([sp.Symbol(name) for name in names], expr, modules=[compiled, 'numpy'])
+            self.lambdify_cache.put(key, function)
+        
+        values = [np.asarray(arrays[name], dtype=float) for name in names]
+        with np.errstate(all='ignore'):
+            result = np.asarray(function(*values), dtype=float)
+        # Las expresiones constantes devuelven un escalar: se extiende a la forma de la entrada
+        return np.array(np.broadcast_to(result, np.broadcast(*values).shape))
     
-    def _is_matrix_operation(self, expression):
-        """Verifica si es una operación con matrices"""
-        return '[' in expression and ']' in expression
+    def _vectorizable(self, expression, bound=frozenset()):
+        """
+        Expresión de SymPy para lambdify y las funciones del usuario que usa, ya
+        compiladas para NumPy: cada llamada evalúa el arreglo completo de una vez.
+        """
+        info = self.lexer.analyze(self.expand_definitions(expression, keep_functions=True, bound=bound))
+        calls = {name: sp.Function(name) for name in self.symbol_table.function_names}
+        _, expr = self._parse_symbolic(info.expression, info.explicit, local_dict=calls)
+        compiled = {}
+        for call in expr.atoms(AppliedUndef):
+            name = call.func.__name__
+            if name not in self.symbol_table:
+                continue
+            function = self.user_function(name)
+            if not function.is_numeric:
+                # Depende de nombres sin valor: expandida, la expresión informa cuáles faltan
+                info = self.lexer.analyze(self.expand_definitions(expression, bound=bound))
+                return self._parse_symbolic(info.expression, info.explicit)[1], {}
+            compiled[name] = function.vectorized
+        return expr, compiled
     
-    def _is_derivative(self, expression):
-        """Verifica si es una derivada"""
-        return any(keyword in expression.lower() for keyword in ['d/dx', 'derivative', 'diff'])
+    def get_cache_stats(self):
+        """Devuelve los contadores de la caché de expresiones"""
+        return self.expression_cache.stats()
     
-    def _is_integral(self, expression):
-        """Verifica si es una integral"""
-        return any(keyword in expression.lower() for keyword in ['integral', 'integrate', '∫'])
+    # ==================== EVALUACIÓN EN LOTE ====================
+    def split_batch(self, text):
+        """
+        Separa un texto con varias expresiones (una por línea).
+
+        Un programa de matrices y un sistema de ecuaciones usan los saltos de
+        línea como separador de sentencias, así que se conservan completos.
+        """
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if len(lines) > 1 and self.get_operation_type(text) in ('matrix', 'system'):
+            return [text.strip()]
+        return lines
     
-    def _is_fraction(self, expression):
-        """Verifica si es una fracción para procesar exactamente"""
-        return '/' in expression and not any(func in expression for func in ['sin', 'cos', 'log', 'sqrt'])
+    def process_many(self, expressions, workers=None, pool=None, detailed=True, on_result=None, settings=None,
+                     on_job=None):
+        """
+        Evalúa muchas expresiones en paralelo en un pool de procesos.
+
+        Args:
+            expressions: Lista de expresiones
+            workers: Procesos a usar si no se indica un pool (1 = en este proceso)
+            pool: ComputePool ya iniciado (por ejemplo, el de la aplicación)
+            detailed: Si se generan los pasos de cada resultado
+            on_result: Función on_result(indice, expresion, resultado) que se llama
+                       en cuanto termina cada expresión (desde otro hilo)
+            settings: Decimales y notación (NumericSettings) de todo el lote
+            on_job: Función on_job(trabajo) que recibe cada trabajo enviado al pool
+                    para poder cancelarlo (un trabajo cancelado se reporta como
+                    resultado 'cancelled')
+
+        Returns:
+            Los resultados en el mismo orden que las expresiones. Un error en una
+            expresión se reporta en su resultado sin detener el resto del lote.
+        """
+        expressions = list(expressions)
+        results = [None] * len(expressions)
+        pending = [len(expressions)]
+        lock = threading.Lock()
+        finished = threading.Event()
+        
+        def deliver(index, result):
+            results[index] = result
+            if on_result:
+                on_result(index, expressions[index], result)
+            with lock:
+                pending[0] -= 1
+                if pending[0] == 0:
+                    finished.set()
+        
+        if not expressions:
+            return results
+        
+        with self.numeric_context(settings):
+            if pool is None and (workers or 1) <= 1:
+                for index, expression in enumerate(expressions):
+                    deliver(index, self._process_batch_item(expression, detailed))
+                return results
+        
+            own_pool = pool is None
+            if own_pool:
+                from utils.compute_pool import ComputePool
+                pool = ComputePool(workers=workers)
+                pool.set_state(self.constants, self.definitions)
+            try:
+                for index, expression in enumerate(expressions):
+                    cached = self._batch_cached_result(expression, detailed)
+                    if cached is not None:
+                        deliver(index, cached)
+                        continue
+                    # Los procesos del pool tienen las mismas constantes y definiciones
+                    job = pool.submit(expression, detailed=detailed, settings=self.numeric_settings)
+                    job.add_done_callback(lambda job, index=index: deliver(index, self._job_result(job)))
+                    if on_job:
+                        on_job(job)
+                finished.wait()
+            finally:
+                if own_pool:
+                    pool.shutdown()
+            return results
+    
+    def _process_batch_item(self, expression, detailed):
+        """Procesa una expresión del lote convirtiendo cualquier excepción en resultado de error"""
+        try:
+            return self.process_expression(expression, detailed=detailed)
+        except Exception as e:
+            return self._error_result(str(e))
+    
+    def _batch_cached_result(self, expression, detailed):
+        try:
+            return self.cached_result(expression, detailed)
+        except Exception:
+            return None
+    
+    def _job_result(self, job):
+        try:
+            result = job.result()
+        except Exception as e:
+            return self._error_result(str(e))
+        # Se llama desde el hilo del pool: la clave de memoria usa la precisión del trabajo
+        with self.numeric_context(job.settings):
+            self.remember_result(job.expression, result)
+        return result
     
-    def _contains_variables(self, expression):
-        """Verifica si contiene variables (x, y, z, t)"""
-        return any(var in expression for var in ['x', 'y', 'z', 't']) and '=' not in expression
+    def _error_result(self, message):
+        return {
+            'result': f"❌ Error: {message}",
+            'steps': [f"❌ Error: {message}"],
+            'type': 'error'
+        }
     
     def _handle_implicit_multiplication(self, expression):
         """Maneja la multiplicación implícita en expresiones"""
-        patterns = [
-            (r'(\d)([a-zA-Z])', r'\1*\2'),
-            (r'(\d)\(', r'\1*('),
-            (r'([a-zA-Z])\(', r'\1*('),
-            (r'\)([a-zA-Z])', r')*\1'),
-            (r'\)(\d)', r')*\1'),
-            (r'\)\(', r')*('),
-        ]
-        
-        for pattern, replacement in patterns:
-            expression = re.sub(pattern, replacement, expression)
-        
-        return expression
+        return self.lexer.make_explicit(expression)
     
     # ==================== OPERACIONES BÁSICAS ====================
-    def _process_basic_operations(self, expression):
+    def _process_basic_operations(self, expression, parsed=None, detailed=True, on_partial=None):
         """Procesa operaciones básicas: suma, resta, multiplicación, división"""
+        steps = self._new_steps(detailed)
         try:
-            steps = []
             steps.append("🔢 OPERACIONES BÁSICAS")
             steps.append("=" * 40)
             steps.append(f"🎯 Expresión a calcular: {expression}")
             
             # Limpiar expresión
-            cleaned_expression = self._clean_expression(expression)
+            cleaned_expression = parsed if parsed is not None else self._clean_expression(expression)
             if cleaned_expression != expression:
                 steps.append(f"🔧 Expresión limpia: {cleaned_expression}")
             
@@ -149,8 +731,9 @@ class operations:
                 }
             
             # Detectar tipo de operación básica
-            operation_type = self._detect_basic_operation_type(cleaned_expression)
-            steps.append(f"📝 Tipo de operación: {operation_type}")
+            if detailed:
+                operation_type = self._detect_basic_operation_type(cleaned_expression)
+                steps.append(f"📝 Tipo de operación: {operation_type}")
             
             # Explicar orden de operaciones
             steps.append("📚 ORDEN DE OPERACIONES (PEMDAS/BODMAS):")
@@ -160,11 +743,11 @@ class operations:
             steps.append("   4️⃣ Suma y Resta (de izquierda a derecha)")
             
             # Mostrar pasos específicos según la operación
-            calculation_steps = self._explain_basic_calculation_steps(cleaned_expression)
-            steps.extend(calculation_steps)
+            if detailed:
+                steps.extend(self._explain_basic_calculation_steps(cleaned_expression))
             
             # Evaluar
-            result = self._safe_eval(self._replace_functions_and_constants(cleaned_expression))
+            result = self.numeric_settings.format(self._numeric_evaluator().evaluate(cleaned_expression))
             steps.append(f"✅ RESULTADO FINAL: {result}")
             
             return {
@@ -246,21 +829,25 @@ class operations:
         return steps
     
     # ==================== ÁLGEBRA SIMBÓLICA ====================
-    def process_symbolic(self, expression):
+    def _parse_symbolic(self, expression, explicit=None, local_dict=None):
+        """Aplica la multiplicación implícita y parsea una expresión simbólica"""
+        processed_expr = explicit if explicit is not None else self._handle_implicit_multiplication(expression)
+        transformations = standard_transformations + (implicit_multiplication_application,)
+        return processed_expr, parse_expr(processed_expr, local_dict=local_dict, transformations=transformations)
+    
+    def process_symbolic(self, expression, parsed=None, detailed=True, on_partial=None):
         """Procesa expresiones de álgebra simbólica"""
         try:
-            steps = []
+            steps = self._new_steps(detailed)
             steps.append("🎭 ÁLGEBRA SIMBÓLICA")
             steps.append("=" * 40)
             steps.append(f"🎯 Expresión simbólica: {expression}")
             
             # Manejar multiplicación implícita
-            processed_expr = self._handle_implicit_multiplication(expression)
+            processed_expr, expr = parsed if parsed is not None else self._parse_symbolic(expression)
             if processed_expr != expression:
                 steps.append(f"📝 Multiplicación explícita: {processed_expr}")
             
-            transformations = standard_transformations + (implicit_multiplication_application,)
-            expr = parse_expr(processed_expr, transformations=transformations)
             steps.append(f"✅ Expresión procesada: {expr}")
             
             result_text = f"📝 Expresión original: {expr}\n"
@@ -268,44 +855,60 @@ class operations:
             # Análisis paso a paso
             steps.append("📚 ANÁLISIS ALGEBRAICO:")
             
+            # Simplificar, expandir y factorizar en paralelo con la estrategia más barata
+            report = self.simplification.run(expr)
+            steps.append(f"🧭 Estrategia: expresión {self.SIMPLIFICATION_KINDS[report.kind]}"
+                         f" → {report.routines['simplify']}, expand, factor")
+            
             # 1. Simplificar
             steps.append("1️⃣ SIMPLIFICACIÓN:")
-            simplified = simplify(expr)
-            if simplified != expr:
-                steps.append(f"   ✨ Aplicamos reglas algebraicas: {expr} → {simplified}")
+            simplified = report.get('simplify')
+            if simplified is not None and simplified != expr:
+                steps.append(f"   ✨ Aplicamos reglas algebraicas ({report.routines['simplify']}): {expr} → {simplified}")
                 steps.append(f"   💡 Combinamos términos semejantes y reducimos fracciones")
                 result_text += f"✨ Simplificada: {simplified}\n"
-            else:
+            elif simplified is not None:
                 steps.append("   ℹ️ La expresión ya está en su forma más simple")
+            else:
+                steps.append(self._transform_unavailable(report, 'simplify'))
+            self._report_partial(on_partial, result_text, steps)
             
             # 2. Expandir
             steps.append("2️⃣ EXPANSIÓN:")
-            expanded = expand(expr)
-            if expanded != expr:
+            expanded = report.get('expand')
+            if expanded is not None and expanded != expr:
                 steps.append(f"   📈 Desarrollamos productos: {expr} → {expanded}")
                 steps.append(f"   💡 Aplicamos propiedad distributiva: a(b+c) = ab + ac")
                 result_text += f"📈 Expandida: {expanded}\n"
-            else:
+            elif expanded is not None:
                 steps.append("   ℹ️ No hay productos que expandir")
+            else:
+                steps.append(self._transform_unavailable(report, 'expand'))
+            self._report_partial(on_partial, result_text, steps)
             
             # 3. Factorizar
             steps.append("3️⃣ FACTORIZACIÓN:")
-            try:
-                factored = factor(expr)
-                if factored != expr:
-                    steps.append(f"   🔧 Factorizamos: {expr} → {factored}")
-                    steps.append(f"   💡 Encontramos factores comunes o aplicamos fórmulas")
-                    result_text += f"🔧 Factorizada: {factored}\n"
-                else:
-                    steps.append("   ℹ️ No se puede factorizar más")
-            except:
-                steps.append("   ⚠️ No se pudo factorizar esta expresión")
+            factored = report.get('factor')
+            if factored is not None and factored != expr:
+                steps.append(f"   🔧 Factorizamos: {expr} → {factored}")
+                steps.append(f"   💡 Encontramos factores comunes o aplicamos fórmulas")
+                result_text += f"🔧 Factorizada: {factored}\n"
+            elif factored is not None:
+                steps.append("   ℹ️ No se puede factorizar más")
+            else:
+                steps.append(self._transform_unavailable(report, 'factor'))
+            
+            if report.skipped:
+                omitted = ", ".join(TRANSFORM_LABELS[name] for name in report.skipped)
+                steps.append(f"⏱️ Omitidas por tiempo ({self.simplification.budget:g} s): {omitted}")
+                result_text += f"⏱️ Omitidas por tiempo: {omitted}\n"
+            self._report_partial(on_partial, result_text, steps)
             
             # 4. Evaluación numérica
             steps.append("4️⃣ EVALUACIÓN NUMÉRICA:")
             try:
                 if not expr.has(sp.Symbol):
-                    numeric_value = expr.evalf()
+                    numeric_value = self._format_decimal(expr)
                     steps.append(f"   🔢 Valor numérico: {numeric_value}")
                     result_text += f"🔢 Valor numérico: {numeric_value}"
                 else:
@@ -316,7 +919,9 @@ class operations:
             return {
                 'result': result_text.strip(),
                 'steps': steps,
-                'type': 'symbolic'
+                'type': 'symbolic',
+                # Con transformaciones omitidas el resultado no se guarda en la memoria
+                'incomplete': bool(report.skipped)
             }
             
         except Exception as e:
@@ -326,17 +931,23 @@ class operations:
                 'type': 'error'
             }
     
+    def _transform_unavailable(self, report, name):
+        """Paso que explica por qué no hay resultado de una transformación"""
+        if name in report.skipped:
+            return f"   ⏱️ Omitida: no terminó dentro del presupuesto de {self.simplification.budget:g} s"
+        return f"   ⚠️ No se pudo aplicar la {TRANSFORM_LABELS[name]}: {report.errors.get(name, '')}".rstrip(': ')
+    
     # ==================== DERIVADAS E INTEGRALES ====================
-    def calculate_derivative(self, expression):
+    def calculate_derivative(self, expression, parsed=None, detailed=True, on_partial=None):
         """Calcula derivadas con pasos detallados de cálculo"""
         try:
-            steps = []
+            steps = self._new_steps(detailed)
             steps.append("📐 CÁLCULO DE DERIVADAS")
             steps.append("=" * 40)
             steps.append(f"🎯 Expresión a derivar: {expression}")
             
             # Procesar formato
-            func, var = self._parse_derivative_expression(expression)
+            func, var = parsed if parsed is not None else self._parse_derivative_expression(expression)
             steps.append(f"📝 Función: f({var}) = {func}")
             steps.append(f"🔍 Variable de derivación: {var}")
             
@@ -348,17 +959,17 @@ class operations:
             
             # Aplicar reglas paso a paso
             steps.append("📐 REGLAS DE DERIVACIÓN:")
-            derivative_steps = self._explain_derivative_rules_detailed(func)
-            steps.extend(derivative_steps)
+            if detailed:
+                steps.extend(self._explain_derivative_rules_detailed(func))
             
             # Calcular resultado
             derivative = diff(func, var)
             steps.append(f"✅ RESULTADO: f'({var}) = {derivative}")
             
             # Verificar reglas aplicadas
-            steps.append("🔍 VERIFICACIÓN:")
-            verification_steps = self._verify_derivative_rules(func, derivative)
-            steps.extend(verification_steps)
+            if detailed:
+                steps.append("🔍 VERIFICACIÓN:")
+                steps.extend(self._verify_derivative_rules(func, derivative))
             
             return {
                 'result': f"📐 Derivada: {derivative}",
@@ -373,17 +984,21 @@ class operations:
                 'type': 'error'
             }
     
-    def calculate_integral(self, expression):
+    def calculate_integral(self, expression, parsed=None, detailed=True, on_partial=None):
         """Calcula integrales con pasos detallados"""
         try:
-            steps = []
+            steps = self._new_steps(detailed)
             steps.append("∫ CÁLCULO DE INTEGRALES")
             steps.append("=" * 40)
             steps.append(f"🎯 Expresión a integrar: {expression}")
             
             # Procesar formato
-            func, var = self._parse_integral_expression(expression)
-            steps.append(f"📝 Función: f({var}) = {func}")
+            func, limits = parsed if parsed is not None else self._parse_integral_expression(expression)
+            variables = ", ".join(str(limit[0]) for limit in limits)
+            steps.append(f"📝 Función: f({variables}) = {func}")
+            if all(len(limit) == 3 for limit in limits):
+                return self._calculate_definite_integral(func, limits, steps, detailed, on_partial)
+            var = limits[0][0]
             steps.append(f"🔍 Variable de integración: {var}")
             
             # Explicar concepto
@@ -394,20 +1009,22 @@ class operations:
             
             # Aplicar reglas paso a paso
             steps.append("∫ REGLAS DE INTEGRACIÓN:")
-            integral_steps = self._explain_integration_rules_detailed(func)
-            steps.extend(integral_steps)
+            if detailed:
+                steps.extend(self._explain_integration_rules_detailed(func))
             
             # Calcular resultado
+            self._report_partial(on_partial, None, steps)
             integral_result = integrate(func, var)
             steps.append(f"✅ RESULTADO: ∫f({var})d{var} = {integral_result} + C")
             steps.append("📝 NOTA: Siempre agregamos la constante C en integrales indefinidas")
             
             # Verificar por derivación
-            steps.append("🔍 VERIFICACIÓN (derivando el resultado):")
-            verification = diff(integral_result, var)
-            steps.append(f"   d/d{var}[{integral_result}] = {verification}")
-            if simplify(verification - func) == 0:
-                steps.append("   ✅ Verificación exitosa: la derivada coincide con la función original")
+            if detailed:
+                steps.append("🔍 VERIFICACIÓN (derivando el resultado):")
+                verification = diff(integral_result, var)
+                steps.append(f"   d/d{var}[{integral_result}] = {verification}")
+                if simplify(verification - func) == 0:
+                    steps.append("   ✅ Verificación exitosa: la derivada coincide con la función original")
             
             return {
                 'result': f"∫ Integral: {integral_result} + C",
@@ -422,6 +1039,64 @@ class operations:
                 'type': 'error'
             }
     
+    def _format_limit(self, bound):
+        """Muestra un límite de integración (∞ en lugar de oo)"""
+        return str(bound).replace('oo', '∞')
+    
+    def _calculate_definite_integral(self, func, limits, steps, detailed, on_partial):
+        """Integral definida: SymPy con tiempo límite y, si no alcanza, cuadratura numérica"""
+        for var, lower, upper in limits:
+            steps.append(f"🔍 {var} desde {self._format_limit(lower)} hasta {self._format_limit(upper)}")
+        improper = any(sp.sympify(bound).has(sp.oo, -sp.oo) for _, lower, upper in limits for bound in (lower, upper))
+        
+        if detailed:
+            steps.append("📚 CONCEPTO DE INTEGRAL DEFINIDA:")
+            steps.append("   💡 Es el área con signo bajo la curva entre los límites")
+            if len(limits) == 1:
+                steps.append("   📖 Regla de Barrow: ∫ₐᵇ f(x) dx = F(b) − F(a), con F' = f")
+            else:
+                steps.append(f"   📖 Integral múltiple: se integra primero en {limits[0][0]} y luego en las demás variables")
+            if improper:
+                steps.append("   ♾️ Integral impropia: algún límite es infinito y se toma como un límite")
+        
+        steps.append(f"🧭 Intento simbólico (máximo {self.integrator.budget:g} s)")
+        self._report_partial(on_partial, None, steps)
+        settings = self.numeric_settings
+        outcome = self.integrator.integrate(func, limits, digits=settings.working_digits)
+        value = outcome.value
+        
+        if outcome.is_numeric:
+            steps.append(f"   ⏭️ {outcome.reason}: se usa {outcome.description}")
+        else:
+            steps.append(f"   ✅ Resuelta con {outcome.description}")
+        
+        if outcome.diverges:
+            steps.append(f"♾️ RESULTADO: {self._format_limit(value)} (valor infinito o indeterminado)")
+            steps.append("   💡 El área no es finita: la integral no converge")
+            result_text = "♾️ La integral diverge"
+        elif outcome.is_numeric:
+            if not settings.is_default:
+                detail = shown = settings.format(value)
+            else:
+                detail, shown = mpmath.nstr(value, 15), mpmath.nstr(value, 12)
+            steps.append(f"✅ RESULTADO NUMÉRICO: {detail}")
+            steps.append(f"📏 Error estimado: ± {outcome.error:.2g}")
+            result_text = f"∫ Integral definida ≈ {shown} (± {outcome.error:.2g})"
+        else:
+            steps.append(f"✅ RESULTADO: {value}")
+            result_text = f"∫ Integral definida: {value}"
+            if value.is_number and not value.is_Integer:
+                approximation = self._format_decimal(value) if not settings.is_default else sp.N(value, 12)
+                steps.append(f"🔢 Valor aproximado: {approximation}")
+                result_text += f" ≈ {approximation}"
+        result_text += f"\n🧭 Método: {outcome.description}"
+        
+        return {
+            'result': result_text,
+            'steps': steps,
+            'type': 'integral'
+        }
+    
     def _explain_derivative_rules_detailed(self, func):
         """Explica las reglas de derivación con detalle paso a paso"""
         steps = []
@@ -546,49 +1221,92 @@ class operations:
             return parse_expr(expression), self.x
     
     def _parse_integral_expression(self, expression):
-        """Parsea expresiones de integral para extraer función y variable"""
-        if 'integral(' in expression:
-            start = expression.find('integral(') + 9
-            end = expression.rfind(')')
-            args = expression[start:end].split(',')
-            if len(args) >= 2:
-                return parse_expr(args[0].strip()), symbols(args[1].strip())
-            else:
-                return parse_expr(args[0].strip()), self.x
-        elif 'integrate(' in expression:
-            start = expression.find('integrate(') + 10
-            end = expression.rfind(')')
-            func_str = expression[start:end]
-            return parse_expr(func_str), self.x
+        """
+        Parsea expresiones de integral: devuelve la función y sus límites.
+
+        Los límites son tuplas (variable,) para una integral indefinida o
+        (variable, a, b) para una definida: integral(f, x, a, b[, y, c, d, ...]).
+        """
+        for name in ('integral(', 'integrate('):
+            if name in expression:
+                start = expression.find(name) + len(name)
+                end = expression.rfind(')')
+                args = self._split_top_level(expression[start:end])
+                break
         else:
-            return parse_expr(expression), self.x
+            return parse_expr(expression), [(self.x,)]
+        
+        func = parse_expr(args[0], local_dict=self.INTEGRAL_LIMIT_NAMES)
+        rest = args[1:]
+        if not rest:
+            return func, [(self.x,)]
+        if len(rest) == 1:
+            return func, [(symbols(rest[0]),)]
+        if len(rest) % 3 != 0:
+            raise ValueError("Use integral(f, x) o integral(f, x, a, b[, y, c, d])")
+        limits = []
+        for index in range(0, len(rest), 3):
+            var, lower, upper = rest[index:index + 3]
+            limits.append((
+                symbols(var),
+                parse_expr(lower, local_dict=self.INTEGRAL_LIMIT_NAMES),
+                parse_expr(upper, local_dict=self.INTEGRAL_LIMIT_NAMES)
+            ))
+        return func, limits
     
     # ==================== ECUACIONES ====================
-    def solve_equation(self, equation):
+    def _split_top_level(self, text, separator=','):
+        """Separa el texto por el separador, ignorando el que está dentro de paréntesis o corchetes"""
+        parts, current, depth = [], [], 0
+        for char in text:
+            if char in '([{':
+                depth += 1
+            elif char in ')]}':
+                depth -= 1
+            if char == separator and depth == 0:
+                parts.append(''.join(current).strip())
+                current = []
+            else:
+                current.append(char)
+        parts.append(''.join(current).strip())
+        return parts
+    
+    def _parse_equation(self, equation, explicit=None):
+        """Separa y parsea ambos lados de una ecuación y el intervalo opcional: 'ecuación, a, b'"""
+        processed_eq = explicit if explicit is not None else self._handle_implicit_multiplication(equation)
+        parts = self._split_top_level(processed_eq)
+        interval = None
+        if len(parts) == 3:
+            processed_eq = parts[0]
+            interval = (float(parse_expr(parts[1]).evalf()), float(parse_expr(parts[2]).evalf()))
+        elif len(parts) != 1:
+            raise ValueError("Para indicar el intervalo de búsqueda use: ecuación, a, b")
+        left_side, right_side = processed_eq.split('=')
+        transformations = standard_transformations + (implicit_multiplication_application,)
+        left_expr = parse_expr(left_side, transformations=transformations)
+        right_expr = parse_expr(right_side, transformations=transformations)
+        return processed_eq, left_side, right_side, left_expr, right_expr, interval
+    
+    def solve_equation(self, equation, parsed=None, detailed=True, on_partial=None):
         """Resuelve ecuaciones con pasos matemáticos detallados"""
         try:
-            steps = []
+            steps = self._new_steps(detailed)
             steps.append("⚖️ RESOLUCIÓN DE ECUACIONES")
             steps.append("=" * 40)
             steps.append(f"🎯 Ecuación a resolver: {equation}")
             
-            # Procesar multiplicación implícita
-            processed_eq = self._handle_implicit_multiplication(equation)
+            # Procesar multiplicación implícita, separar lados y convertir a expresiones simbólicas
+            processed_eq, left_side, right_side, left_expr, right_expr, interval = (
+                parsed if parsed is not None else self._parse_equation(equation)
+            )
             if processed_eq != equation:
                 steps.append(f"📝 Multiplicación explícita: {processed_eq}")
             
-            # Separar lados
-            left_side, right_side = processed_eq.split('=')
             steps.append(f"🔍 Lado izquierdo: {left_side}")
             steps.append(f"🔍 Lado derecho: {right_side}")
             
-            # Convertir a expresiones simbólicas
-            transformations = standard_transformations + (implicit_multiplication_application,)
-            left_expr = parse_expr(left_side, transformations=transformations)
-            right_expr = parse_expr(right_side, transformations=transformations)
-            
             eq = Eq(left_expr, right_expr)
-            variables = list(eq.free_symbols)
+            variables = sorted(eq.free_symbols, key=str)
             
             if not variables:
                 # Verificación de igualdad numérica
@@ -599,46 +1317,86 @@ class operations:
                 result = "✅ La igualdad es verdadera" if left_val == right_val else "❌ La igualdad es falsa"
                 return {'result': result, 'steps': steps, 'type': 'verification'}
             
-            steps.append(f"🎯 Variable a encontrar: {variables[0]}")
+            # Se prefiere x; si no aparece, la primera variable en orden alfabético
+            var = self.x if self.x in variables else variables[0]
+            steps.append(f"🎯 Variable a encontrar: {var}")
             
-            # Clasificar y resolver según el tipo
-            var = variables[0]
-            equation_type = self._classify_equation_type(left_expr, var)
-            steps.append(f"📚 Tipo de ecuación: {equation_type}")
+            # Una sola resolución: la usan la explicación y el resultado final
+            self._report_partial(on_partial, None, steps)
+            solution = self.equation_solver.solve(left_expr - right_expr, var, interval,
+                                                   digits=self.numeric_settings.working_digits)
             
-            # Resolver paso a paso según el tipo
-            if equation_type == "LINEAL":
-                solution_steps = self._solve_linear_detailed(left_expr, right_expr, var)
-            elif equation_type == "CUADRÁTICA":
-                solution_steps = self._solve_quadratic_detailed(left_expr, right_expr, var)
-            else:
-                solution_steps = self._solve_general_detailed(left_expr, right_expr, var)
-            
-            steps.extend(solution_steps)
-            
-            # Obtener solución
-            sols = solve(eq, var)
-            if sols:
-                sol_value = sols[0]
-                result_text = f"🎉 SOLUCIÓN: {var} = {sol_value}"
-                if sol_value.is_rational and sol_value.q != 1:
-                    result_text += f" = {float(sol_value)}"
+            if detailed:
+                equation_type = self._classify_equation_type(left_expr - right_expr, var)
+                steps.append(f"📚 Tipo de ecuación: {equation_type}")
+                steps.append(f"🧭 Método: {solution.description}")
                 
-                # Verificación
-                steps.append("🔍 VERIFICACIÓN DE LA SOLUCIÓN:")
-                verification = left_expr.subs(var, sol_value)
-                steps.append(f"   Sustituyendo {var} = {sol_value} en el lado izquierdo:")
-                steps.append(f"   {left_expr.subs(var, sol_value)} = {verification.evalf()}")
-                steps.append(f"   Lado derecho: {right_expr.evalf()}")
-                steps.append("   ✅ La solución es correcta" if verification.evalf() == right_expr.evalf() else "   ❌ Error en la solución")
+                if equation_type == "LINEAL" and solution.roots:
+                    solution_steps = self._solve_linear_detailed(left_expr, right_expr, var, solution)
+                elif equation_type == "CUADRÁTICA":
+                    solution_steps = self._solve_quadratic_detailed(left_expr, right_expr, var, solution)
+                else:
+                    solution_steps = self._solve_general_detailed(left_expr, right_expr, var, solution)
                 
+                steps.extend(solution_steps)
+            
+            if not solution.roots:
+                if solution.method == 'bracketing':
+                    low, high = solution.interval
+                    result_text = f"❌ No se encontraron raíces reales en [{low:g}, {high:g}]"
+                else:
+                    result_text = "❌ No hay soluciones"
                 return {'result': result_text, 'steps': steps, 'type': 'equation'}
-            else:
-                return {'result': "❌ No hay soluciones", 'steps': steps, 'type': 'equation'}
+            
+            result_text = self._format_solutions(var, solution)
+            
+            # Verificación
+            if detailed:
+                steps.append("🔍 VERIFICACIÓN DE LA SOLUCIÓN:")
+                for value, exact in zip(solution.values[:10], solution.exact):
+                    verification = left_expr.subs(var, value)
+                    residual = sp.N(verification - right_expr.subs(var, value))
+                    steps.append(f"   Sustituyendo {var} = {self._format_root(value, exact)} en el lado izquierdo:")
+                    steps.append(f"   {verification} = {sp.N(verification)}")
+                    steps.append(f"   Lado derecho: {sp.N(right_expr.subs(var, value))}")
+                    correct = residual.is_number and abs(complex(residual)) < 1e-8
+                    steps.append("   ✅ La solución es correcta" if correct else "   ❌ Error en la solución")
+                if len(solution.roots) > 10:
+                    steps.append(f"   ... {len(solution.roots) - 10} soluciones más")
+            
+            return {'result': result_text, 'steps': steps, 'type': 'equation'}
                 
         except Exception as e:
             return {'result': f"❌ Error: {str(e)}", 'steps': [f"❌ Error: {str(e)}"], 'type': 'error'}
     
+    def _format_root(self, value, exact):
+        """Texto de una raíz: exacta con su equivalente decimal o numérica redondeada"""
+        settings = self.numeric_settings
+        if not exact:
+            return settings.format(value) if not settings.is_default else str(sp.N(value, 12))
+        if value.is_rational and value.q != 1:
+            return f"{value} = {self._format_decimal(value)}"
+        if (value.is_number and not value.is_rational and not value.has(sp.Float)
+                and not (value / sp.I).is_rational):
+            approximation = self._format_decimal(value) if not settings.is_default else sp.N(value, 10)
+            return f"{value} ≈ {approximation}"
+        return str(value)
+    
+    def _format_solutions(self, var, solution):
+        """Texto del resultado con todas las raíces y su multiplicidad"""
+        if len(solution.roots) == 1 and solution.roots[0][1] == 1:
+            return f"🎉 SOLUCIÓN: {var} = {self._format_root(solution.roots[0][0], solution.exact[0])}"
+        subscripts = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+        lines = [f"🎉 SOLUCIONES ({len(solution.roots)}):"]
+        for index, ((value, multiplicity), exact) in enumerate(zip(solution.roots, solution.exact), start=1):
+            line = f"   {var}{str(index).translate(subscripts)} = {self._format_root(value, exact)}"
+            if multiplicity > 1:
+                line += f" (multiplicidad {multiplicity})"
+            lines.append(line)
+        if solution.has_numeric_roots:
+            lines.append(f"🔢 Método numérico: {solution.description}")
+        return "\n".join(lines)
+    
     def _classify_equation_type(self, expr, var):
         """Clasifica el tipo de ecuación"""
         if expr.is_polynomial(var):
@@ -652,12 +1410,17 @@ class operations:
         else:
             return "TRASCENDENTE"
     
-    def _solve_linear_detailed(self, left_expr, right_expr, var):
-        """Resuelve ecuaciones lineales con pasos matemáticos detallados"""
+    def _solve_linear_detailed(self, left_expr, right_expr, var, solution):
+        """Explica la resolución de una ecuación lineal a partir de la solución ya calculada"""
         steps = []
         steps.append("📐 MÉTODO DE RESOLUCIÓN LINEAL:")
         steps.append("   💡 Una ecuación lineal tiene la forma ax + b = c")
         
+        # Si la variable aparece en ambos lados, primero se pasa todo a la izquierda
+        if right_expr.has(var):
+            left_expr, right_expr = expand(left_expr - right_expr), sp.Integer(0)
+            steps.append(f"🔄 Pasamos todos los términos al lado izquierdo: {left_expr} = 0")
+        
         # Obtener coeficientes
         poly = left_expr.as_poly(var)
         a = poly.nth(1) if poly.degree() >= 1 else 0
@@ -672,10 +1435,12 @@ class operations:
         # Paso 1: Aislar término con variable
         if b != 0:
             new_right = c - b
-            if b > 0:
+            if b.is_number and b > 0:
                 steps.append(f"1️⃣ Restamos {b} de ambos lados:")
-            else:
+            elif b.is_number:
                 steps.append(f"1️⃣ Sumamos {abs(b)} a ambos lados:")
+            else:
+                steps.append(f"1️⃣ Restamos {b} de ambos lados:")
             steps.append(f"   {a}·{var} + ({b}) - ({b}) = {c} - ({b})")
             steps.append(f"   {a}·{var} = {new_right}")
         else:
@@ -683,20 +1448,20 @@ class operations:
             steps.append(f"1️⃣ No hay término independiente que mover")
             steps.append(f"   {a}·{var} = {new_right}")
         
-        # Paso 2: Despejar variable
+        # Paso 2: Despejar variable (el valor viene de la solución compartida)
+        final_result = solution.values[0]
         if a != 1:
-            final_result = new_right / a
             steps.append(f"2️⃣ Dividimos ambos lados entre {a}:")
             steps.append(f"   {var} = {new_right} ÷ {a}")
             steps.append(f"   {var} = {final_result}")
         else:
             steps.append(f"2️⃣ El coeficiente es 1, por lo tanto:")
-            steps.append(f"   {var} = {new_right}")
+            steps.append(f"   {var} = {final_result}")
         
         return steps
     
-    def _solve_quadratic_detailed(self, left_expr, right_expr, var):
-        """Resuelve ecuaciones cuadráticas con pasos detallados"""
+    def _solve_quadratic_detailed(self, left_expr, right_expr, var, solution):
+        """Explica la fórmula cuadrática; las raíces vienen de la solución ya calculada"""
         steps = []
         steps.append("📐 MÉTODO DE RESOLUCIÓN CUADRÁTICA:")
         steps.append("   💡 Una ecuación cuadrática tiene la forma ax² + bx + c = 0")
@@ -721,124 +1486,193 @@ class operations:
         steps.append(f"   Δ = b² - 4ac = ({b})² - 4({a})({c})")
         steps.append(f"   Δ = {b**2} - {4*a*c} = {discriminant}")
         
-        # Analizar discriminante
-        if discriminant > 0:
+        values = solution.values
+        if not discriminant.is_number:
+            steps.append("ℹ️ El discriminante depende de parámetros")
+            steps.extend(f"   {var} = {value}" for value in values)
+        elif discriminant > 0:
             steps.append("✅ Δ > 0: Dos soluciones reales distintas")
-            sqrt_disc = sp.sqrt(discriminant)
-            steps.append(f"🔢 √Δ = √{discriminant} = {sqrt_disc}")
-            
-            x1 = (-b + sqrt_disc) / (2*a)
-            x2 = (-b - sqrt_disc) / (2*a)
-            
+            steps.append(f"🔢 √Δ = √{discriminant} = {sp.sqrt(discriminant)}")
             steps.append("📊 Aplicamos la fórmula:")
-            steps.append(f"   x₁ = (-{b} + {sqrt_disc}) / (2·{a}) = {x1}")
-            steps.append(f"   x₂ = (-{b} - {sqrt_disc}) / (2·{a}) = {x2}")
-            
+            for index, value in enumerate(values, start=1):
+                steps.append(f"   x{'₁₂'[index - 1] if index <= 2 else index} = {value}")
         elif discriminant == 0:
             steps.append("⚖️ Δ = 0: Una solución real doble")
-            x = -b / (2*a)
-            steps.append(f"📊 x = -b / (2a) = -({b}) / (2·{a}) = {x}")
-            
+            steps.append(f"📊 x = -b / (2a) = -({b}) / (2·{a}) = {values[0]}")
         else:
             steps.append("❌ Δ < 0: No hay soluciones reales (soluciones complejas)")
+            steps.extend(f"   {var} = {value}" for value in values)
         
         return steps
     
-    def _solve_general_detailed(self, left_expr, right_expr, var):
-        """Maneja ecuaciones generales"""
+    def _solve_general_detailed(self, left_expr, right_expr, var, solution):
+        """Explica el método que usó el resolutor para ecuaciones generales"""
         steps = []
         steps.append("📐 ECUACIÓN GENERAL:")
-        steps.append(f"   🎯 Despejamos {var} usando métodos algebraicos")
         steps.append(f"   📝 Ecuación: {left_expr} = {right_expr}")
+        if solution.method == 'closed_form':
+            steps.append(f"   💡 Polinomio de grado {solution.degree}: se factoriza y se aplican fórmulas cerradas")
+        elif solution.method == 'eigenvalues':
+            steps.append(f"   💡 Polinomio de grado {solution.degree}: no hay fórmula general por radicales")
+            steps.append("   🔢 Las raíces son los autovalores de la matriz compañera del polinomio")
+        elif solution.method == 'polyroots':
+            steps.append(f"   💡 Polinomio de grado {solution.degree}: no hay fórmula general por radicales")
+            steps.append(f"   🔢 Las raíces se aproximan todas a la vez con polyroots de mpmath"
+                         f" ({self.numeric_settings.working_digits} dígitos)")
+        elif solution.method == 'factored':
+            steps.append(f"   💡 Polinomio de grado {solution.degree}: se factoriza en factores irreducibles")
+            steps.append(f"   🔧 Los factores de grado ≤ {CLOSED_FORM_MAX_DEGREE} se resuelven con fórmulas cerradas (raíces exactas)")
+            steps.append("   🔢 Los demás, con un método numérico (raíces aproximadas)")
+        elif solution.method == 'bracketing':
+            low, high = solution.interval
+            steps.append(f"   🔎 Buscamos cambios de signo de f({var}) = {left_expr - right_expr} en [{low:g}, {high:g}]")
+            steps.append("   🔢 Cada raíz aislada se refina con nsolve dentro de su subintervalo")
+            steps.append("   💡 Para buscar en otro intervalo escriba: ecuación, a, b")
+        else:
+            steps.append(f"   🎯 Despejamos {var} usando métodos algebraicos")
+        steps.append(f"   📊 Raíces encontradas: {len(solution.roots)}")
         return steps
     
+    # ==================== SISTEMAS DE ECUACIONES ====================
+    # Máximo de ecuaciones e incógnitas que se listan en los pasos y en el resultado
+    MAX_LISTED_EQUATIONS = 20
+    
+    def _parse_system(self, system, explicit=None):
+        """Separa las ecuaciones de un sistema (por ';' o salto de línea) y parsea cada una"""
+        processed = explicit if explicit is not None else self._handle_implicit_multiplication(system)
+        statements = [
+            statement for line in processed.splitlines()
+            for statement in self._split_top_level(line, ';') if statement
+        ]
+        # El lexer ya escribió las multiplicaciones implícitas; sin separar nombres
+        # como x1, x2, ... que son habituales en los sistemas grandes
+        equations = []
+        for statement in statements:
+            if statement.count('=') != 1:
+                raise ValueError(f"Cada ecuación del sistema debe tener un solo '=': {statement}")
+            left_side, right_side = statement.split('=')
+            equations.append((
+                parse_expr(left_side, transformations=standard_transformations),
+                parse_expr(right_side, transformations=standard_transformations)
+            ))
+        return statements, equations
+    
+    def solve_system(self, system, parsed=None, detailed=True, on_partial=None):
+        """Resuelve un sistema de ecuaciones lineales o no lineales"""
+        try:
+            steps = self._new_steps(detailed)
+            steps.append("🧮 SISTEMA DE ECUACIONES")
+            steps.append("=" * 40)
+            
+            statements, equations = parsed if parsed is not None else self._parse_system(system)
+            exprs = [left - right for left, right in equations]
+            unknowns = sort_unknowns(set().union(*(expr.free_symbols for expr in exprs)))
+            if not unknowns:
+                raise ValueError("El sistema no tiene incógnitas")
+            
+            if detailed:
+                for index, (left, right) in enumerate(equations[:self.MAX_LISTED_EQUATIONS], start=1):
+                    steps.append(f"   ({index}) {left} = {right}")
+                if len(equations) > self.MAX_LISTED_EQUATIONS:
+                    steps.append(f"   ... {len(equations) - self.MAX_LISTED_EQUATIONS} ecuaciones más")
+            steps.append(f"📊 {len(equations)} ecuaciones, {len(unknowns)} incógnitas")
+            
+            self._report_partial(on_partial, None, steps)
+            rows = self.system_solver.linear_coefficients(exprs, unknowns)
+            steps.append(f"📚 Tipo de sistema: {'LINEAL' if rows is not None else 'NO LINEAL'}")
+            if detailed and rows is not None and len(unknowns) <= 6:
+                steps.extend(self._explain_linear_system(rows, unknowns))
+            
+            solution = self.system_solver.solve(exprs, unknowns)
+            steps.append(f"🧭 Método: {solution.description}")
+            if solution.rank is not None:
+                steps.append(f"📐 Rango de la matriz de coeficientes: {solution.rank}")
+            if solution.residual is not None:
+                steps.append(f"🔍 Residuo ‖A·x − b‖ = {solution.residual:.3g}")
+            
+            result_text = self._format_system_solution(solution)
+            if detailed and solution.status == 'unique' and not solution.is_numeric:
+                steps.append("🔍 VERIFICACIÓN:")
+                values = solution.solutions[0]
+                for index, (left, right) in enumerate(equations[:self.MAX_LISTED_EQUATIONS], start=1):
+                    correct = sp.simplify(left.subs(values) - right.subs(values)) == 0
+                    steps.append(f"   ({index}) {'✅ Se cumple' if correct else '❌ No se cumple'}")
+            steps.append(result_text)
+            
+            return {'result': result_text, 'steps': steps, 'type': 'system'}
+        
+        except Exception as e:
+            return {'result': f"❌ Error: {str(e)}", 'steps': [f"❌ Error en el sistema: {str(e)}"], 'type': 'error'}
+    
+    def _explain_linear_system(self, rows, unknowns):
+        """Escribe un sistema lineal pequeño en forma matricial A·x = b"""
+        steps = ["📝 FORMA MATRICIAL A·x = b:"]
+        for row, constant in rows:
+            coefficients = "  ".join(f"{str(row.get(unknown, 0)):>6}" for unknown in unknowns)
+            steps.append(f"   [ {coefficients} ] = {-constant}")
+        steps.append(f"   x = ({', '.join(str(unknown) for unknown in unknowns)})")
+        return steps
+    
+    def _format_system_value(self, value, numeric):
+        if numeric and self.numeric_settings.is_default:
+            return f"{value:.10g}"
+        # Mismo formato que las raíces de una ecuación, con los decimales configurados
+        return self._format_root(value if numeric else sp.sympify(value), not numeric)
+    
+    def _format_system_solution(self, solution):
+        """Texto del resultado de un sistema según su estado"""
+        if solution.status == 'inconsistent':
+            return "❌ El sistema no tiene solución (incompatible)"
+        if solution.status == 'none':
+            return "❌ No se encontraron soluciones"
+        if solution.status == 'timeout':
+            return f"⏱️ El sistema no se resolvió dentro del presupuesto de {self.system_solver.budget:g} s"
+        
+        lines = []
+        if solution.status == 'infinite':
+            lines.append("♾️ Infinitas soluciones (sistema compatible indeterminado):")
+            if solution.is_numeric:
+                lines.append("   Se muestra la solución de norma mínima:")
+        elif len(solution.solutions) > 1:
+            lines.append(f"🎉 SOLUCIONES ({len(solution.solutions)}):")
+        else:
+            lines.append("🎉 SOLUCIÓN:")
+        
+        for number, values in enumerate(solution.solutions, start=1):
+            prefix = f"   {number}) " if len(solution.solutions) > 1 else "   "
+            shown = list(values.items())[:self.MAX_LISTED_EQUATIONS]
+            if len(solution.solutions) > 1:
+                lines.append(prefix + ", ".join(
+                    f"{unknown} = {self._format_system_value(value, solution.is_numeric)}" for unknown, value in shown
+                ))
+            else:
+                lines.extend(
+                    f"{prefix}{unknown} = {self._format_system_value(value, solution.is_numeric)}" for unknown, value in shown
+                )
+            if len(values) > len(shown):
+                lines.append(f"   ... y {len(values) - len(shown)} incógnitas más")
+        return "\n".join(lines)
+    
     # ==================== MATRICES Y ÁLGEBRA LINEAL ====================
-    def process_matrix(self, matrix_str):
+    def _parse_matrix(self, matrix_str, tokens=None):
+        """Compila la entrada al lenguaje de matrices (sin eval)"""
+        return self.matrix_parser.parse(matrix_str, tokens)
+    
+    def process_matrix(self, matrix_str, parsed=None, detailed=True, on_partial=None):
         """Procesa matrices con álgebra lineal detallada"""
         try:
-            steps = []
+            steps = self._new_steps(detailed)
             steps.append("🔢 MATRICES Y ÁLGEBRA LINEAL")
             steps.append("=" * 40)
             steps.append(f"🎯 Matriz a procesar: {matrix_str}")
             
-            # Convertir a formato Matrix
-            if 'Matrix(' not in matrix_str:
-                matrix_str = f"Matrix({matrix_str})"
-                steps.append(f"📝 Formato SymPy: {matrix_str}")
+            program = parsed if parsed is not None else self._parse_matrix(matrix_str)
+            value, trace = program.run()
             
-            matrix = eval(matrix_str, {"Matrix": Matrix, "sp": sp, "sqrt": sp.sqrt})
-            steps.append(f"✅ Matriz creada: {matrix.rows}×{matrix.cols}")
-            steps.append(f"📊 Elementos de la matriz:\n{matrix}")
-            
-            result_text = f"🔢 Matriz:\n{matrix}\n"
-            
-            # Propiedades básicas
-            steps.append("📐 PROPIEDADES DE LA MATRIZ:")
-            steps.append(f"   📏 Dimensiones: {matrix.rows} filas × {matrix.cols} columnas")
-            steps.append(f"   🔍 Tipo: {'Cuadrada' if matrix.rows == matrix.cols else 'Rectangular'}")
-            
-            if matrix.rows == matrix.cols:
-                steps.append("🧮 CÁLCULOS PARA MATRIZ CUADRADA:")
-                
-                # Determinante
-                steps.append("1️⃣ DETERMINANTE:")
-                if matrix.rows == 2:
-                    steps.append("   📐 Para matriz 2×2: det(A) = ad - bc")
-                    a, b = matrix[0, 0], matrix[0, 1]
-                    c, d = matrix[1, 0], matrix[1, 1]
-                    det = a*d - b*c
-                    steps.append(f"   🔢 det = ({a})({d}) - ({b})({c}) = {a*d} - {b*c} = {det}")
-                elif matrix.rows == 3:
-                    steps.append("   📐 Para matriz 3×3: expansión por cofactores")
-                    det = matrix.det()
-                    steps.append(f"   🔢 det = {det}")
-                else:
-                    det = matrix.det()
-                    steps.append(f"   🔢 det = {det} (calculado por expansión)")
-                
-                result_text += f"\n📊 Determinante: {det}"
-                
-                # Análisis del determinante
-                steps.append("📊 ANÁLISIS DEL DETERMINANTE:")
-                if det == 0:
-                    steps.append("   ❌ det = 0: Matriz singular (no invertible)")
-                    steps.append("   💡 Las filas/columnas son linealmente dependientes")
-                else:
-                    steps.append("   ✅ det ≠ 0: Matriz no singular (invertible)")
-                    steps.append("   💡 Las filas/columnas son linealmente independientes")
-                
-                # Matriz inversa
-                if det != 0:
-                    steps.append("2️⃣ MATRIZ INVERSA:")
-                    steps.append("   📐 A⁻¹ = (1/det(A)) × adj(A)")
-                    steps.append("   💡 adj(A) es la matriz adjunta (transpuesta de cofactores)")
-                    
-                    inv = matrix.inv()
-                    steps.append("   ✅ Matriz inversa calculada")
-                    result_text += f"\n🔄 Matriz inversa:\n{inv}"
-                    
-                    # Verificación
-                    steps.append("🔍 VERIFICACIÓN: A × A⁻¹ = I")
-                    identity_check = matrix * inv
-                    steps.append(f"   A × A⁻¹ = {identity_check}")
-                else:
-                    steps.append("2️⃣ MATRIZ INVERSA:")
-                    steps.append("   ❌ No existe matriz inversa (det = 0)")
-            
-            # Rango
-            steps.append("3️⃣ RANGO DE LA MATRIZ:")
-            steps.append("   📐 El rango es el número máximo de filas/columnas linealmente independientes")
-            rank = matrix.rank()
-            steps.append(f"   🔢 rango(A) = {rank}")
-            result_text += f"\n📏 Rango: {rank}"
-            
-            # Interpretación del rango
-            steps.append("📊 INTERPRETACIÓN DEL RANGO:")
-            if matrix.rows == matrix.cols:
-                if rank == matrix.rows:
-                    steps.append("   ✅ Rango completo: todas las filas/columnas son independientes")
-                else:
-                    steps.append(f"   ⚠️ Rango deficiente: solo {rank} de {matrix.rows} filas son independientes")
+            if program.is_single_literal:
+                result_text = self._analyze_matrix(value, steps, detailed)
+            else:
+                result_text = self._explain_matrix_program(value, trace, steps)
             
             return {
                 'result': result_text,
@@ -853,16 +1687,135 @@ class operations:
                 'type': 'error'
             }
     
+    def _explain_matrix_program(self, value, trace, steps):
+        """Describe cada sentencia de un programa de matrices y devuelve el resultado"""
+        steps.append("🧮 OPERACIONES:")
+        for number, (text, target, statement_value) in enumerate(trace, 1):
+            steps.append(f"{number}️⃣ {text}")
+            label = target or "Resultado"
+            steps.append(f"   ✅ {label}: {matrix_engine.describe(statement_value)}")
+            steps.append(f"   {matrix_engine.format_value(statement_value)}")
+        
+        if matrix_engine.is_matrix(value):
+            steps.append(f"🧠 Motor de cálculo: {'NumPy (BLAS/LAPACK)' if matrix_engine.uses_numpy(value) else 'SymPy (exacto)'}")
+        return f"🔢 Resultado:\n{matrix_engine.format_value(value)}"
+    
+    def _analyze_matrix(self, matrix, steps, detailed):
+        """Análisis clásico de una sola matriz: determinante, inversa y rango"""
+        if not matrix_engine.is_matrix(matrix):
+            raise ValueError("La entrada no es una matriz")
+        rows, cols = matrix_engine.shape(matrix)
+        numpy_backend = matrix_engine.uses_numpy(matrix)
+        
+        steps.append(f"✅ Matriz creada: {rows}×{cols}")
+        if numpy_backend:
+            steps.append("🧠 Matriz numérica grande: se calcula con NumPy (BLAS/LAPACK)")
+        steps.append(f"📊 Elementos de la matriz:\n{matrix_engine.format_value(matrix)}")
+        
+        result_text = f"🔢 Matriz:\n{matrix_engine.format_value(matrix)}\n"
+        
+        # Propiedades básicas
+        steps.append("📐 PROPIEDADES DE LA MATRIZ:")
+        steps.append(f"   📏 Dimensiones: {rows} filas × {cols} columnas")
+        steps.append(f"   🔍 Tipo: {'Cuadrada' if rows == cols else 'Rectangular'}")
+        
+        # Rango (también decide si la matriz es singular)
+        rank = matrix_engine.rank(matrix)
+        
+        if rows == cols:
+            steps.append("🧮 CÁLCULOS PARA MATRIZ CUADRADA:")
+            
+            # Determinante
+            steps.append("1️⃣ DETERMINANTE:")
+            det = matrix_engine.determinant(matrix)
+            if rows == 2:
+                steps.append("   📐 Para matriz 2×2: det(A) = ad - bc")
+                a, b = matrix[0, 0], matrix[0, 1]
+                c, d = matrix[1, 0], matrix[1, 1]
+                steps.append(f"   🔢 det = ({a})({d}) - ({b})({c}) = {a*d} - {b*c} = {det}")
+            elif rows == 3:
+                steps.append("   📐 Para matriz 3×3: expansión por cofactores")
+                steps.append(f"   🔢 det = {det}")
+            elif numpy_backend:
+                steps.append(f"   🔢 det = {matrix_engine.format_value(det)} (calculado por factorización LU)")
+            else:
+                steps.append(f"   🔢 det = {det} (calculado por expansión)")
+            
+            result_text += f"\n📊 Determinante: {matrix_engine.format_value(det)}"
+            singular = rank < rows if numpy_backend else det == 0
+            
+            # Análisis del determinante
+            steps.append("📊 ANÁLISIS DEL DETERMINANTE:")
+            if singular:
+                steps.append("   ❌ det = 0: Matriz singular (no invertible)")
+                steps.append("   💡 Las filas/columnas son linealmente dependientes")
+            else:
+                steps.append("   ✅ det ≠ 0: Matriz no singular (invertible)")
+                steps.append("   💡 Las filas/columnas son linealmente independientes")
+            
+            # Matriz inversa
+            if not singular:
+                steps.append("2️⃣ MATRIZ INVERSA:")
+                steps.append("   📐 A⁻¹ = (1/det(A)) × adj(A)")
+                steps.append("   💡 adj(A) es la matriz adjunta (transpuesta de cofactores)")
+                
+                inv = matrix_engine.inverse(matrix)
+                steps.append("   ✅ Matriz inversa calculada")
+                result_text += f"\n🔄 Matriz inversa:\n{matrix_engine.format_value(inv)}"
+                
+                # Verificación
+                if detailed:
+                    steps.append("🔍 VERIFICACIÓN: A × A⁻¹ = I")
+                    identity_check = matrix_engine.multiply(matrix, inv)
+                    if numpy_backend:
+                        ok = np.allclose(identity_check, np.eye(rows))
+                        steps.append(f"   {'✅' if ok else '⚠️'} A × A⁻¹ ≈ I (tolerancia numérica)")
+                    else:
+                        steps.append(f"   A × A⁻¹ = {identity_check}")
+            else:
+                steps.append("2️⃣ MATRIZ INVERSA:")
+                steps.append("   ❌ No existe matriz inversa (det = 0)")
+        
+        # Rango
+        steps.append("3️⃣ RANGO DE LA MATRIZ:")
+        steps.append("   📐 El rango es el número máximo de filas/columnas linealmente independientes")
+        steps.append(f"   🔢 rango(A) = {rank}")
+        result_text += f"\n📏 Rango: {rank}"
+        
+        # Interpretación del rango
+        steps.append("📊 INTERPRETACIÓN DEL RANGO:")
+        if rows == cols:
+            if rank == rows:
+                steps.append("   ✅ Rango completo: todas las filas/columnas son independientes")
+            else:
+                steps.append(f"   ⚠️ Rango deficiente: solo {rank} de {rows} filas son independientes")
+        
+        return result_text
+    
     # ==================== FRACCIONES EXACTAS ====================
-    def process_fraction(self, expression):
+    def _parse_fraction(self, expression):
+        """Compila la expresión con el evaluador racional exacto o, si no es posible, con SymPy"""
+        try:
+            return 'exact', self.rational_evaluator.compile(self._clean_expression(expression))
+        except ValueError:
+            return 'sympy', parse_expr(expression)
+    
+    def process_fraction(self, expression, parsed=None, detailed=True, on_partial=None):
         """Procesa fracciones con aritmética exacta"""
         try:
-            steps = []
+            steps = self._new_steps(detailed)
             steps.append("🔢 CÁLCULO CON FRACCIONES EXACTAS")
             steps.append("=" * 40)
             steps.append(f"🎯 Expresión con fracciones: {expression}")
             
-            expr = parse_expr(expression)
+            mode, compiled = parsed if parsed is not None else self._parse_fraction(expression)
+            if mode == 'exact':
+                try:
+                    return self._process_exact_fraction(expression, compiled, steps, detailed)
+                except ValueError:
+                    # Por ejemplo, un exponente fraccionario: se delega en SymPy
+                    compiled = parse_expr(expression)
+            expr = compiled
             steps.append(f"📝 Expresión simbólica: {expr}")
             
             # Detectar operación con fracciones
@@ -870,21 +1823,7 @@ class operations:
             steps.append(f"📊 Tipo de operación: {operation_type}")
             
             # Explicar conceptos
-            steps.append("📚 CONCEPTOS DE FRACCIONES:")
-            steps.append("   💡 Una fracción representa una división a/b")
-            steps.append("   📊 Numerador: parte que se toma")
-            steps.append("   📊 Denominador: partes en que se divide el total")
-            
-            # Pasos específicos según operación
-            if '+' in expression or '-' in expression:
-                fraction_steps = self._explain_fraction_addition_subtraction(expression)
-                steps.extend(fraction_steps)
-            elif '*' in expression:
-                fraction_steps = self._explain_fraction_multiplication(expression)
-                steps.extend(fraction_steps)
-            elif '/' in expression and expression.count('/') > 1:
-                fraction_steps = self._explain_fraction_division(expression)
-                steps.extend(fraction_steps)
+            self._explain_fraction_concepts(expression, steps, detailed)
             
             # Simplificación
             steps.append("🔧 SIMPLIFICACIÓN:")
@@ -902,7 +1841,7 @@ class operations:
                 steps.append(f"✅ FRACCIÓN EXACTA: {fraction}")
                 
                 # Conversión a decimal
-                decimal_val = float(fraction)
+                decimal_val = self._format_decimal(fraction)
                 steps.append(f"🔢 EQUIVALENTE DECIMAL: {fraction} = {decimal_val}")
                 
                 # Información adicional
@@ -929,6 +1868,66 @@ class operations:
                 'type': 'error'
             }
     
+    def _process_exact_fraction(self, expression, compiled, steps, detailed):
+        """Evalúa una expresión racional con Fraction, sin pasar por SymPy"""
+        try:
+            fraction = compiled()
+        except ZeroDivisionError:
+            raise ZeroDivisionError("División por cero")
+        steps.append("📝 Evaluación exacta con números racionales")
+        
+        operation_type = self._detect_fraction_operation_type(expression)
+        steps.append(f"📊 Tipo de operación: {operation_type}")
+        
+        self._explain_fraction_concepts(expression, steps, detailed)
+        
+        # Simplificación (Fraction ya reduce por el MCD)
+        steps.append("🔧 SIMPLIFICACIÓN:")
+        if detailed:
+            terms = self._fraction_terms(expression)
+            if len(terms) == 1 and terms[0][1] != 0:
+                numerator, denominator = terms[0]
+                divisor = math.gcd(numerator, denominator)
+                if divisor > 1:
+                    steps.append(f"   📐 Aplicamos simplificación: {numerator}/{denominator} → {fraction}")
+                    steps.append(f"   💡 Dividimos numerador y denominador entre el MCD = {divisor}")
+                else:
+                    steps.append("   ℹ️ La fracción ya está en su forma más simple")
+            else:
+                steps.append(f"   📐 Resultado reducido por el máximo común divisor: {fraction}")
+        
+        decimal_val = self._format_decimal(fraction)
+        steps.append(f"✅ FRACCIÓN EXACTA: {fraction}")
+        steps.append(f"🔢 EQUIVALENTE DECIMAL: {fraction} = {decimal_val}")
+        steps.append(f"📊 Numerador: {fraction.numerator}")
+        steps.append(f"📊 Denominador: {fraction.denominator}")
+        
+        return {
+            'result': f"🔢 Fracción exacta: {fraction} = {decimal_val}",
+            'steps': steps,
+            'type': 'fraction'
+        }
+    
+    def _explain_fraction_concepts(self, expression, steps, detailed):
+        """Agrega los conceptos y las reglas de la operación con fracciones"""
+        steps.append("📚 CONCEPTOS DE FRACCIONES:")
+        steps.append("   💡 Una fracción representa una división a/b")
+        steps.append("   📊 Numerador: parte que se toma")
+        steps.append("   📊 Denominador: partes en que se divide el total")
+        
+        # Pasos específicos según operación
+        if detailed:
+            if '+' in expression or '-' in expression:
+                steps.extend(self._explain_fraction_addition_subtraction(expression))
+            elif '*' in expression:
+                steps.extend(self._explain_fraction_multiplication(expression))
+            elif '/' in expression and expression.count('/') > 1:
+                steps.extend(self._explain_fraction_division(expression))
+    
+    def _fraction_terms(self, expression):
+        """Fracciones simples a/b que aparecen escritas en la expresión"""
+        return [(int(a), int(b)) for a, b in re.findall(r'(\d+)\s*/\s*(\d+)', expression)]
+    
     def _detect_fraction_operation_type(self, expression):
         """Detecta el tipo de operación con fracciones"""
         if '+' in expression:
@@ -953,6 +1952,19 @@ class operations:
         steps.append("   2️⃣ Convertir cada fracción al denominador común")
         steps.append("   3️⃣ Sumar/restar los numeradores")
         steps.append("   4️⃣ Simplificar el resultado")
+        
+        # Mínimo común denominador con los números de la expresión
+        terms = self._fraction_terms(expression)
+        denominators = [denominator for _, denominator in terms if denominator]
+        if len(terms) >= 2 and len(denominators) == len(terms):
+            lcd = math.lcm(*denominators)
+            steps.append(f"📐 MCM({', '.join(str(d) for d in denominators)}) = {lcd}")
+            for numerator, denominator in terms:
+                factor = lcd // denominator
+                if factor == 1:
+                    steps.append(f"   • {numerator}/{denominator} ya tiene denominador {lcd}")
+                else:
+                    steps.append(f"   • {numerator}/{denominator} = ({numerator}×{factor})/({denominator}×{factor}) = {numerator * factor}/{lcd}")
         return steps
     
     def _explain_fraction_multiplication(self, expression):
@@ -998,94 +2010,30 @@ class operations:
     
     def _check_parentheses_balance(self, expression):
         """Verifica balance de paréntesis"""
+        return self._parentheses_problem(expression) is None
+
+    def _parentheses_problem(self, expression):
+        """Describe el primer problema de paréntesis de la expresión, o None si están balanceados"""
         count = 0
-        for char in expression:
+        for position, char in enumerate(expression, start=1):
             if char == '(':
                 count += 1
             elif char == ')':
                 count -= 1
                 if count < 0:
-                    return False
-        return count == 0
-    
-    def _replace_functions_and_constants(self, expression):
-        """Reemplaza funciones matemáticas"""
-        expression = expression.replace('pi', str(math.pi))
-        expression = expression.replace('e', str(math.e))
-        
-        function_replacements = {
-            'sqrt': 'math.sqrt', 'sin': 'math.sin', 'cos': 'math.cos',
-            'tan': 'math.tan', 'log': 'math.log10', 'ln': 'math.log',
-            'exp': 'math.exp', 'abs': 'abs'
-        }
-        
-        for func_name, func_replacement in function_replacements.items():
-            pattern = r'\b' + func_name + r'\b'
-            expression = re.sub(pattern, func_replacement, expression)
-        
-        return expression
-    
-    def _safe_eval(self, expression):
-        """Evalúa expresión de forma segura"""
-        safe_dict = {
-            "__builtins__": {},
-            "math": math, "abs": abs, "round": round,
-            "pow": pow, "max": max, "min": min
-        }
-        
-        try:
-            result = eval(expression, safe_dict)
-            if isinstance(result, (int, float)):
-                if math.isinf(result):
-                    raise ValueError("Resultado infinito")
-                elif math.isnan(result):
-                    raise ValueError("Resultado no válido")
-                return result
-            else:
-                raise ValueError("Resultado no numérico")
-        except ZeroDivisionError:
-            raise ZeroDivisionError("División por cero")
-        except Exception as e:
-            raise ValueError(f"Error: {str(e)}")
+                    return f"Paréntesis de cierre sin abrir (posición {position})"
+        if count == 1:
+            return "Falta cerrar 1 paréntesis"
+        if count > 1:
+            return f"Falta cerrar {count} paréntesis"
+        return None
     
     def is_valid_expression(self, expression):
         """Verifica si es una expresión matemática válida"""
-        if not expression or len(expression) < 1:
+        if not expression or not expression.strip():
             return False
-        
-        math_functions = ['sin', 'cos', 'tan', 'sqrt', 'log', 'ln', 'pi', 'e', 
-                         'derivative', 'integral', 'diff', 'Matrix', 'd/dx']
-        variables = ['x', 'y', 'z', 't']
-        
-        has_numbers = any(c.isdigit() for c in expression)
-        has_operators = any(c in '+-*/=' for c in expression)
-        has_functions = any(func in expression.lower() for func in math_functions)
-        has_variables = any(var in expression for var in variables)
-        has_matrices = '[' in expression and ']' in expression
-        
-        return (has_numbers and (has_operators or has_functions)) or has_variables or has_matrices
+        return self.analyze(expression).is_valid
     
     def get_operation_info(self, expression):
         """Obtiene información sobre la operación"""
-        info = {
-            'expression': expression,
-            'type': 'unknown',
-            'complexity': 'simple'
-        }
-        
-        if self._is_equation(expression):
-            info['type'] = 'equation'
-        elif self._is_matrix_operation(expression):
-            info['type'] = 'matrix'
-        elif self._is_derivative(expression):
-            info['type'] = 'derivative'
-        elif self._is_integral(expression):
-            info['type'] = 'integral'
-        elif self._contains_variables(expression):
-            info['type'] = 'symbolic'
-        elif self._is_fraction(expression):
-            info['type'] = 'fraction'
-        else:
-            info['type'] = 'basic_operations'
-        
-        return info
\ No newline at end of file
+        return self.analyze(expression).to_dict()
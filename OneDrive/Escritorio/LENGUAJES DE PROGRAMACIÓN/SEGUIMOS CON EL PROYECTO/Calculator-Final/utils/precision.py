@@ -0,0 +1,168 @@
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from typing import Any, Dict, Optional
+
+import mpmath
+
+# Dígitos que un float representa con seguridad: hasta aquí no hace falta mpmath
+FLOAT_DIGITS = 15
+
+# Dígitos extra de trabajo para que el redondeo final sea correcto
+GUARD_DIGITS = 10
+
+# Decimales con los que constantes_publicas guarda los valores (DECIMAL(30, 15))
+STORED_CONSTANT_DECIMALS = 15
+
+# Constantes matemáticas que mpmath calcula con cualquier precisión
+_EXACT_CONSTANTS = {
+    'pi': lambda context: +context.pi,
+    'e': lambda context: +context.e,
+    'phi': lambda context: +context.phi,
+    'gamma': lambda context: +context.euler,
+}
+
+
+def make_context(digits: int) -> mpmath.MPContext:
+    """Contexto de mpmath propio, con su precisión, independiente del global mpmath.mp"""
+    context = mpmath.MPContext()
+    context.dps = digits
+    return context
+
+
+def precise_functions(context: mpmath.MPContext) -> Dict[str, Any]:
+    """Registro de funciones y constantes (los nombres de allowed_functions) en un contexto mpmath"""
+    def rounded(x, n=0):
+        # round(x, n) como el de Python: nint solo recibe el número
+        scale = context.power(10, int(n))
+        return context.nint(x * scale) / scale
+
+    return {
+        'sin': context.sin, 'cos': context.cos, 'tan': context.tan,
+        'asin': context.asin, 'acos': context.acos, 'atan': context.atan,
+        'sqrt': context.sqrt, 'log': context.log10, 'ln': context.ln,
+        'log10': context.log10, 'log2': lambda x: context.log(x, 2), 'exp': context.exp,
+        'abs': context.fabs, 'pow': context.power, 'pi': +context.pi, 'e': +context.e,
+        'ceil': context.ceil, 'floor': context.floor, 'round': rounded,
+        'factorial': context.factorial,
+        'degrees': context.degrees, 'radians': context.radians
+    }
+
+
+def precise_constants(context: mpmath.MPContext, constants: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Índice de constantes para un contexto de más precisión que un float.
+
+    La base de datos guarda 15 decimales; rellenarlos con ceros daría dígitos
+    falsos. Una constante matemática conocida (pi, e, phi, gamma) cuyo valor
+    guardado coincide con el verdadero hasta esos decimales se reemplaza por el
+    valor que calcula mpmath con la precisión del contexto.
+    """
+    precise = dict(constants)
+    tolerance = context.mpf(10) ** -(STORED_CONSTANT_DECIMALS - 1)
+    for name, value in constants.items():
+        exact = _EXACT_CONSTANTS.get(name)
+        if exact is None:
+            continue
+        exact = exact(context)
+        try:
+            stored = context.mpf(str(value))
+        except (ValueError, TypeError):
+            continue
+        if abs(stored - exact) <= tolerance:
+            precise[name] = context.nstr(exact, context.dps)
+    return precise
+
+
+class NumericSettings:
+    """
+    Preferencias numéricas del usuario (configuraciones_usuario).
+
+    decimals es decimales_mostrar y scientific es notacion_cientifica. Sin
+    decimales configurados los resultados se muestran como siempre; con más
+    de FLOAT_DIGITS decimales el cálculo numérico pasa a mpmath/evalf(n).
+    """
+
+    def __init__(self, decimals: Optional[int] = None, scientific: bool = False):
+        if decimals is not None and decimals < 0:
+            raise ValueError("El número de decimales no puede ser negativo")
+        self.decimals = decimals
+        self.scientific = bool(scientific)
+
+    @property
+    def is_default(self) -> bool:
+        return self.decimals is None and not self.scientific
+
+    @property
+    def uses_mpmath(self) -> bool:
+        return self.decimals is not None and self.decimals > FLOAT_DIGITS
+
+    @property
+    def working_digits(self) -> int:
+        """Dígitos significativos con los que se calcula"""
+        if self.uses_mpmath:
+            return self.decimals + GUARD_DIGITS
+        return FLOAT_DIGITS
+
+    @property
+    def key(self) -> str:
+        """Identifica la configuración en las claves de la memoria de resultados"""
+        return f"decimales={self.decimals};cientifica={int(self.scientific)}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'decimals': self.decimals, 'scientific': self.scientific}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'NumericSettings':
+        data = data or {}
+        return cls(data.get('decimals'), data.get('scientific', False))
+
+    def format(self, value) -> str:
+        """Muestra un número con los decimales y la notación configurados"""
+        if self.is_default or isinstance(value, bool):
+            return str(value)
+        number = self._to_decimal(value)
+        if number is not None:
+            return self._format_decimal(number)
+        parts = [self._to_decimal(part) for part in self._complex_parts(value)]
+        if len(parts) == 2 and None not in parts:
+            # Complejos: la parte real y la imaginaria con los mismos decimales
+            real, imag = parts
+            text = f"{self._format_decimal(imag.copy_abs())}*I"
+            if real == 0:
+                return f"-{text}" if imag < 0 else text
+            return f"{self._format_decimal(real)} {'-' if imag < 0 else '+'} {text}"
+        # Expresiones no numéricas: solo se ajusta la precisión
+        return str(value.evalf(self.working_digits)) if hasattr(value, 'evalf') else str(value)
+
+    def _format_decimal(self, number: Decimal) -> str:
+        decimals = self.decimals if self.decimals is not None else 6
+        return format(number, f".{decimals}{'E' if self.scientific else 'f'}")
+
+    def _complex_parts(self, value):
+        """(real, imaginaria) de un complejo de Python, mpmath o SymPy; () si no es un número"""
+        if hasattr(value, 'as_real_imag'):
+            # SymPy (se revisa antes porque sus expresiones también tienen _mpc_)
+            return value.evalf(self.working_digits).as_real_imag() if value.is_number else ()
+        if isinstance(value, complex) or hasattr(value, '_mpc_'):
+            return value.real, value.imag
+        return ()
+
+    def _to_decimal(self, value) -> Optional[Decimal]:
+        if isinstance(value, int):
+            return Decimal(value)
+        if isinstance(value, float):
+            return Decimal(repr(value))
+        if isinstance(value, Fraction):
+            with localcontext() as context:
+                context.prec = self.working_digits
+                return Decimal(value.numerator) / Decimal(value.denominator)
+        try:
+            if hasattr(value, 'evalf'):
+                # Números de SymPy (Float, Rational)
+                return Decimal(str(value.evalf(self.working_digits)))
+            if hasattr(value, '_mpf_'):
+                # mpf de cualquier contexto: nstr no lo redondea a la precisión global
+                return Decimal(mpmath.nstr(value, self.working_digits))
+        except (ArithmeticError, ValueError, TypeError):
+            pass
+        return None
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Versión del motor de cálculo: cambiarla cuando cambie la forma de calcular o
+# de explicar un resultado, para que los resultados guardados dejen de usarse
+ENGINE_VERSION = "2026.10-3"
+
+# Versión del esquema de la tabla; si no coincide, la tabla se vuelve a crear
+SCHEMA_VERSION = 1
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".calculadora_retro", "resultados.sqlite3")
+
+# Resultados que no se guardan: no son definitivos
+_NOT_STORED_TYPES = ('error', 'timeout', 'cancelled')
+
+
+class ResultStore:
+    """
+    Memoria persistente de resultados en un archivo SQLite local.
+
+    La clave es un hash de la expresión canónica más la versión del motor, de
+    modo que los resultados de integrales, ecuaciones, etc. sobreviven al
+    cierre de la aplicación. El número de entradas está acotado: al superarlo
+    se eliminan las usadas hace más tiempo.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = 5000,
+                 engine_version: str = ENGINE_VERSION):
+        self.path = path
+        self.max_entries = max_entries
+        self.engine_version = engine_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._count = 0
+        try:
+            self._open()
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Memoria de resultados desactivada: {e}")
+            self._connection = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._connection is not None
+
+    def make_key(self, canonical_expression: str) -> str:
+        """Clave de una expresión canónica para la versión actual del motor"""
+        data = f"{self.engine_version}\0{canonical_expression}".encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, key: str, need_steps: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el resultado guardado o None.
+
+        Si need_steps es True y el resultado se guardó sin pasos, cuenta como
+        ausente para que el llamador los calcule.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                row = self._connection.execute(
+                    "SELECT resultado, pasos, tipo FROM resultados WHERE clave = ?", (key,)
+                ).fetchone()
+                if row is None or (need_steps and row[1] is None):
+                    self.misses += 1
+                    return None
+                self._connection.execute(
+                    "UPDATE resultados SET ultimo_acceso = ? WHERE clave = ?", (time.time(), key)
+                )
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Error leyendo la memoria de resultados: {e}")
+                return None
+            self.hits += 1
+        result, steps, result_type = row
+        return {
+            'result': result,
+            'steps': json.loads(steps) if steps is not None else None,
+            'type': result_type
+        }
+
+    def put(self, key: str, expression: str, result: Dict[str, Any], steps=None):
+        """Guarda un resultado (sin pasos si steps es None); los incompletos se ignoran"""
+        if not self.enabled or result.get('type') in _NOT_STORED_TYPES or result.get('incomplete'):
+            return
+        steps_json = json.dumps(list(steps), ensure_ascii=False) if steps is not None else None
+        now = time.time()
+        with self._lock:
+            try:
+                existing = self._connection.execute(
+                    "SELECT pasos FROM resultados WHERE clave = ?", (key,)
+                ).fetchone()
+                if existing is not None:
+                    if steps_json is None and existing[0] is not None:
+                        # No se pierden los pasos que ya estaban guardados
+                        steps_json = existing[0]
+                else:
+                    self._count += 1
+                self._connection.execute(
+                    """INSERT OR REPLACE INTO resultados
+                       (clave, expresion, tipo, resultado, pasos, version_motor, creado, ultimo_acceso)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (key, expression, result.get('type'), str(result.get('result')), steps_json,
+                     self.engine_version, now, now)
+                )
+                if self._count > self.max_entries:
+                    self._evict()
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Error guardando en la memoria de resultados: {e}")
+
+    def clear(self):
+        """Elimina todos los resultados guardados"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._connection.execute("DELETE FROM resultados")
+            self._connection.commit()
+            self._count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'enabled': self.enabled,
+            'size': self._count,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # Esquema distinto: los datos anteriores no son compatibles
+            self._connection.execute("DROP TABLE IF EXISTS resultados")
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS resultados (
+                   clave TEXT PRIMARY KEY,
+                   expresion TEXT NOT NULL,
+                   tipo TEXT,
+                   resultado TEXT NOT NULL,
+                   pasos TEXT,
+                   version_motor TEXT NOT NULL,
+                   creado REAL NOT NULL,
+                   ultimo_acceso REAL NOT NULL
+               )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_resultados_acceso ON resultados (ultimo_acceso)"
+        )
+        # Los resultados de otra versión del motor ya no son válidos
+        self._connection.execute("DELETE FROM resultados WHERE version_motor != ?", (self.engine_version,))
+        self._connection.commit()
+        self._count = self._connection.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta volver al tamaño máximo"""
+        excess = self._count - self.max_entries
+        self._connection.execute(
+            """DELETE FROM resultados WHERE clave IN (
+                   SELECT clave FROM resultados ORDER BY ultimo_acceso ASC LIMIT ?
+               )""",
+            (excess,)
+        )
+        self._count = self.max_entries
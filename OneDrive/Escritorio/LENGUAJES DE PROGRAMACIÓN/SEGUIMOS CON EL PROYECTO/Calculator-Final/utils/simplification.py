@@ -0,0 +1,118 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import sympy as sp
+
+from utils.time_budget import run_within_budget
+
+# Tiempo total (segundos) que se espera a las transformaciones de una expresión
+DEFAULT_BUDGET = 8.0
+
+# Tamaño (número de operaciones) a partir del cual simplify general no se intenta:
+# su costo crece muy rápido y together/cancel dan un resultado razonable
+MAX_SIMPLIFY_OPS = 150
+
+# Nombre de cada transformación tal como aparece en los pasos
+TRANSFORM_LABELS = {
+    'simplify': "simplificación",
+    'expand': "expansión",
+    'factor': "factorización",
+}
+
+Transform = Tuple[str, str, Callable[[sp.Expr], sp.Expr]]
+
+
+def _polynomial_form(expr):
+    """Forma canónica de un polinomio (términos semejantes agrupados) vía Poly"""
+    symbols = sorted(expr.free_symbols, key=str)
+    return sp.Poly(expr, *symbols).as_expr() if symbols else expr
+
+
+def _rational_form(expr):
+    """Fracción algebraica reducida: una sola fracción sin factores comunes"""
+    return sp.cancel(sp.together(expr))
+
+
+class SimplificationReport:
+    """Resultado de aplicar una estrategia: valores por transformación y las omitidas"""
+
+    def __init__(self, kind: str, routines: Dict[str, str]):
+        self.kind = kind
+        self.routines = routines
+        self.results: Dict[str, sp.Expr] = {}
+        self.errors: Dict[str, str] = {}
+        self.skipped: List[str] = []
+        self.elapsed = 0.0
+
+    def get(self, name: str) -> Optional[sp.Expr]:
+        return self.results.get(name)
+
+
+class SimplificationStrategy:
+    """
+    Elige cómo simplificar, expandir y factorizar según la estructura de la expresión.
+
+    simplify es con frecuencia cien veces más caro que expand o factor; para
+    polinomios, fracciones algebraicas y expresiones trigonométricas hay rutinas
+    específicas (Poly, cancel/together, trigsimp) mucho más baratas. Las tres
+    transformaciones son independientes y se lanzan a la vez con
+    run_within_budget; las que no terminan dentro del presupuesto de tiempo se
+    reportan como omitidas.
+    """
+
+    def __init__(self, budget: float = DEFAULT_BUDGET, max_simplify_ops: int = MAX_SIMPLIFY_OPS):
+        self.budget = budget
+        self.max_simplify_ops = max_simplify_ops
+
+    def classify(self, expr) -> str:
+        """Clasifica la expresión: polynomial, rational, trigonometric o general"""
+        symbols = tuple(expr.free_symbols)
+        if not symbols:
+            return 'general'
+        if expr.is_polynomial(*symbols):
+            return 'polynomial'
+        if expr.is_rational_function(*symbols):
+            return 'rational'
+        if expr.has(sp.functions.elementary.trigonometric.TrigonometricFunction):
+            return 'trigonometric'
+        return 'general'
+
+    def plan(self, expr) -> Tuple[str, List[Transform]]:
+        """Devuelve el tipo de expresión y las transformaciones (nombre, rutina, función)"""
+        kind = self.classify(expr)
+        if kind == 'polynomial':
+            simplify = ('Poly', _polynomial_form)
+        elif kind == 'rational':
+            simplify = ('together + cancel', _rational_form)
+        elif kind == 'trigonometric':
+            simplify = ('trigsimp', sp.trigsimp)
+        elif sp.count_ops(expr) <= self.max_simplify_ops:
+            simplify = ('simplify', sp.simplify)
+        else:
+            # Demasiado grande para simplify: se combinan las fracciones
+            simplify = ('together', sp.together)
+        transforms = [
+            ('simplify',) + simplify,
+            ('expand', 'expand', sp.expand),
+            ('factor', 'factor', sp.factor),
+        ]
+        return kind, transforms
+
+    def run(self, expr) -> SimplificationReport:
+        """Aplica en paralelo las transformaciones del plan, dentro del presupuesto"""
+        kind, transforms = self.plan(expr)
+        report = SimplificationReport(kind, {name: routine for name, routine, _ in transforms})
+        start = time.monotonic()
+        outcomes = run_within_budget({name: (function, (expr,)) for name, _, function in transforms},
+                                     self.budget)
+
+        for name, _, _ in transforms:
+            status, value = outcomes[name]
+            if status == 'ok':
+                report.results[name] = value
+            elif status == 'error':
+                report.errors[name] = value
+            else:
+                report.skipped.append(name)
+        report.elapsed = time.monotonic() - start
+        return report
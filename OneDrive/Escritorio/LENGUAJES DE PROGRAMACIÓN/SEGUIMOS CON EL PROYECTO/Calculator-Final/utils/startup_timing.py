@@ -0,0 +1,34 @@
+import time
+from typing import List, Optional, Tuple
+
+
+class StartupTimer:
+    """
+    Mide las fases del arranque de la aplicación.
+
+    Cada llamada a mark() registra el tiempo transcurrido desde la marca
+    anterior; report() imprime el resumen una vez que la ventana ya está visible.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        # Instante (time.perf_counter) en que empezó el proceso, si se conoce
+        self.started = started if started is not None else time.perf_counter()
+        self.last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, label: str):
+        now = time.perf_counter()
+        self.phases.append((label, now - self.last))
+        self.last = now
+
+    @property
+    def total(self) -> float:
+        return self.last - self.started
+
+    def report(self):
+        """Imprime la duración de cada fase y el total hasta la ventana visible"""
+        self.mark("primer dibujado de la ventana")
+        print("⏱️ Tiempo de arranque:")
+        for label, elapsed in self.phases:
+            print(f"   • {label}: {elapsed * 1000:.0f} ms")
+        print(f"   Total: {self.total * 1000:.0f} ms")
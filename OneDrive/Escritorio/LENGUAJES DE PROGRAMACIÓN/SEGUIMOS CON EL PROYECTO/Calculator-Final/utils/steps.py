@@ -0,0 +1,59 @@
+from collections.abc import Sequence
+from typing import Callable, List, Optional
+
+
+class DiscardedSteps(list):
+    """
+    Colector de pasos que descarta todo lo que recibe.
+
+    Los manejadores de operations lo usan en modo "solo resultado" para no
+    construir explicaciones que nadie va a mostrar.
+    """
+
+    def append(self, item):
+        pass
+
+    def extend(self, items):
+        pass
+
+    def insert(self, index, item):
+        pass
+
+
+class LazySteps(Sequence):
+    """
+    Lista de pasos que se genera solo la primera vez que se consulta.
+
+    Se comporta como una lista de solo lectura: al iterarla, indexarla o pedir
+    su longitud se ejecuta el productor y el resultado queda guardado.
+    """
+
+    def __init__(self, producer: Callable[[], List[str]]):
+        self._producer: Optional[Callable[[], List[str]]] = producer
+        self._steps: Optional[List[str]] = None
+
+    @property
+    def is_materialized(self) -> bool:
+        """Indica si los pasos ya fueron generados"""
+        return self._steps is not None
+
+    def materialize(self) -> List[str]:
+        """Genera los pasos (si hace falta) y los devuelve como lista"""
+        if self._steps is None:
+            self._steps = list(self._producer())
+            self._producer = None
+        return self._steps
+
+    def __getitem__(self, index):
+        return self.materialize()[index]
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __repr__(self):
+        if self._steps is None:
+            return "LazySteps(<pendiente>)"
+        return f"LazySteps({self._steps!r})"
@@ -0,0 +1,385 @@
+import re
+import threading
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Números, nombres y la derivada d/dx, con las mismas reglas que el lexer: en
+# "2e5" no hay ningún nombre y en "2a" el nombre es "a"
+_SCAN_PATTERN = re.compile(r"""
+    (?P<derivative>d/dx(?!\w))
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[^\W\d]\w*)
+""", re.VERBOSE)
+
+# Posición de un parámetro dentro del cuerpo compilado de una función. No es un
+# nombre, así que el valor de una variable nunca se confunde con un parámetro
+_PARAMETER_PATTERN = re.compile(r'\x00(\d+)\x00')
+
+
+def names_in(text: str) -> FrozenSet[str]:
+    """Nombres (variables o funciones) que aparecen en una expresión"""
+    return frozenset(match.group('name') for match in _SCAN_PATTERN.finditer(text) if match.group('name'))
+
+
+def parse_parameters(parameters) -> Tuple[str, ...]:
+    """Parámetros de una función a partir de 'x, y', de una lista de nombres o de None"""
+    if not parameters:
+        return ()
+    if isinstance(parameters, str):
+        parameters = parameters.split(',')
+    names = tuple(name.strip() for name in parameters if name and name.strip())
+    for name in names:
+        if not re.fullmatch(r'[^\W\d]\w*', name):
+            raise ValueError(f"Parámetro no válido: {name}")
+    if len(set(names)) != len(names):
+        raise ValueError("Hay parámetros repetidos")
+    return names
+
+
+class Definition:
+    """
+    Variable o función del usuario ya compilada.
+
+    compiled es el texto que sustituye al nombre: el valor de la variable entre
+    paréntesis o el cuerpo de la función con sus parámetros marcados. Las otras
+    definiciones que usa ya están sustituidas dentro, así que evaluar una
+    expresión no vuelve a recorrer el grafo de dependencias.
+    """
+
+    def __init__(self, name: str, kind: str, source: str, parameters: Sequence[str] = (),
+                 key: Optional[Hashable] = None):
+        self.name = name
+        self.kind = kind  # 'variable' o 'function'
+        self.source = source.strip()
+        self.parameters = tuple(parameters)
+        # Identifica la versión guardada, (id_funcion, ultima_modificacion), en la
+        # caché de funciones compiladas; las de la sesión anónima usan su nombre
+        self.key = key if key is not None else ('sesion', name)
+        # Nombres que usa la definición, sin contar sus propios parámetros
+        self.references = names_in(self.source) - set(self.parameters)
+        self.compiled: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @property
+    def signature(self) -> Tuple:
+        return (self.kind, self.parameters, self.source)
+
+    @property
+    def is_function(self) -> bool:
+        return self.kind == 'function'
+
+    def check_arguments(self, arguments: Sequence[str]):
+        if len(arguments) != len(self.parameters):
+            raise ValueError(
+                f"La función '{self.name}' espera {len(self.parameters)} argumento(s) "
+                f"y recibió {len(arguments)}"
+            )
+
+    def instantiate(self, arguments: Sequence[str]) -> str:
+        """Cuerpo de la función con los argumentos (ya expandidos) en lugar de los parámetros"""
+        self.check_arguments(arguments)
+        return _PARAMETER_PATTERN.sub(lambda match: f"({arguments[int(match.group(1))]})", self.compiled)
+
+
+class SymbolTable:
+    """
+    Variables y funciones del usuario compiladas para el motor de cálculo.
+
+    Cada definición se compila una vez, en orden topológico, sustituyendo
+    dentro de ella las definiciones de las que depende. Al cambiar una
+    definición solo se recompilan ella y las que dependen de ella (directa o
+    indirectamente); update() devuelve esos nombres para que el motor descarte
+    únicamente las entradas de caché que los usan. Las definiciones circulares
+    quedan marcadas con su error, que se informa al evaluar una expresión que
+    las use. Las que usan un nombre reservado (sin, pi, e...) no entran en la
+    tabla, así el nombre conserva su significado de la calculadora.
+    """
+
+    def __init__(self, reserved: Iterable[str] = ()):
+        self.reserved = frozenset(reserved)
+        self._definitions: Dict[str, Definition] = {}
+        # Nombre -> definiciones que lo usan (aunque el nombre aún no esté definido)
+        self._dependents: Dict[str, Set[str]] = {}
+        # Definiciones descartadas por usar un nombre reservado: nombre -> motivo
+        self._rejected: Dict[str, str] = {}
+        # Número de actualizaciones y la última en la que cambió cada nombre
+        self.generation = 0
+        self._changed_at: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._definitions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._definitions
+
+    def get(self, name: str) -> Optional[Definition]:
+        return self._definitions.get(name)
+
+    @property
+    def names(self) -> FrozenSet[str]:
+        return frozenset(self._definitions)
+
+    @property
+    def variable_names(self) -> FrozenSet[str]:
+        return frozenset(name for name, definition in self._definitions.items() if not definition.is_function)
+
+    @property
+    def function_names(self) -> FrozenSet[str]:
+        return frozenset(name for name, definition in self._definitions.items() if definition.is_function)
+
+    def errors(self) -> Dict[str, str]:
+        """Definiciones que no se pudieron compilar (o se descartaron) y el motivo"""
+        errors = dict(self._rejected)
+        errors.update((name, definition.error) for name, definition in self._definitions.items() if definition.error)
+        return errors
+
+    def is_current(self, names: Iterable[str], generation: int) -> bool:
+        """Indica si ninguno de los nombres cambió después de la actualización generation"""
+        changed_at = self._changed_at
+        return all(changed_at.get(name, 0) <= generation for name in names)
+
+    # ==================== ACTUALIZACIÓN ====================
+    def update(self, variables: Dict[str, str], functions: Dict[str, Tuple]) -> FrozenSet[str]:
+        """
+        Reemplaza las definiciones por las indicadas.
+
+        Args:
+            variables: nombre -> valor (texto)
+            functions: nombre -> (parámetros, cuerpo) o (parámetros, cuerpo, clave),
+                       con clave = (id_funcion, ultima_modificacion)
+
+        Returns:
+            Los nombres afectados: los que cambiaron, se añadieron o se
+            eliminaron, más todas las definiciones que dependen de ellos.
+        """
+        definitions = {}
+        for name, value in variables.items():
+            definitions[name] = Definition(name, 'variable', str(value))
+        for name, (parameters, body, *key) in functions.items():
+            key = key[0] if key else None
+            if name in definitions:
+                definitions[name].error = f"'{name}' está definida como variable y como función"
+                continue
+            try:
+                parameters = parse_parameters(parameters)
+            except ValueError as e:
+                definition = Definition(name, 'function', body, key=key)
+                definition.error = str(e)
+                definitions[name] = definition
+                continue
+            if not parameters:
+                parameters = self._infer_parameters(body, set(variables) | set(functions))
+            definitions[name] = Definition(name, 'function', body, parameters, key)
+
+        rejected = {
+            name: f"'{name}' es un nombre reservado de la calculadora"
+            for name in definitions if name in self.reserved
+        }
+        for name in rejected:
+            del definitions[name]
+
+        with self._lock:
+            old = self._definitions
+            # Las definiciones con error se recompilan siempre: su error puede
+            # depender de otros nombres (por ejemplo, una variable homónima)
+            changed = {
+                name for name in set(old) | set(definitions)
+                if name not in old or name not in definitions
+                or old[name].signature != definitions[name].signature
+                or old[name].error or definitions[name].error
+            }
+            dependents = self._build_dependents(definitions)
+            affected = self._closure(changed, (self._dependents, dependents))
+
+            # Las definiciones no afectadas conservan lo que ya tenían compilado
+            for name, definition in definitions.items():
+                if name not in affected and name in old:
+                    old[name].key = definition.key
+                    definitions[name] = old[name]
+            self._compile(definitions, [name for name in affected if name in definitions])
+
+            self._definitions = definitions
+            self._dependents = dependents
+            self._rejected = rejected
+            if affected:
+                self.generation += 1
+                for name in affected:
+                    self._changed_at[name] = self.generation
+        return frozenset(affected)
+
+    def _infer_parameters(self, body: str, defined: Set[str]) -> Tuple[str, ...]:
+        """Sin parámetros declarados: los nombres libres del cuerpo, en orden alfabético"""
+        free = names_in(body) - defined - self.reserved
+        return tuple(sorted(free)) or ('x',)
+
+    @staticmethod
+    def _build_dependents(definitions: Dict[str, Definition]) -> Dict[str, Set[str]]:
+        dependents: Dict[str, Set[str]] = {}
+        for name, definition in definitions.items():
+            for reference in definition.references:
+                dependents.setdefault(reference, set()).add(name)
+        return dependents
+
+    @staticmethod
+    def _closure(names: Set[str], graphs) -> Set[str]:
+        """Los nombres indicados y todo lo que depende de ellos en cualquiera de los grafos"""
+        affected = set(names)
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            for graph in graphs:
+                for dependent in graph.get(name, ()):
+                    if dependent not in affected:
+                        affected.add(dependent)
+                        pending.append(dependent)
+        return affected
+
+    def _compile(self, definitions: Dict[str, Definition], names: List[str]):
+        """Compila las definiciones indicadas, cada una después de las que usa"""
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: List[str]):
+            definition = definitions[name]
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                cycle = path[path.index(name):] + [name]
+                raise ValueError(f"Definición circular: {' → '.join(cycle)}")
+            state[name] = 'visiting'
+            for reference in sorted(definition.references):
+                if reference in definitions and reference in pending:
+                    visit(reference, path + [name])
+            state[name] = 'done'
+            self._compile_one(definition, definitions)
+
+        pending = set(names)
+        for definition in (definitions[name] for name in names):
+            definition.compiled = None
+        for name in sorted(names):
+            if state.get(name) == 'done':
+                continue
+            try:
+                visit(name, [])
+            except ValueError as e:
+                # Toda la cadena que quedó a medio compilar comparte el error
+                for other in names:
+                    if state.get(other) == 'visiting':
+                        definitions[other].error = str(e)
+                        state[other] = 'done'
+
+    def _compile_one(self, definition: Definition, definitions: Dict[str, Definition]):
+        if definition.error:
+            return
+        source = definition.source
+        if definition.is_function:
+            # Los parámetros se marcan antes de sustituir las demás definiciones
+            positions = {name: index for index, name in enumerate(definition.parameters)}
+            source = self._replace_names(source, lambda name: f"\x00{positions[name]}\x00"
+                                         if name in positions else None)
+        try:
+            expanded = self._expand(source, definitions)
+        except ValueError as e:
+            definition.error = str(e)
+            return
+        definition.compiled = expanded if definition.is_function else f"({expanded})"
+
+    # ==================== EXPANSIÓN ====================
+    def expand(self, expression: str, keep_functions: bool = False, bound: Iterable[str] = ()) -> str:
+        """
+        Sustituye las variables y las llamadas a funciones del usuario por sus
+        definiciones. Con keep_functions las llamadas se conservan (solo se
+        expanden sus argumentos) para evaluarlas con la función compilada.
+        Las variables de bound no se sustituyen: en la expresión son la
+        incógnita o la variable de derivación o integración.
+        """
+        definitions = self._definitions
+        if not definitions:
+            return expression
+        return self._expand(expression, definitions, keep_functions, frozenset(bound))
+
+    def _expand(self, text: str, definitions: Dict[str, Definition], keep_functions: bool = False,
+                bound: FrozenSet[str] = frozenset()) -> str:
+        parts: List[str] = []
+        position = 0
+        for match in _SCAN_PATTERN.finditer(text):
+            name = match.group('name')
+            if match.start() < position or not name or name not in definitions:
+                continue
+            definition = definitions[name]
+            if name in bound and not definition.is_function:
+                continue
+            if definition.error:
+                raise ValueError(f"La definición de '{name}' no es válida: {definition.error}")
+            if definition.compiled is None:
+                # Aún no compilada (orden topológico): no debería ocurrir fuera de _compile
+                raise ValueError(f"La definición de '{name}' no está disponible")
+
+            if not definition.is_function:
+                parts.append(text[position:match.start()])
+                parts.append(definition.compiled)
+                position = match.end()
+                continue
+
+            opening = self._skip_spaces(text, match.end())
+            if opening >= len(text) or text[opening] != '(':
+                # Nombre de función sin llamada: se deja tal cual
+                continue
+            closing = self._matching_parenthesis(text, opening)
+            if closing is None:
+                # Falta cerrar el paréntesis: el análisis de la expresión lo reportará
+                continue
+            arguments = self._split_arguments(text[opening + 1:closing])
+            expanded = [self._expand(argument, definitions, keep_functions, bound) for argument in arguments]
+            parts.append(text[position:match.start()])
+            if keep_functions:
+                definition.check_arguments(expanded)
+                parts.append(f"{name}({', '.join(expanded)})")
+            else:
+                parts.append(f"({definition.instantiate(expanded)})")
+            position = closing + 1
+        parts.append(text[position:])
+        return ''.join(parts)
+
+    @staticmethod
+    def _replace_names(text: str, replacement) -> str:
+        """Reemplaza los nombres para los que replacement(nombre) no devuelve None"""
+        def substitute(match):
+            name = match.group('name')
+            value = replacement(name) if name else None
+            return match.group(0) if value is None else value
+        return _SCAN_PATTERN.sub(substitute, text)
+
+    @staticmethod
+    def _skip_spaces(text: str, index: int) -> int:
+        while index < len(text) and text[index] in ' \t':
+            index += 1
+        return index
+
+    @staticmethod
+    def _matching_parenthesis(text: str, opening: int) -> Optional[int]:
+        depth = 0
+        for index in range(opening, len(text)):
+            if text[index] in '([{':
+                depth += 1
+            elif text[index] in ')]}':
+                depth -= 1
+                if depth == 0:
+                    return index
+        return None
+
+    @staticmethod
+    def _split_arguments(text: str) -> List[str]:
+        """Argumentos de una llamada (separados por comas fuera de paréntesis); f() no tiene ninguno"""
+        if not text.strip():
+            return []
+        arguments, depth, start = [], 0, 0
+        for index, char in enumerate(text):
+            if char in '([{':
+                depth += 1
+            elif char in ')]}':
+                depth -= 1
+            elif char == ',' and depth == 0:
+                arguments.append(text[start:index].strip())
+                start = index + 1
+        arguments.append(text[start:].strip())
+        return arguments
@@ -0,0 +1,258 @@
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import sympy as sp
+
+from utils.time_budget import call_within_budget
+
+try:
+    # SciPy es opcional: sin ella los sistemas grandes se resuelven con matrices densas
+    from scipy import sparse
+    from scipy.sparse import linalg as sparse_linalg
+except ImportError:
+    sparse = None
+    sparse_linalg = None
+
+# Sistemas lineales con coeficientes racionales hasta este tamaño se resuelven de forma exacta
+SYMBOLIC_LINEAR_LIMIT = 20
+
+# A partir de este número de incógnitas se usa la ruta dispersa (si SciPy está instalada)
+SPARSE_MIN_UNKNOWNS = 100
+
+# Tiempo máximo (segundos) para los sistemas no lineales
+DEFAULT_BUDGET = 10.0
+
+# Tolerancia del residuo para aceptar una solución numérica
+_RESIDUAL_TOLERANCE = 1e-8
+
+# Dígitos con los que se evalúa el residuo de una solución simbólica
+_RESIDUAL_DIGITS = 30
+
+# Número de condición a partir del cual la matriz se trata como singular
+_MAX_CONDITION = 1e12
+
+
+def sort_unknowns(symbols):
+    """Ordena las incógnitas en orden natural: x2 antes que x10"""
+    def key(symbol):
+        return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', str(symbol))]
+    return sorted(symbols, key=key)
+
+
+class SystemSolution:
+    """
+    Resultado de un sistema de ecuaciones.
+
+    status es 'unique', 'finite' (varias soluciones aisladas), 'infinite',
+    'inconsistent', 'none' (no se encontraron soluciones) o 'timeout'.
+    solutions es una lista de diccionarios {incógnita: valor}; en un sistema
+    compatible indeterminado los valores pueden depender de otras incógnitas.
+    """
+
+    METHODS = {
+        'linsolve': "linsolve de SymPy (exacto)",
+        'dense': "eliminación LU con NumPy (matriz densa)",
+        'sparse': "spsolve de SciPy (matriz dispersa)",
+        'least_squares': "mínimos cuadrados con NumPy (sistema no cuadrado o singular)",
+        'groebner': "bases de Gröbner (solve_poly_system)",
+        'nonlinsolve': "nonlinsolve de SymPy",
+        'nsolve': "método de Newton multivariable (nsolve), una solución",
+    }
+
+    def __init__(self, method: str, status: str, unknowns: Sequence[sp.Symbol],
+                 solutions: Optional[List[Dict[sp.Symbol, object]]] = None,
+                 rank: Optional[int] = None, residual: Optional[float] = None):
+        self.method = method
+        self.status = status
+        self.unknowns = list(unknowns)
+        self.solutions = solutions or []
+        self.rank = rank
+        self.residual = residual
+
+    @property
+    def description(self) -> str:
+        return self.METHODS[self.method]
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.method in ('dense', 'sparse', 'least_squares', 'nsolve')
+
+
+class SystemSolver:
+    """
+    Resolutor de sistemas de ecuaciones (cada expresión igualada a cero).
+
+    Los sistemas lineales pequeños con coeficientes racionales se resuelven con
+    linsolve; los demás se arman como A·x = b y se resuelven numéricamente, con
+    matrices dispersas cuando hay cientos de incógnitas. Los no lineales pasan
+    por bases de Gröbner o nonlinsolve con un presupuesto de tiempo.
+    """
+
+    def __init__(self, budget: float = DEFAULT_BUDGET):
+        self.budget = budget
+
+    def linear_coefficients(self, exprs, unknowns):
+        """
+        Coeficientes de un sistema lineal como lista de filas {incógnita: coeficiente}
+        más el término independiente, o None si alguna ecuación no es lineal.
+        """
+        unknown_set = set(unknowns)
+        rows = []
+        for expr in exprs:
+            row, constant = {}, sp.Integer(0)
+            for term, coefficient in sp.expand(expr).as_coefficients_dict().items():
+                if term == 1:
+                    constant += coefficient
+                elif term in unknown_set and coefficient.is_number:
+                    row[term] = row.get(term, 0) + coefficient
+                else:
+                    return None
+            rows.append((row, constant))
+        return rows
+
+    def solve(self, exprs, unknowns) -> SystemSolution:
+        rows = self.linear_coefficients(exprs, unknowns)
+        if rows is not None:
+            return self._linear(exprs, unknowns, rows)
+        return self._nonlinear(exprs, unknowns)
+
+    def _linear(self, exprs, unknowns, rows) -> SystemSolution:
+        exact = all(value.is_Rational for row, constant in rows for value in [constant, *row.values()])
+        if exact and len(unknowns) <= SYMBOLIC_LINEAR_LIMIT:
+            return self._symbolic_linear(exprs, unknowns)
+        return self._numeric_linear(unknowns, rows)
+
+    def _symbolic_linear(self, exprs, unknowns) -> SystemSolution:
+        solutions = sp.linsolve(exprs, *unknowns)
+        if not solutions:
+            return SystemSolution('linsolve', 'inconsistent', unknowns)
+        values = next(iter(solutions))
+        solution = dict(zip(unknowns, values))
+        free = set().union(*(sp.sympify(value).free_symbols for value in values)) & set(unknowns)
+        return SystemSolution('linsolve', 'infinite' if free else 'unique', unknowns, [solution],
+                              rank=len(unknowns) - len(free))
+
+    def _numeric_linear(self, unknowns, rows) -> SystemSolution:
+        index = {unknown: column for column, unknown in enumerate(unknowns)}
+        size = (len(rows), len(unknowns))
+        b = np.array([-float(constant) for _, constant in rows])
+
+        if sparse is not None and size[0] == size[1] and size[1] >= SPARSE_MIN_UNKNOWNS:
+            entries = [(i, index[unknown], float(value))
+                       for i, (row, _) in enumerate(rows) for unknown, value in row.items()]
+            row_ids, column_ids, data = zip(*entries) if entries else ((), (), ())
+            A = sparse.csr_matrix((data, (row_ids, column_ids)), shape=size)
+            with np.errstate(all='ignore'):
+                x = sparse_linalg.spsolve(A, b)
+            residual = float(np.linalg.norm(A @ x - b)) if np.all(np.isfinite(x)) else np.inf
+            if residual <= _RESIDUAL_TOLERANCE * max(1.0, float(np.linalg.norm(b))):
+                return self._numeric_solution('sparse', 'unique', unknowns, x, size[1], residual)
+            # Matriz singular: se analiza con la ruta densa
+            A = A.toarray()
+        else:
+            A = np.zeros(size)
+            for i, (row, _) in enumerate(rows):
+                for unknown, value in row.items():
+                    A[i, index[unknown]] = float(value)
+
+        # Una matriz casi singular daría valores enormes sin error: va a mínimos cuadrados
+        if size[0] == size[1] and np.linalg.cond(A) < _MAX_CONDITION:
+            try:
+                x = np.linalg.solve(A, b)
+                residual = float(np.linalg.norm(A @ x - b))
+                return self._numeric_solution('dense', 'unique', unknowns, x, size[1], residual)
+            except np.linalg.LinAlgError:
+                pass
+
+        x, _, rank, _ = np.linalg.lstsq(A, b, rcond=None)
+        residual = float(np.linalg.norm(A @ x - b))
+        if residual > _RESIDUAL_TOLERANCE * max(1.0, float(np.linalg.norm(b))):
+            return SystemSolution('least_squares', 'inconsistent', unknowns, rank=int(rank), residual=residual)
+        status = 'unique' if rank == size[1] else 'infinite'
+        return self._numeric_solution('least_squares', status, unknowns, x, int(rank), residual)
+
+    def _numeric_solution(self, method, status, unknowns, x, rank, residual) -> SystemSolution:
+        solution = {unknown: float(value) for unknown, value in zip(unknowns, x)}
+        return SystemSolution(method, status, unknowns, [solution], rank=rank, residual=residual)
+
+    def _nonlinear(self, exprs, unknowns) -> SystemSolution:
+        polynomial = all(expr.is_polynomial(*unknowns) for expr in exprs)
+        status, value = call_within_budget(_nonlinear_solutions, (exprs, unknowns, polynomial), self.budget)
+
+        default_method = 'groebner' if polynomial else 'nonlinsolve'
+        if status == 'timeout':
+            return SystemSolution(default_method, 'timeout', unknowns)
+        if status == 'error':
+            raise ValueError(f"No se pudo resolver el sistema: {value}")
+
+        method, solutions = value
+        if not solutions:
+            return SystemSolution(method, 'none', unknowns)
+        free = set()
+        for solution in solutions:
+            for value in solution.values():
+                free |= sp.sympify(value).free_symbols & set(unknowns)
+        return SystemSolution(method, 'infinite' if free else 'finite', unknowns, solutions)
+
+    @staticmethod
+    def _satisfies(exprs, solution) -> bool:
+        """Comprueba una solución simbólica sustituyéndola en todas las ecuaciones"""
+        try:
+            return all(sp.simplify(expr.subs(solution)) == 0 for expr in exprs)
+        except (TypeError, ValueError):
+            # Conjuntos (por ejemplo soluciones periódicas) que no se pueden sustituir
+            return True
+
+    @staticmethod
+    def _small_residual(exprs, solution) -> bool:
+        """Comprueba una solución por el residuo de cada ecuación, relativo al tamaño de sus términos"""
+        for expr in exprs:
+            terms = [sp.N(term.subs(solution), _RESIDUAL_DIGITS) for term in sp.Add.make_args(expr)]
+            residual = sp.N(expr.subs(solution), _RESIDUAL_DIGITS)
+            if not (residual.is_number and all(term.is_number for term in terms)):
+                # Soluciones que dependen de otras incógnitas: no hay un residuo numérico
+                continue
+            scale = max([1.0] + [abs(complex(term)) for term in terms])
+            if abs(complex(residual)) > _RESIDUAL_TOLERANCE * scale:
+                return False
+        return True
+
+    @staticmethod
+    def _numeric_nonlinear(exprs, unknowns):
+        """Busca una solución numérica con nsolve probando varios puntos de partida"""
+        for start in (0.5, 1.0, -1.0, 2.0):
+            try:
+                values = sp.nsolve(exprs, unknowns, [start] * len(unknowns))
+            except (ValueError, ZeroDivisionError, TypeError):
+                continue
+            return [{unknown: float(value) for unknown, value in zip(unknowns, values)}]
+        return []
+
+
+def _nonlinear_solutions(exprs, unknowns, polynomial):
+    """
+    Soluciones de un sistema no lineal como (método, lista de soluciones).
+    Es una función de módulo para poder ejecutarse en un proceso de trabajo.
+    """
+    if polynomial:
+        # Gröbner con coeficientes Float pierde precisión (y puede inventar soluciones):
+        # se trabaja con los coeficientes racionales exactos y se verifica cada solución
+        exact = [sp.nsimplify(expr, rational=True) for expr in exprs]
+        try:
+            found = sp.solve_poly_system(exact, *unknowns)
+            solutions = [dict(zip(unknowns, values)) for values in found or []]
+            return 'groebner', [solution for solution in solutions
+                                if SystemSolver._small_residual(exact, solution)]
+        except (NotImplementedError, sp.PolynomialError):
+            # Sistema con infinitas soluciones: nonlinsolve lo describe
+            pass
+    found = sp.nonlinsolve(exprs, *unknowns)
+    solutions = [dict(zip(unknowns, values)) for values in found]
+    # nonlinsolve puede devolver soluciones que no cumplen todas las ecuaciones
+    solutions = [solution for solution in solutions if SystemSolver._satisfies(exprs, solution)]
+    if not solutions and len(exprs) == len(unknowns):
+        numeric = SystemSolver._numeric_nonlinear(exprs, unknowns)
+        if numeric:
+            return 'nsolve', numeric
+    return 'nonlinsolve', solutions
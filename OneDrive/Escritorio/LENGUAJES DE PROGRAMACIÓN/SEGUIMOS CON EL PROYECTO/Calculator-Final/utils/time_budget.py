@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+# Resultado de una llamada: ('ok', valor), ('error', mensaje) o ('timeout', None)
+Outcome = Tuple[str, Any]
+
+# Llamada con presupuesto: (función, argumentos)
+Call = Tuple[Callable, tuple]
+
+# Pool de procesos donde se ejecutan las llamadas (None: hilos en este proceso)
+_pool = None
+
+# Llamadas que se pasaron del presupuesto y siguen ejecutándose en este proceso
+_abandoned = 0
+_lock = threading.Lock()
+
+
+def use_pool(pool):
+    """
+    Pool de procesos (ComputePool) para las llamadas con presupuesto de este
+    proceso. Una llamada que se pasa del tiempo termina junto con su proceso de
+    trabajo, que el pool reemplaza por uno nuevo.
+    """
+    global _pool
+    _pool = pool
+
+
+def abandoned_work() -> int:
+    """Número de llamadas abandonadas que siguen ejecutándose en este proceso"""
+    return _abandoned
+
+
+def run_within_budget(calls: Dict[str, Call], budget: float) -> Dict[str, Outcome]:
+    """
+    Ejecuta a la vez varias llamadas costosas de SymPy y espera hasta budget
+    segundos en total. Devuelve el resultado de cada una por nombre; las que no
+    terminaron a tiempo quedan como ('timeout', None).
+
+    Con un pool las llamadas van a sus procesos y las que se pasan del tiempo se
+    cancelan (el proceso se termina). Sin pool, como dentro de un proceso de
+    trabajo, se ejecutan en hilos: las que se pasan se abandonan y el proceso de
+    trabajo se retira después de responder (ver compute_pool).
+    """
+    if _pool is not None:
+        try:
+            return _run_in_pool(calls, budget)
+        except RuntimeError:
+            # Pool cerrado: se ejecuta en este proceso
+            pass
+    return _run_in_threads(calls, budget)
+
+
+def call_within_budget(function: Callable, args: tuple, budget: float) -> Outcome:
+    """Una sola llamada con presupuesto de tiempo (ver run_within_budget)"""
+    return run_within_budget({'call': (function, args)}, budget)['call']
+
+
+def _run_in_pool(calls: Dict[str, Call], budget: float) -> Dict[str, Outcome]:
+    jobs = {name: _pool.submit_call(function, args, timeout=budget) for name, (function, args) in calls.items()}
+    deadline = time.monotonic() + budget
+    outcomes = {}
+    for name, job in jobs.items():
+        try:
+            value = job.result(max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            # Todavía en cola o calculando: se cancela y su proceso se reemplaza
+            job.cancel()
+            outcomes[name] = ('timeout', None)
+            continue
+        except ValueError as e:
+            outcomes[name] = ('error', str(e))
+            continue
+        outcomes[name] = ('timeout', None) if job.interrupted else ('ok', value)
+    return outcomes
+
+
+def _run_in_threads(calls: Dict[str, Call], budget: float) -> Dict[str, Outcome]:
+    global _abandoned
+    outcomes: Dict[str, Outcome] = {}
+    done = threading.Semaphore(0)
+
+    def run(name, function, args):
+        global _abandoned
+        try:
+            outcomes[name] = ('ok', function(*args))
+        except Exception as e:
+            outcomes[name] = ('error', str(e))
+        with _lock:
+            if name in late:
+                _abandoned -= 1
+        done.release()
+
+    late = set()
+    # Hilos daemon: una llamada que se pasa del presupuesto no bloquea la salida del proceso
+    for name, (function, args) in calls.items():
+        threading.Thread(target=run, args=(name, function, args), daemon=True).start()
+
+    deadline = time.monotonic() + budget
+    for _ in calls:
+        if not done.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            break
+
+    with _lock:
+        for name in calls:
+            if name not in outcomes:
+                late.add(name)
+                _abandoned += 1
+        return {name: outcomes.get(name, ('timeout', None)) for name in calls}
@@ -0,0 +1,218 @@
+import json
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Escalas de temperatura (algoritmo 'custom') como (factor, desplazamiento) hacia Kelvin,
+# las mismas fórmulas que ConvertirTemperatura
+_TEMPERATURE_SCALES = {
+    'K': (1.0, 0.0),
+    'C': (1.0, 273.15),
+    'F': (5 / 9, 273.15 - 32 * 5 / 9),
+    'R': (5 / 9, 0.0),
+}
+
+# Potencia que ConvertirDatosPotencia trata como bits
+_BIT_POWER = -3
+
+UnitReference = Union[int, str]
+
+
+def _metadata(value) -> Dict[str, Any]:
+    """conversion_metadata llega como texto JSON o ya convertido, según el conector"""
+    if isinstance(value, (bytes, str)):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _number(value, default: float) -> float:
+    return float(value) if value is not None else default
+
+
+class Unit:
+    """
+    Unidad de medida del grafo de conversión.
+
+    El valor se lleva a la coordenada del tipo con coordenada = scale * valor + shift.
+    En el dominio lineal la coordenada es el valor en la unidad base; en el
+    logarítmico es el logaritmo natural de ese valor (decibeles, nepers...).
+    """
+
+    def __init__(self, id_unidad: int, id_tipo: int, simbolo: str, nombre: str,
+                 scale: float, shift: float = 0.0, logarithmic: bool = False):
+        if scale == 0 or not math.isfinite(scale):
+            raise ValueError(f"La unidad '{simbolo}' tiene un factor de conversión inválido")
+        self.id_unidad = id_unidad
+        self.id_tipo = id_tipo
+        self.simbolo = simbolo
+        self.nombre = nombre
+        self.scale = scale
+        self.shift = shift
+        self.logarithmic = logarithmic
+
+    @classmethod
+    def from_row(cls, row, algorithm: str) -> 'Unit':
+        """Traduce una fila de unidades_medida al algoritmo de conversión de su tipo"""
+        factor = _number(row.factor_conversion, 1.0)
+        offset = _number(row.offset_conversion, 0.0)
+        metadata = _metadata(row.conversion_metadata)
+        scale, shift, logarithmic = factor, factor * offset, False
+
+        if algorithm == 'potencia' and 'potencia' in metadata:
+            # Todo se lleva a bits: base^potencia bytes por 8
+            power = int(metadata['potencia'])
+            base = 1000 if metadata.get('base_decimal') in (True, 'true') else 1024
+            scale, shift = (1.0 if power == _BIT_POWER else float(base) ** power * 8), 0.0
+        elif algorithm == 'custom' and 'escala' in metadata:
+            # Una escala desconocida se queda en Kelvin, como en ConvertirTemperatura
+            scale, shift = _TEMPERATURE_SCALES.get(str(metadata['escala']).upper(), (1.0, 0.0))
+        elif algorithm == 'logaritmico' and 'referencia' in metadata:
+            # valor en la unidad base = referencia * base^(valor / multiplicador)
+            reference = float(metadata['referencia'])
+            base = float(metadata.get('base', 10))
+            multiplier = float(metadata.get('multiplicador', 10))
+            if reference <= 0 or base <= 0 or base == 1 or multiplier == 0:
+                raise ValueError(f"La unidad '{row.simbolo}' tiene metadatos logarítmicos inválidos")
+            scale, shift, logarithmic = math.log(base) / multiplier, math.log(reference), True
+
+        return cls(row.id_unidad, row.id_tipo, row.simbolo, row.nombre_unidad, scale, shift, logarithmic)
+
+
+class UnitType:
+    """
+    Unidades de un tipo (tipos_unidades) con las conversiones entre todos los
+    pares ya calculadas.
+
+    Entre dos unidades del mismo dominio la conversión es afín:
+    destino = factors[i, j] * valor + offsets[i, j], así que convertir un
+    arreglo completo es una multiplicación y una suma. Solo los pares que
+    mezclan una unidad logarítmica con una lineal pasan por la unidad base.
+    """
+
+    def __init__(self, id_tipo: int, nombre: str, algorithm: str, units: Iterable[Unit],
+                 precision: Optional[int] = None):
+        self.id_tipo = id_tipo
+        self.nombre = nombre
+        self.algorithm = algorithm
+        self.precision = precision
+        self.units: List[Unit] = list(units)
+        self.index = {unit.id_unidad: position for position, unit in enumerate(self.units)}
+
+        scale = np.array([unit.scale for unit in self.units], dtype=float)
+        shift = np.array([unit.shift for unit in self.units], dtype=float)
+        logarithmic = np.array([unit.logarithmic for unit in self.units], dtype=bool)
+        self.factors = scale[:, None] / scale[None, :]
+        self.offsets = (shift[:, None] - shift[None, :]) / scale[None, :]
+        self.affine = logarithmic[:, None] == logarithmic[None, :]
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def convert(self, value, origin: Unit, destination: Unit):
+        """Convierte un número o un arreglo de NumPy; devuelve el mismo tipo de dato"""
+        array = np.asarray(value, dtype=float)
+        i, j = self.index[origin.id_unidad], self.index[destination.id_unidad]
+        if self.affine[i, j]:
+            result = self.factors[i, j] * array + self.offsets[i, j]
+        else:
+            result = self._through_base(array, origin, destination)
+        return result.item() if result.ndim == 0 else result
+
+    def table(self, value: float, origin: Unit) -> List[Tuple[Unit, float]]:
+        """El valor expresado en todas las unidades del tipo (una fila de las matrices)"""
+        i = self.index[origin.id_unidad]
+        row = self.factors[i] * float(value) + self.offsets[i]
+        return [
+            (unit, float(row[j]) if self.affine[i, j] else self.convert(value, origin, unit))
+            for j, unit in enumerate(self.units)
+        ]
+
+    @staticmethod
+    def _through_base(array: np.ndarray, origin: Unit, destination: Unit) -> np.ndarray:
+        coordinate = origin.scale * array + origin.shift
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if origin.logarithmic:
+                coordinate = np.exp(coordinate)
+            else:
+                coordinate = np.log(coordinate)
+        if array.ndim == 0 and not np.isfinite(coordinate):
+            raise ValueError("El valor no se puede expresar en una escala logarítmica (debe ser positivo)")
+        return (coordinate - destination.shift) / destination.scale
+
+
+class UnitConverter:
+    """
+    Conversión de unidades en el proceso, sin pasar por RealizarConversion.
+
+    Se construye una vez con las filas de tipos_unidades y unidades_medida
+    (solo las activas) y agrupa las unidades por tipo. Las unidades se buscan
+    por id_unidad o por símbolo; los errores son los mismos del procedimiento.
+    """
+
+    def __init__(self, types: Iterable, units: Iterable):
+        types = list(types)
+        grouped: Dict[int, List[Unit]] = {tipo.id_tipo: [] for tipo in types}
+        algorithms = {tipo.id_tipo: tipo.algoritmo_conversion for tipo in types}
+        for row in units:
+            if row.id_tipo in grouped:
+                grouped[row.id_tipo].append(Unit.from_row(row, algorithms[row.id_tipo]))
+
+        self.types: Dict[int, UnitType] = {
+            tipo.id_tipo: UnitType(tipo.id_tipo, tipo.nombre_tipo, tipo.algoritmo_conversion,
+                                   grouped[tipo.id_tipo], tipo.precision_decimal)
+            for tipo in types
+        }
+        self.units: Dict[int, Unit] = {}
+        self._symbols: Dict[str, List[Unit]] = {}
+        for unit_type in self.types.values():
+            for unit in unit_type.units:
+                self.units[unit.id_unidad] = unit
+                self._symbols.setdefault(unit.simbolo, []).append(unit)
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def unit(self, reference: UnitReference, id_tipo: Optional[int] = None) -> Unit:
+        """Unidad por id_unidad o por símbolo (el símbolo solo es único dentro de un tipo)"""
+        if isinstance(reference, Unit):
+            return reference
+        if isinstance(reference, str):
+            candidates = [unit for unit in self._symbols.get(reference, ())
+                          if id_tipo is None or unit.id_tipo == id_tipo]
+            if len(candidates) > 1:
+                raise ValueError(f"El símbolo '{reference}' existe en varios tipos de unidad; indique el tipo")
+            unit = candidates[0] if candidates else None
+        else:
+            unit = self.units.get(reference)
+        if unit is None:
+            raise ValueError("Una o ambas unidades no existen o están inactivas")
+        return unit
+
+    def units_of(self, id_tipo: int) -> List[Unit]:
+        unit_type = self.types.get(id_tipo)
+        return list(unit_type.units) if unit_type else []
+
+    def convert(self, value, origin: UnitReference, destination: UnitReference,
+                id_tipo: Optional[int] = None):
+        """
+        Convierte un número o un arreglo de NumPy de la unidad origen a la destino.
+
+        Args:
+            value: Número o arreglo (se convierte elemento a elemento)
+            origin, destination: id_unidad o símbolo
+            id_tipo: Tipo de unidad, para distinguir símbolos repetidos entre tipos
+        """
+        origin = self.unit(origin, id_tipo)
+        destination = self.unit(destination, id_tipo)
+        if origin.id_tipo != destination.id_tipo:
+            raise ValueError("Las unidades deben ser del mismo tipo")
+        return self.types[origin.id_tipo].convert(value, origin, destination)
+
+    def table(self, value: float, origin: UnitReference, id_tipo: Optional[int] = None):
+        """El valor en todas las unidades del tipo de la unidad origen"""
+        origin = self.unit(origin, id_tipo)
+        return self.types[origin.id_tipo].table(value, origin)
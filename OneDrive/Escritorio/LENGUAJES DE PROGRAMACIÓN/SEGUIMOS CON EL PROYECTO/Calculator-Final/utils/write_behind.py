@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Registro = diccionario con valores que se pueden guardar en JSON
+Record = Dict[str, Any]
+
+# Espera máxima entre reintentos mientras la base de datos no responde
+_MAX_RETRY_DELAY = 60.0
+
+
+class RejectedRecords(ValueError):
+    """
+    La lanza el writer cuando la base de datos rechaza los registros por sus
+    datos (clave foránea, valor fuera de rango...): reintentar no sirve.
+    """
+    pass
+
+
+class WriteBehindBuffer:
+    """
+    Escritura diferida de registros en la base de datos.
+
+    Los registros se acumulan en memoria y se escriben en bloque (writer recibe
+    la lista y devuelve True si la guardó) al llegar a max_rows, cada max_delay
+    segundos y al cerrar. Cada registro se agrega además a un archivo JSONL
+    local (spool) antes de aceptarlo, y el archivo solo se vacía cuando el
+    bloque ya está en la base de datos: si la aplicación termina sin cerrar,
+    los registros pendientes se vuelven a leer y se escriben al iniciar.
+
+    Si writer devuelve False (base de datos no disponible) el bloque se
+    reintenta con esperas cada vez mayores. Si lanza RejectedRecords, los
+    registros se escriben uno por uno y los que la base de datos rechaza se
+    apartan en el archivo quarantine_path para que no bloqueen al resto.
+    """
+
+    def __init__(self, writer: Callable[[List[Record]], bool], spool_path: Optional[str] = None,
+                 max_rows: int = 50, max_delay: float = 5.0, name: str = "escritura-diferida",
+                 quarantine_path: Optional[str] = None):
+        self.writer = writer
+        self.spool_path = spool_path
+        if quarantine_path is None and spool_path:
+            quarantine_path = f"{os.path.splitext(spool_path)[0]}_rechazados.jsonl"
+        self.quarantine_path = quarantine_path
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.written = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+        self._pending: List[Record] = []
+        self._spool = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._retry_delay = max_delay
+        # Antes de este momento (time.monotonic) no se reintenta por un bloque lleno
+        self._retry_at = 0.0
+
+        if spool_path:
+            try:
+                self._pending = self._replay()
+                self._rewrite_spool()
+            except OSError as e:
+                print(f"⚠️ Archivo de respaldo {spool_path} desactivado: {e}")
+                self._spool = None
+        if self._pending:
+            print(f"📥 {len(self._pending)} registros pendientes recuperados de {spool_path}")
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, record: Record):
+        """Acepta un registro: queda en el archivo de respaldo y en memoria"""
+        with self._lock:
+            if self._stop.is_set():
+                raise ValueError("La escritura diferida ya está cerrada")
+            self._pending.append(record)
+            if self._spool is not None:
+                try:
+                    self._spool.write(json.dumps(record, default=str) + "\n")
+                    self._spool.flush()
+                except OSError as e:
+                    print(f"⚠️ No se pudo escribir en el archivo de respaldo: {e}")
+            # Durante la espera después de un fallo el bloque lleno no adelanta el reintento
+            full = len(self._pending) >= self.max_rows and time.monotonic() >= self._retry_at
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Escribe en bloque los registros pendientes; devuelve cuántos se guardaron"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                saved = self._write(batch)
+                remaining, rejected = ([], []) if saved else (batch, [])
+            except RejectedRecords as e:
+                print(f"⚠️ Bloque rechazado por la base de datos ({e}); se guardará registro por registro")
+                remaining, rejected = self._write_one_by_one(batch)
+            if rejected:
+                self._quarantine(rejected)
+            done = len(batch) - len(remaining)
+            with self._lock:
+                self.written += done - len(rejected)
+                self.rejected += len(rejected)
+                # Lo que no se pudo escribir se reintenta más tarde, antes que lo nuevo
+                self._pending = remaining + self._pending
+                if remaining:
+                    # Sin base de datos: se espera cada vez más entre intentos
+                    self.failed_flushes += 1
+                    self._retry_delay = min(self._retry_delay * 2, _MAX_RETRY_DELAY)
+                    self._retry_at = time.monotonic() + self._retry_delay
+                else:
+                    self._retry_delay = self.max_delay
+                    self._retry_at = 0.0
+                if done:
+                    # El archivo se queda solo con lo pendiente
+                    self._rewrite_spool()
+            return done - len(rejected)
+
+    def _write(self, batch: List[Record]) -> bool:
+        """Llama al writer; False si la base de datos no está disponible"""
+        try:
+            return bool(self.writer(batch))
+        except RejectedRecords:
+            raise
+        except Exception as e:
+            print(f"⚠️ Error en la escritura diferida: {e}")
+            return False
+
+    def _write_one_by_one(self, batch: List[Record]):
+        """Escribe un bloque rechazado registro por registro: devuelve (pendientes, rechazados)"""
+        rejected = []
+        for index, record in enumerate(batch):
+            try:
+                if not self._write([record]):
+                    # La base de datos dejó de responder: el resto queda pendiente
+                    return batch[index:], rejected
+            except RejectedRecords as e:
+                print(f"⚠️ Registro rechazado por la base de datos: {e}")
+                rejected.append(record)
+        return [], rejected
+
+    def _quarantine(self, records: List[Record]):
+        """Aparta los registros que la base de datos rechaza (para revisarlos a mano)"""
+        if not self.quarantine_path:
+            print(f"⚠️ {len(records)} registros rechazados descartados (sin archivo de rechazados)")
+            return
+        try:
+            directory = os.path.dirname(self.quarantine_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.quarantine_path, "a", encoding="utf-8") as quarantine:
+                for record in records:
+                    quarantine.write(json.dumps(record, default=str) + "\n")
+            print(f"🚫 {len(records)} registros rechazados apartados en {self.quarantine_path}")
+        except OSError as e:
+            print(f"⚠️ No se pudieron apartar {len(records)} registros rechazados: {e}")
+
+    def close(self):
+        """Detiene el hilo y escribe lo pendiente; lo que no se pueda guardar queda en el archivo"""
+        with self._lock:
+            self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._lock:
+            if self._pending:
+                print(f"⚠️ {len(self._pending)} registros sin guardar; se escribirán al reiniciar")
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self.pending,
+            'written': self.written,
+            'rejected': self.rejected,
+            'failed_flushes': self.failed_flushes,
+            'spool': self.spool_path if self._spool is not None else None
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self._retry_delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self._pending:
+                self.flush()
+
+    def _replay(self) -> List[Record]:
+        """Registros que quedaron en el archivo de una ejecución anterior"""
+        if not os.path.exists(self.spool_path):
+            return []
+        records = []
+        with open(self.spool_path, encoding="utf-8") as spool:
+            for line in spool:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Última línea a medio escribir si la aplicación se cerró de golpe
+                    continue
+        return records
+
+    def _rewrite_spool(self):
+        """Reemplaza el archivo por los registros pendientes (se llama con el candado tomado)"""
+        if not self.spool_path:
+            return
+        try:
+            if self._spool is not None:
+                self._spool.close()
+            directory = os.path.dirname(self.spool_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.spool_path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as spool:
+                for record in self._pending:
+                    spool.write(json.dumps(record, default=str) + "\n")
+            os.replace(temporary, self.spool_path)
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+        except OSError as e:
+            print(f"⚠️ Archivo de respaldo desactivado: {e}")
+            self._spool = None
@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import datetime
 from utils.styles import get_colors
-from utils.operations import operations
 from tkinter import font as tkfont
 
 class RoundedButton(tk.Canvas):
@@ -98,6 +97,18 @@ class RoundedButton(tk.Canvas):
         return f'#{r:02x}{g:02x}{b:02x}'
 
 class CalculatorView:
+    # Pausa (ms) sin escribir antes de evaluar la vista previa
+    PREVIEW_DELAY_MS = 300
+
+    # Color de la vista previa según su estado
+    PREVIEW_COLORS = {
+        'ok': '#2e7d32',
+        'incomplete': '#b26a00',
+        'error': '#c62828',
+        'pending': 'gray',
+        'empty': 'gray'
+    }
+
     def __init__(self, app, parent_frame):
         self.app = app
         self.parent_frame = parent_frame
@@ -105,8 +116,15 @@ class CalculatorView:
         self.setup_styles()
         self.setup_fonts()
         self.current_calculation = None
-        # Inicializar el motor de operaciones
-        self.operations = operations()
+        self.pending_job = None
+        self.request_id = 0
+        # Vista previa mientras se escribe
+        self.preview_label = None
+        self.preview_after_id = None
+        self.preview_future = None
+        self.preview_id = 0
+        # Motor de cálculo compartido por toda la aplicación
+        self.engine = app.engine
         
     def setup_styles(self):
         """Configura los estilos personalizados"""
@@ -248,6 +266,18 @@ class CalculatorView:
         )
         xscrollbar.config(command=self.expression_entry.xview)
         self.expression_entry.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.expression_entry.bind('<KeyRelease>', self.schedule_preview)
+        
+        # Vista previa del resultado mientras se escribe
+        self.preview_label = tk.Label(
+            frame,
+            text="",
+            font=('Consolas', 10, 'italic'),
+            bg=self.colors['bg'],
+            fg='gray',
+            anchor='w'
+        )
+        self.preview_label.pack(fill=tk.X, padx=15, pady=(0, 5))
         
         # Botón de cálculo con estilo moderno
         btn_frame = self.create_rounded_frame(frame)
@@ -264,6 +294,18 @@ class CalculatorView:
             clicked=self.calculate
         ).pack(side=tk.RIGHT)
         
+        # Botón para detener un cálculo largo en curso
+        RoundedButton(
+            btn_frame,
+            text="⏹ CANCELAR",
+            radius=20,
+            btnbackground=self.colors['operator'],
+            btnforeground='white',
+            width=120,
+            height=40,
+            clicked=self.cancel_calculation
+        ).pack(side=tk.RIGHT, padx=(0, 10))
+        
     def create_results_area(self):
         """Área de resultados con diseño moderno"""
         container = self.create_rounded_frame(self.parent_frame)
@@ -357,6 +399,7 @@ class CalculatorView:
             self.expression_entry.insert(cursor_pos, symbol)
             # Mantener el foco en el campo de entrada
             self.expression_entry.focus_set()
+            self.schedule_preview()
         except Exception as e:
             print(f"Error insertando símbolo '{symbol}': {e}")
 
@@ -365,66 +408,152 @@ class CalculatorView:
         self.expression_entry.delete("1.0", tk.END)
         self.expression_entry.insert("1.0", expression)
         self.expression_entry.focus_set()
+        self.schedule_preview()
+
+    def schedule_preview(self, event=None):
+        """Reprograma la vista previa: cada pulsación descarta la evaluación anterior"""
+        if self.preview_after_id is not None:
+            self.parent_frame.after_cancel(self.preview_after_id)
+        self.preview_id += 1
+        if self.preview_future is not None:
+            # Si todavía no empezó, ni siquiera se ejecuta
+            self.preview_future.cancel()
+            self.preview_future = None
+        self.preview_after_id = self.parent_frame.after(self.PREVIEW_DELAY_MS, self._start_preview)
+
+    def _start_preview(self):
+        """Evalúa la vista previa en segundo plano con la ruta numérica rápida"""
+        self.preview_after_id = None
+        if not self.expression_entry.winfo_exists():
+            return
+        expression = self.expression_entry.get("1.0", tk.END).strip()
+        preview_id = self.preview_id
+        if not expression:
+            self.show_preview({'status': 'empty', 'message': ""})
+            return
+        future = self.app.background_executor.submit(self.engine.preview, expression, self.app.numeric_settings)
+        self.preview_future = future
+        self.parent_frame.after(30, lambda: self._poll_preview(preview_id, future))
+
+    def _poll_preview(self, preview_id, future):
+        """Muestra la vista previa si sigue correspondiendo al texto actual"""
+        if preview_id != self.preview_id or future.cancelled():
+            return
+        if not future.done():
+            self.parent_frame.after(30, lambda: self._poll_preview(preview_id, future))
+            return
+        self.preview_future = None
+        try:
+            self.show_preview(future.result())
+        except Exception as e:
+            self.show_preview({'status': 'error', 'message': f"⚠️ {e}"})
+
+    def show_preview(self, preview):
+        """Actualiza la línea de vista previa"""
+        if self.preview_label is None or not self.preview_label.winfo_exists():
+            return
+        self.preview_label.config(
+            text=preview['message'],
+            fg=self.PREVIEW_COLORS.get(preview['status'], 'gray')
+        )
     
     def calculate(self):
-        """Calcula la expresión ingresada usando la clase operations"""
+        """Envía la expresión a segundo plano para no bloquear la interfaz"""
         expression = self.expression_entry.get("1.0", tk.END).strip()
         if not expression:
             self.animate_error(self.expression_entry)
             return
-            
+        
+        # Animación de carga
+        self.animate_calculation()
+        
+        # Un cálculo anterior que siga en curso queda descartado
+        self.request_id += 1
+        request_id = self.request_id
+        self.cancel_calculation()
+        
+        self.display_pending(expression)
+        # Decimales y notación del usuario actual
+        settings = self.app.numeric_settings
+        future = self.app.background_executor.submit(self._run_calculation, expression, request_id, settings)
+        self.parent_frame.after(50, lambda: self._poll_calculation(request_id, expression, future))
+    
+    def _run_calculation(self, expression, request_id, settings):
+        """Valida y calcula la expresión (se ejecuta fuera del hilo de Tkinter)"""
+        # Un solo análisis de la expresión sirve para validar, despachar y clasificar
+        info = self.engine.analyze(expression)
+        if not info.is_valid:
+            raise ValueError("Expresión matemática no válida")
+        
+        def track_job(job):
+            # Las operaciones simbólicas costosas van al pool de procesos, que
+            # permite cancelarlas y les impone un tiempo límite
+            self.pending_job = job
+            if request_id != self.request_id:
+                job.cancel()
+        
+        # Solo el resultado; los pasos se generan bajo demanda desde la Resolución Detallada
+        result_data = self.engine.calculate(expression, settings=settings, on_job=track_job)
+        return result_data, info.to_dict()
+    
+    def cancel_calculation(self):
+        """Cancela el cálculo que se está ejecutando en el pool, si lo hay"""
+        job = self.pending_job
+        if job and not job.done():
+            job.cancel()
+        self.pending_job = None
+    
+    def _poll_calculation(self, request_id, expression, future):
+        """Revisa el cálculo en segundo plano y muestra el resultado en el hilo de Tkinter"""
+        # Resultado de una petición reemplazada por otra más reciente: se descarta
+        if request_id != self.request_id:
+            return
+        if not future.done():
+            self.parent_frame.after(50, lambda: self._poll_calculation(request_id, expression, future))
+            return
+        if not self.result_text.winfo_exists():
+            return
+        
+        self.pending_job = None
         try:
-            # Animación de carga
-            self.animate_calculation()
+            result_data, operation_info = future.result()
             
-            # Validar expresión usando operations
-            if not self.operations.is_valid_expression(expression):
-                self.display_error("Expresión matemática no válida")
+            if result_data['type'] in ('timeout', 'cancelled'):
+                # No se registra en el historial: el cálculo no terminó
+                self.display_detailed_result(expression, result_data)
                 self.current_calculation = None
                 return
             
-            # Procesar la expresión usando operations
-            result_data = self.operations.process_expression(expression)
-            
-            # Mostrar resultado con pasos detallados
-            self.display_detailed_result(expression, result_data)
-            
-            # Determinar tipo de cálculo usando operations
-            operation_info = self.operations.get_operation_info(expression)
-            calc_type = self.determine_calculation_type_from_info(operation_info)
-            
-            # Agregar al historial
-            self.app.history_controller.add_calculation(expression, result_data['result'], calc_type)
-            
-            # Guardar referencia para el botón "Guardar"
-            self.current_calculation = {
-                'expression': expression,
-                'result': result_data['result'],
-                'steps': result_data['steps'],
-                'timestamp': datetime.datetime.now().isoformat(),
-                'type': calc_type.value,
-                'operation_type': operation_info['type']
-            }
-            
+            self._finish_calculation(expression, result_data, operation_info)
         except Exception as e:
             self.display_error(f"Error en el cálculo: {str(e)}")
             self.current_calculation = None
     
+    def _finish_calculation(self, expression, result_data, operation_info):
+        """Muestra el resultado, lo agrega al historial y lo deja listo para guardar"""
+        # Mostrar resultado con pasos detallados
+        self.display_detailed_result(expression, result_data)
+        
+        calc_type = self.determine_calculation_type_from_info(operation_info)
+        
+        # Agregar al historial (la escritura en BD se hace en segundo plano)
+        self.app.history_controller.add_calculation(expression, result_data['result'], calc_type)
+        
+        # Guardar referencia para el botón "Guardar"
+        self.current_calculation = {
+            'expression': expression,
+            'result': result_data['result'],
+            'steps': result_data['steps'],
+            'timestamp': datetime.datetime.now().isoformat(),
+            'type': calc_type.value,
+            'operation_type': operation_info['type']
+        }
+    
     def determine_calculation_type_from_info(self, operation_info):
         """Convierte el tipo de operación a TipoCalculo"""
         from models import TipoCalculo
         
-        type_mapping = {
-            'basic_operations': TipoCalculo.BASICO,
-            'symbolic': TipoCalculo.CIENTIFICO,
-            'derivative': TipoCalculo.CIENTIFICO,
-            'integral': TipoCalculo.CIENTIFICO,
-            'equation': TipoCalculo.CIENTIFICO,
-            'matrix': TipoCalculo.MATRIZ,
-            'fraction': TipoCalculo.BASICO
-        }
-        
-        return type_mapping.get(operation_info['type'], TipoCalculo.BASICO)
+        return TipoCalculo.from_operation_type(operation_info['type'])
     
     def save_current_calculation(self):
         """Guarda el cálculo actual usando el operations controller."""
@@ -487,6 +616,13 @@ class CalculatorView:
         self.result_text.config(state=tk.DISABLED)
         self.animate_success()
         
+    def display_pending(self, expression):
+        """Indica que el cálculo se está ejecutando en segundo plano"""
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete("1.0", tk.END)
+        self.result_text.insert("1.0", "⏳ Calculando... (puede cancelar con ⏹ CANCELAR)\n")
+        self.result_text.config(state=tk.DISABLED)
+        
     def animate_success(self):
         """Animación de éxito al mostrar resultado"""
         original_bg = self.result_text.cget('bg')
@@ -556,7 +692,7 @@ class CalculatorView:
         if hasattr(self, 'current_calculation') and self.current_calculation:
             # Pasar solo la expresión como string
             expression = self.current_calculation['expression']
-            self.app.views['notebook'].show(expression)
+            self.app.get_view('notebook').show(expression)
             self.app.show_view('notebook')
         else:
             self.show_notification("No hay cálculo para mostrar paso a paso")
\ No newline at end of file
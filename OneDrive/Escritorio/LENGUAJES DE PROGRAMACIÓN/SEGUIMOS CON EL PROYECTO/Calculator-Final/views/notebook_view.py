@@ -1,19 +1,30 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
 import datetime
+import queue
+import threading
+import numpy as np
 from utils.styles import get_colors
-from utils.operations import operations
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from utils.steps import LazySteps
 
 class NotebookView:
+    # Máximo de filas de la tabla de valores que se muestran en el área de texto
+    MAX_TABLE_ROWS = 500
+
     def __init__(self, app, parent_frame):
         self.app = app
         self.parent_frame = parent_frame
         self.colors = get_colors()
-        self.operations = operations()
+        self.engine = app.engine
         self.notebook_text = None
         self.last_expression = None 
+        self.table_entries = {}
+        # Identificador de la petición en curso (expresión o lote); uno nuevo descarta la anterior
+        self.batch_id = 0
+        # Petición cancelada con ⏹ Cancelar: sus trabajos que aún se envíen se cancelan
+        self.cancelled_id = None
+        # Trabajos del pool de la petición en curso (para cancelarlos)
+        self.pending_jobs = []
 
     def show(self, expression=None):
         if expression is not None:
@@ -64,6 +75,9 @@ class NotebookView:
         # Botón de guardar
         self._create_control_buttons(self.parent_frame)
 
+        # Panel de tabla de valores
+        self._create_table_panel(self.parent_frame)
+
         # Calcular y mostrar el paso a paso automáticamente
         self.notebook_text.delete("1.0", tk.END)
         expr_to_show = self.last_expression if self.last_expression else expression
@@ -91,6 +105,96 @@ class NotebookView:
             command=self.save_operations
         ).pack(side=tk.LEFT, padx=8, pady=4, ipadx=8, ipady=2)
 
+        tk.Button(
+            button_row2,
+            text="⏹ Cancelar",
+            font=("Arial", 9, "bold"),
+            bg=self.colors['operator'],
+            fg="white",
+            relief=tk.RAISED,
+            command=self.cancel_calculation
+        ).pack(side=tk.LEFT, padx=8, pady=4, ipadx=8, ipady=2)
+
+    def _create_table_panel(self, parent):
+        """Crea el panel para generar una tabla de valores de f(x)"""
+        panel = tk.Frame(parent, bg=self.colors['bg'])
+        panel.pack(side=tk.BOTTOM, fill=tk.X, padx=20, pady=(5, 0))
+
+        tk.Label(
+            panel,
+            text="📋 Tabla de valores",
+            font=("Arial", 10, "bold"),
+            bg=self.colors['bg'],
+            fg=self.colors['text']
+        ).pack(side=tk.LEFT, padx=(0, 10))
+
+        defaults = [
+            ('expression', "f(x) =", 22, self.last_expression or ""),
+            ('start', "Desde", 6, "0"),
+            ('stop', "Hasta", 6, "10"),
+            ('points', "Puntos", 7, "11"),
+        ]
+        self.table_entries = {}
+        for key, label, width, default in defaults:
+            tk.Label(panel, text=label, font=("Arial", 9), bg=self.colors['bg'],
+                     fg=self.colors['text']).pack(side=tk.LEFT, padx=(5, 2))
+            entry = tk.Entry(panel, width=width, font=("Courier", 10))
+            entry.insert(0, default)
+            entry.pack(side=tk.LEFT)
+            self.table_entries[key] = entry
+
+        tk.Button(
+            panel,
+            text="📋 Generar tabla",
+            font=("Arial", 9, "bold"),
+            bg=self.colors['operator'],
+            fg="white",
+            relief=tk.RAISED,
+            command=self.generate_values_table
+        ).pack(side=tk.LEFT, padx=8, ipadx=6)
+
+    def generate_values_table(self):
+        """Evalúa la expresión en un rango de x y muestra la tabla de valores"""
+        expression = self.table_entries['expression'].get().strip()
+        if not expression:
+            messagebox.showwarning("Tabla de valores", "Ingrese una expresión en x")
+            return
+
+        try:
+            start = float(self.table_entries['start'].get())
+            stop = float(self.table_entries['stop'].get())
+            points = int(self.table_entries['points'].get())
+            if points < 1:
+                raise ValueError("El número de puntos debe ser positivo")
+        except ValueError as e:
+            messagebox.showerror("Tabla de valores", f"Rango no válido:\n{str(e)}")
+            return
+
+        try:
+            x_values = np.linspace(start, stop, points)
+            y_values = self.engine.evaluate_over(expression, x=x_values)
+        except Exception as e:
+            messagebox.showerror("Tabla de valores", f"No se pudo evaluar la expresión:\n{str(e)}")
+            return
+
+        shown = min(points, self.MAX_TABLE_ROWS)
+        output = f"\n{'='*60}\n"
+        output += f"📋 TABLA DE VALORES: f(x) = {expression}\n"
+        output += f"{'='*60}\n"
+        output += f"{'x':>18} | {'f(x)':>18}\n"
+        output += f"{'-'*18}-+-{'-'*18}\n"
+        output += "\n".join(
+            f"{x:>18.6g} | {y:>18.6g}" for x, y in zip(x_values[:shown], y_values[:shown])
+        )
+        if points > shown:
+            output += f"\n... {points - shown} filas más (mostrando las primeras {shown})"
+        output += f"\n{'='*60}\n"
+
+        self.notebook_text.config(state=tk.NORMAL)
+        self.notebook_text.insert(tk.END, output)
+        self.notebook_text.see(tk.END)
+        self.notebook_text.config(state=tk.DISABLED)
+
     def _calcular_y_mostrar(self, expression):
         """Calcula la expresión recibida y muestra el resultado paso a paso en el área principal"""
         content = expression.strip()
@@ -103,30 +207,156 @@ class NotebookView:
         header += f"{'='*60}\n\n"
         self.notebook_text.insert(tk.END, header)
 
+        # Varias expresiones (una por línea): se evalúan en lote sin bloquear la interfaz
+        expressions = self.engine.split_batch(content)
+        if len(expressions) > 1:
+            self._start_batch(expressions)
+            return
+
+        # Una sola expresión: en segundo plano, con el límite de tiempo del pool y cancelable
+        request_id = self._new_request()
+        self.notebook_text.insert(tk.END, "⏳ Calculando... (puede cancelar con ⏹ Cancelar)\n\n")
+        settings = self.app.numeric_settings
+        future = self.app.background_executor.submit(self._run_calculation, content, request_id, settings)
+        self.parent_frame.after(50, lambda: self._poll_calculation(request_id, content, future))
+
+    def _run_calculation(self, expression, request_id, settings):
+        """Calcula la expresión con sus pasos (se ejecuta fuera del hilo de Tkinter)"""
+        return self.engine.calculate(expression, settings=settings, detailed=True,
+                                     on_job=lambda job: self._track_job(request_id, job))
+
+    def _new_request(self):
+        """Empieza una petición nueva y cancela los trabajos de la anterior"""
+        self.batch_id += 1
+        self._cancel_jobs()
+        return self.batch_id
+
+    def _track_job(self, request_id, job):
+        """Guarda un trabajo del pool; si su petición ya no sigue en curso se cancela"""
+        self.pending_jobs.append(job)
+        if request_id != self.batch_id or request_id == self.cancelled_id:
+            job.cancel()
+
+    def _cancel_jobs(self):
+        jobs, self.pending_jobs = self.pending_jobs, []
+        for job in jobs:
+            if not job.done():
+                job.cancel()
+
+    def cancel_calculation(self):
+        """Cancela el cálculo o el lote que se está ejecutando en el pool, si lo hay"""
+        self.cancelled_id = self.batch_id
+        self._cancel_jobs()
+
+    def _poll_calculation(self, request_id, expression, future):
+        """Muestra el resultado en el hilo de Tkinter cuando el cálculo termina"""
+        if request_id != self.batch_id or not self.notebook_text.winfo_exists():
+            return
+        if not future.done():
+            self.parent_frame.after(50, lambda: self._poll_calculation(request_id, expression, future))
+            return
+
+        self.pending_jobs = []
         try:
-            result_data = self.operations.process_expression(content)
-            output = f"Expresión: {content}\n"
-            output += self._format_result_with_steps(result_data)
-            output += "\n" + "="*50 + "\n\n"
-            self.notebook_text.insert(tk.END, output)
-            successful_calcs = 1
-            errors = 0
+            result_data = future.result()
+            output = self._format_batch_item(expression, result_data)
+            failed = result_data.get('type') in ('error', 'timeout', 'cancelled')
         except Exception as e:
-            output = f"Expresión: {content}\n"
+            output = f"Expresión: {expression}\n"
             output += f"❌ Error: {str(e)}\n\n"
             output += "="*50 + "\n\n"
-            self.notebook_text.insert(tk.END, output)
-            successful_calcs = 0
-            errors = 1
+            failed = True
+        output += self._format_summary(0 if failed else 1, 1 if failed else 0)
+
+        self.notebook_text.config(state=tk.NORMAL)
+        self.notebook_text.insert(tk.END, output)
+        self.notebook_text.see(tk.END)
+        self.notebook_text.config(state=tk.DISABLED)
+
+    def _format_batch_item(self, expression, result_data):
+        output = f"Expresión: {expression}\n"
+        output += self._format_result_with_steps(result_data)
+        output += "\n" + "="*50 + "\n\n"
+        return output
 
-        # Resumen final
+    def _format_summary(self, successful_calcs, errors):
         summary = f"\n{'='*40}\n"
         summary += f"📊 RESUMEN FINAL:\n"
         summary += f"• Cálculos exitosos: {successful_calcs}\n"
         summary += f"• Errores: {errors}\n"
         summary += f"• Total procesado: {successful_calcs + errors}\n"
         summary += f"{'='*40}\n"
-        self.notebook_text.insert(tk.END, summary)
+        return summary
+
+    def _start_batch(self, expressions):
+        """Evalúa el lote en segundo plano; los resultados llegan por una cola"""
+        batch_id = self._new_request()
+        results = queue.Queue()
+        self.notebook_text.insert(tk.END, f"⏳ Calculando {len(expressions)} expresiones... "
+                                          f"(puede cancelar con ⏹ Cancelar)\n\n")
+
+        settings = self.app.numeric_settings
+
+        def run():
+            try:
+                self.engine.process_many(
+                    expressions,
+                    settings=settings,
+                    on_result=lambda index, expression, result: results.put((index, result)),
+                    on_job=lambda job: self._track_job(batch_id, job)
+                )
+            except Exception as e:
+                # Sin índice: el lote se detuvo (por ejemplo, el pool ya se cerró)
+                results.put((None, str(e)))
+
+        threading.Thread(target=run, daemon=True).start()
+        state = {'received': {}, 'next': 0, 'ok': 0, 'errors': 0}
+        self.parent_frame.after(50, lambda: self._poll_batch(batch_id, expressions, results, state))
+
+    def _poll_batch(self, batch_id, expressions, results, state):
+        """Muestra, en el orden de entrada, los resultados del lote que ya terminaron"""
+        if batch_id != self.batch_id or not self.notebook_text.winfo_exists():
+            return
+
+        while True:
+            try:
+                index, result = results.get_nowait()
+            except queue.Empty:
+                break
+            if index is None:
+                state['failure'] = result
+            else:
+                state['received'][index] = result
+
+        output = ""
+        while state['next'] in state['received']:
+            index = state['next']
+            result = state['received'].pop(index)
+            if result.get('type') in ('error', 'timeout', 'cancelled'):
+                state['errors'] += 1
+            else:
+                state['ok'] += 1
+            output += f"[{index + 1}/{len(expressions)}] " + self._format_batch_item(expressions[index], result)
+            state['next'] += 1
+
+        finished = state['next'] == len(expressions)
+        if not finished and 'failure' in state:
+            # Las expresiones que no llegaron a calcularse cuentan como errores
+            output += f"❌ Error: el lote se detuvo: {state['failure']}\n"
+            state['errors'] += len(expressions) - state['next']
+            finished = True
+        if finished:
+            self.pending_jobs = []
+            output += self._format_summary(state['ok'], state['errors'])
+
+        if output:
+            self.notebook_text.config(state=tk.NORMAL)
+            self.notebook_text.insert(tk.END, output)
+            self.notebook_text.see(tk.END)
+            self.notebook_text.config(state=tk.DISABLED)
+
+        if not finished:
+            self.parent_frame.after(50, lambda: self._poll_batch(batch_id, expressions, results, state))
 
     def save_operations(self):
         """Guarda el contenido del área de resultados detallados en un archivo PDF"""
@@ -147,6 +377,10 @@ class NotebookView:
 
         if file_path:
             try:
+                # reportlab solo se importa al exportar
+                from reportlab.lib.pagesizes import letter
+                from reportlab.pdfgen import canvas
+                
                 c = canvas.Canvas(file_path, pagesize=letter)
                 width, height = letter
                 lines = content.split('\n')
@@ -169,9 +403,12 @@ class NotebookView:
 
     def _format_result_with_steps(self, result_data):
         # Este método debe devolver el string con los pasos detallados
+        if isinstance(result_data, dict) and result_data.get('type') in ('timeout', 'cancelled'):
+            # Cálculo detenido: el mensaje incluye el resultado parcial, si lo hubo
+            return str(result_data.get('result'))
         if isinstance(result_data, dict) and 'steps' in result_data:
             steps = result_data['steps']
-            if isinstance(steps, list):
+            if isinstance(steps, (list, LazySteps)):
                 return "\n".join(str(step) for step in steps)
             else:
                 return str(steps)